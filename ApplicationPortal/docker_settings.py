@@ -29,10 +29,33 @@ DATABASES = {
     }
 }
 
+# A cache shared by all gunicorn workers and the job runner. memcached (started
+# by entrypoint.sh) evicts the least recently used entries by itself and has
+# an atomic incr(), which the version counters of hacker.versions rely on
+# so that concurrent bumps are never lost. The file based cache has neither:
+# it lists the whole directory on every set to cull (with only 300 entries by
+# default) and increments by reading and re-writing a file.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.setdefault("DJANGO_CACHE_LOCATION", "127.0.0.1:11211"),
+    }
+}
+
 # add the static file root
 STATIC_ROOT = "/var/www/static/"
 MEDIA_ROOT = os.environ.setdefault("DJANGO_MEDIA_ROOT", MEDIA_ROOT)
 
+# nginx serves the media from /internal/media/
+CV_SERVE_MODE = os.environ.setdefault("DJANGO_CV_SERVE_MODE", "accel")
+
+# signed cv urls, checked by nginx with the same secret (see entrypoint.sh)
+CV_SIGNING_SECRET = os.environ.setdefault("DJANGO_CV_SIGNING_SECRET", "")
+CV_SIGNED_URL_TTL = int(os.environ.setdefault("DJANGO_CV_SIGNED_URL_TTL", str(CV_SIGNED_URL_TTL)))
+
+# the maximum size of uploaded cvs
+CV_MAX_UPLOAD_SIZE = int(os.environ.setdefault("DJANGO_CV_MAX_UPLOAD_SIZE", str(CV_MAX_UPLOAD_SIZE)))
+
 # Sentry
 if os.environ.get('DJANGO_RAVEN_DSN'):
     # add sentry
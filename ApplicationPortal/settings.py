@@ -155,6 +155,25 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # The prefix for internal URLs
 INTERNAL_PREFIX = '/internal'
 
+# How CVs (and the results of jobs) are served, see registry.views.cv:
+# 'stream' sends them from MEDIA_ROOT, 'accel' lets nginx send them from
+# INTERNAL_PREFIX using X-Accel-Redirect
+CV_SERVE_MODE = 'stream'
+
+# The secret of signed CV URLs, which nginx serves without asking django
+# (see docker/django.conf). If empty, CVs are linked to registry.views.cv.
+CV_SIGNING_SECRET = ''
+
+# The number of seconds a signed CV URL is valid for (at least)
+CV_SIGNED_URL_TTL = 60 * 60
+
+# The prefix for signed URLs
+SIGNED_PREFIX = '/signed'
+
+# The maximum size of an uploaded CV in bytes, checked while it is uploaded
+# (see registry.uploads)
+CV_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+
 # Import Local settings if available
 try:
     from local_settings import *
@@ -0,0 +1,111 @@
+""" Benchmarks of the performance sensitive parts of the portal.
+
+Each module is run on its own from the root of the repository, e.g.
+
+    python -m benchmarks.widgets
+
+and prints its timings. The benchmarks never touch the configured database:
+those needing data use a separate SQLite database instead (see setup).
+"""
+
+import datetime
+import os
+import random
+import tempfile
+import timeit
+
+# The SQLite database used by benchmarks needing data, kept between runs
+DATABASE = os.environ.get('BENCHMARK_DATABASE', os.path.join(tempfile.gettempdir(), 'portal-benchmark.sqlite3'))
+
+
+def setup(database=False, debug=False):
+    """ Sets up Django, using the benchmark database if database is True """
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ApplicationPortal.settings')
+
+    import django
+    from django.conf import settings
+
+    # templates are only cached with DEBUG off
+    settings.DEBUG = debug
+    settings.DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': DATABASE if database else ':memory:',
+    }
+
+    django.setup()
+
+
+def timed(func, number):
+    """ Returns the mean time of number calls of func in milliseconds, after
+    a first call to warm up any caches """
+
+    func()
+    return timeit.timeit(func, number=number) / number * 1000
+
+
+def report(name, milliseconds):
+    """ Prints the time taken by a benchmark """
+
+    print('{:<28} {:9.2f} ms'.format(name, milliseconds))
+
+
+def populate(count, seed=1):
+    """ Migrates the benchmark database and fills it with count hackers with
+    random data, unless it already holds as many (from an earlier run) """
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import transaction
+
+    from hacker import search, statistics
+    from hacker.models import Hacker, AcademicData, HackathonApplication, Organizational
+
+    call_command('migrate', verbosity=0)
+    if Hacker.objects.count() >= count:
+        return
+
+    rnd = random.Random(seed)
+    words = [''.join(rnd.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rnd.randint(3, 10))) for _ in range(5000)]
+    names = ['Anna', 'Ben', 'Chloé', 'David', 'Eva', 'Felix', 'Greta', 'Hannah', 'Ivan', 'Jonas', 'Zoë', 'Müller', 'Schmidt']
+
+    def text(length):
+        return ' '.join(rnd.choice(words) for _ in range(length))
+
+    # the components created below, without a cv
+    progress = 0
+    for name in ['academic', 'application', 'organizational']:
+        progress |= Hacker.component_bit(name)
+
+    # without signals, so the derived data is rebuilt afterwards
+    with transaction.atomic():
+        start = User.objects.count()
+        User.objects.bulk_create([User(username='benchmark{}'.format(start + i)) for i in range(count)])
+        users = User.objects.filter(username__startswith='benchmark', hacker=None).values_list('pk', flat=True)
+
+        Hacker.objects.bulk_create([
+            Hacker(
+                profile_id=user, firstName=rnd.choice(names), lastName=rnd.choice(names),
+                email='benchmark{}@example.com'.format(user), gender='Male', race='Hispanic',
+                phoneNumber='+4915112345678', dob=datetime.date(1990, 1, 1), nationality=['DE'],
+                countryOfResidence='DE', jacobsHackTerms=True, mlhCodeOfConduct=True, mlhContestTerms=True,
+                setupProgress=progress,
+            ) for user in users
+        ])
+        hackers = list(Hacker.objects.filter(academic=None).values_list('pk', flat=True))
+
+        AcademicData.objects.bulk_create([
+            AcademicData(hacker_id=pk, degree='bsc', major=text(1), year=2020, school='School ' + rnd.choice(words[:500]))
+            for pk in hackers
+        ])
+        HackathonApplication.objects.bulk_create([
+            HackathonApplication(hacker_id=pk, whyJacobsHack=text(60), whatHaveYouBuilt=text(40))
+            for pk in hackers
+        ])
+        Organizational.objects.bulk_create([
+            Organizational(hacker_id=pk, shirtSize=rnd.choice(['S', 'M', 'L']), comments=text(5))
+            for pk in hackers
+        ])
+
+        search.rebuild_index()
+        statistics.rebuild_statistics()
@@ -0,0 +1,46 @@
+""" The memory and time taken by the XLSX and CSV exports of hackers, which
+write and stream their rows one at a time (see hacker.actions), e.g.
+
+    python -m benchmarks.exports csv_export 10000
+"""
+
+import resource
+import sys
+import time
+
+from benchmarks import setup, populate
+
+setup(database=True)
+
+from django.contrib import admin
+
+from hacker.models import Hacker
+
+HACKERS = 50000
+
+
+def peak_memory():
+    """ Returns the peak resident memory of this process in MiB """
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(action='xslx_export', count=HACKERS):
+    populate(count)
+
+    model_admin = admin.site._registry[Hacker]
+    export = model_admin.get_action(action)[0]
+    last = Hacker.objects.order_by('pk').values_list('pk', flat=True)[count - 1]
+
+    baseline = peak_memory()
+    start = time.perf_counter()
+
+    response = export(model_admin, None, Hacker.objects.filter(pk__lte=last))
+    size = sum(len(chunk) for chunk in response.streaming_content)
+
+    print('{} of {} hackers: {:.1f}s, {:.1f} MiB, peak memory +{:.0f} MiB'.format(
+        action, count, time.perf_counter() - start, size / 2 ** 20, peak_memory() - baseline))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:2], *map(int, sys.argv[2:3]))
@@ -0,0 +1,25 @@
+""" Rendering of forms by as_uikit_form from their per-class layout plan
+(see django_forms_uikit.renderer), compared to the templates it replaced
+(see django_forms_uikit.legacy) """
+
+from benchmarks import setup, timed, report
+
+setup()
+
+from django_forms_uikit import legacy
+from django_forms_uikit.templatetags.uikit_tags import as_uikit_form
+from registry.forms import AcademicForm, HackerForm, RegistrationForm
+
+NUMBER = 200
+
+
+def main():
+    for form_class in [HackerForm, RegistrationForm, AcademicForm]:
+        for (name, render) in [('templates', legacy.render_form), ('plan', as_uikit_form)]:
+            # a new form each time, so that nothing is cached on the form itself
+            forms = [form_class() for _ in range(NUMBER + 1)]
+            report('{} ({})'.format(form_class.__name__, name), timed(lambda: render(forms.pop()), NUMBER))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+""" Searching hackers in the admin through the full-text index of
+hacker.search, compared to the icontains lookups of search_fields """
+
+from benchmarks import setup, populate, timed, report
+
+setup(database=True)
+
+from django.contrib import admin
+from django.db.models import Q
+
+from hacker import search
+from hacker.models import Hacker, HackathonApplication
+
+HACKERS = 50000
+NUMBER = 5
+
+# the fields searched by icontains before the full-text index
+ICONTAINS_FIELDS = [
+    'firstName', 'middleName', 'lastName', 'email', 'academic__school', 'academic__major',
+    'application__whyJacobsHack', 'application__whatHaveYouBuilt', 'organizational__comments',
+]
+
+
+def first_page(queryset):
+    """ Counts the matches and fetches the first page, as the changelist does """
+
+    return (queryset.count(), list(queryset[:100]))
+
+
+def full_text(queryset, query):
+    return first_page(search.search(queryset, query))
+
+
+def icontains(queryset, query):
+    condition = Q()
+    for word in query.split():
+        condition &= Q(**{'{}__icontains'.format(field): word for field in ICONTAINS_FIELDS}, _connector=Q.OR)
+    return first_page(queryset.filter(condition))
+
+
+def main():
+    populate(HACKERS)
+
+    queryset = admin.site._registry[Hacker].get_queryset(None).order_by('-pk')
+    essay = HackathonApplication.objects.values_list('whyJacobsHack', flat=True).first().split()
+    queries = ['schmidt', 'zoe', 'anna mül', essay[3][:4], '{} {}'.format(essay[5], essay[9]), 'nonexistingword']
+
+    for query in queries:
+        (count, _) = full_text(queryset, query)
+        print('{!r} ({} matches)'.format(query, count))
+        report('  full-text', timed(lambda: full_text(queryset, query), NUMBER))
+        report('  icontains', timed(lambda: icontains(queryset, query), NUMBER))
+
+
+if __name__ == '__main__':
+    main()
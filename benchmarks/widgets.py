@@ -0,0 +1,38 @@
+""" Rendering of the forms with country widgets, whose options are rendered
+once per process and language (see hacker.fields.CachedOptionsMixin),
+compared to rendering the widgets without the cached options """
+
+from benchmarks import setup, timed, report
+
+setup()
+
+from django.utils import translation
+
+from django_forms_uikit.templatetags.uikit_tags import as_uikit_form
+from hacker.fields import CachedOptionsMixin
+from registry.forms import HackerForm, RegistrationForm
+
+NUMBER = 50
+
+
+def main():
+    translation.activate('en')
+    initial = {'nationality': ['DE', 'FR'], 'countryOfResidence': 'DE'}
+
+    def countries(cached):
+        form = HackerForm(initial=initial)
+        html = ''
+        for name in ['nationality', 'countryOfResidence']:
+            widget = form.fields[name].widget
+            render = widget.render if cached else super(CachedOptionsMixin, widget).render
+            html += render(name, initial[name])
+        return html
+
+    report('country widgets (uncached)', timed(lambda: countries(False), NUMBER))
+    report('country widgets', timed(lambda: countries(True), NUMBER))
+    report('HackerForm', timed(lambda: as_uikit_form(HackerForm(initial=initial)), NUMBER))
+    report('RegistrationForm', timed(lambda: as_uikit_form(RegistrationForm()), NUMBER))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+""" The template-based renderer of UIkit forms, which django_forms_uikit.renderer
+replaced. It is kept to check that both render the same markup and to
+compare their performance (see benchmarks/forms.py), and is not used
+otherwise. """
+
+from django.template.loader import get_template
+
+from django_forms_uikit.renderer import _get_widget_class
+
+
+def _add_class(widget, cls):
+    if cls is not None:
+        try:
+            widget.attrs["class"] += cls
+        except KeyError:
+            widget.attrs["class"] = cls + " "
+
+
+def _preprocess_fields(form):
+    for afield, field in zip(form, form.fields):
+
+        # add a class for the input element
+        name = form.fields[field].widget.__class__.__name__.lower()
+        _add_class(form.fields[field].widget, _get_widget_class(name))
+
+        # add a class for the validation
+        if afield.errors:
+            _add_class(form.fields[field].widget, 'uk-form-danger')
+
+    return form
+
+
+def render_form(form):
+    """ Renders a form as UIkit markup using the uikit/legacy templates. As
+    the classes are added to the widgets of the form, each form may only be
+    rendered once. """
+
+    form = _preprocess_fields(form)
+    return get_template("uikit/legacy/form.html").render({"form": form})
@@ -0,0 +1,148 @@
+""" A renderer for UIkit forms.
+
+The parts of the markup that only depend on the form class (widget classes,
+which branch of the layout a field uses, label and help texts) are computed
+once per form class in a FormPlan. Rendering a form then only fills in the
+widgets, values and errors.
+"""
+
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+
+
+def _get_widget_class(name):
+    if name.startswith('checkbox'):
+        return 'uk-checkbox'
+    if name.startswith('select') or name.endswith('selectmultiple'):
+        return 'uk-select'
+    if name.startswith('radio'):
+        return 'uk-radio'
+    if name.startswith('textarea'):
+        return 'uk-textarea'
+    return 'uk-input'
+
+
+def _test(test):
+    """ Evaluates test like the 'if' template tag, treating errors as False """
+    try:
+        return test()
+    except Exception:
+        return False
+
+
+def _is_checked(choice, value):
+    """ Checks if a radio choice is selected for the given value """
+
+    return _test(lambda: choice in value) or \
+        _test(lambda: str(choice) in value) or \
+        _test(lambda: str(choice) == str(value))
+
+
+class FieldPlan(object):
+    """ The static parts of the markup of a single field """
+
+    def __init__(self, bound_field):
+        self.name = bound_field.name
+
+        field = bound_field.field
+        widget = field.widget
+        self.css_class = widget.__class__.__name__.lower()
+        self.is_hidden = widget.is_hidden
+
+        # the class of the input element, with and without errors
+        widget_class = _get_widget_class(self.css_class)
+        if 'class' in widget.attrs:
+            self.widget_class = widget.attrs['class'] + widget_class
+        else:
+            self.widget_class = widget_class + ' '
+        self.error_class = self.widget_class + 'uk-form-danger'
+
+        if bound_field.label:
+            self.label = format_html('{} {}', mark_safe(bound_field.label), '*' if field.required else '')
+        else:
+            self.label = None
+
+        self.help_text = mark_safe(bound_field.help_text)
+
+    def render(self, bound_field):
+        # set the class of the input element
+        errors = bound_field.errors
+        bound_field.field.widget.attrs['class'] = self.error_class if errors else self.widget_class
+
+        if self.is_hidden:
+            return str(bound_field)
+
+        auto_id = bound_field.auto_id
+        if self.label is not None:
+            label = format_html('<label for="{}" class="uk-form-label">\n{}\n</label>\n', auto_id, self.label)
+        else:
+            label = ''
+        error_html = format_html_join('', '<div class="uk-alert-danger" id="error_{}_{}" uk-alert>{}</div>\n', (
+            (auto_id, i, error) for (i, error) in enumerate(errors, start=1)
+        ))
+
+        css_classes = bound_field.css_classes()
+        html = format_html('<div id="div_{}" class="{}">\n{}', auto_id, ' ' + css_classes if css_classes else '', label)
+
+        if self.css_class == 'checkboxinput':
+            html += format_html(
+                '<div class="uk-form-controls uk-form-controls-text">\n{}\n{}\n</div>\n'
+                '<div class="uk-form-controls uk-form-controls-text">\n{}<p></p>\n</div>\n',
+                bound_field, self.help_text, error_html,
+            )
+        elif self.css_class == 'radioselect':
+            value = bound_field.value()
+            choices = format_html_join('', (
+                '<label>\n<input class="uk-radio" type="radio" name="{}" id="id_{}_{}" value="{}"{}>\n{}\n</label>\n<br/>\n'
+            ), (
+                (bound_field.html_name, bound_field.html_name, i, choice, mark_safe(' checked="checked"') if _is_checked(choice, value) else '', label)
+                for (i, (choice, label)) in enumerate(bound_field.field.choices, start=1)
+            ))
+
+            # the closing tag of the outer div is duplicated for radio buttons
+            html += format_html(
+                '<div class="uk-form-controls uk-form-controls-text">\n{}</div>\n'
+                '<div class="uk-form-controls uk-form-controls-text">\n{}<p>{}</p>\n</div>\n'
+                '</div>\n',
+                choices, error_html, self.help_text,
+            )
+        else:
+            html += format_html(
+                '<div class="uk-form-controls uk-form-controls-text">\n{}\n</div>\n'
+                '<div class="uk-form-controls uk-form-controls-text">\n{}<p>{}</p>\n</div>\n',
+                bound_field, error_html, self.help_text,
+            )
+
+        return html + mark_safe('</div>\n')
+
+
+class FormPlan(object):
+    """ The static parts of the markup of a form class """
+
+    def __init__(self, form):
+        self.fields = [FieldPlan(bound_field) for bound_field in form]
+
+    def render(self, form):
+        html = ''
+
+        errors = form.non_field_errors()
+        if errors:
+            html = format_html(
+                '<div class="uk-alert uk-alert-danger">\n{}\n</div>\n',
+                errors[0] if len(errors) == 1 else errors,
+            )
+
+        return html + mark_safe(''.join(plan.render(form[plan.name]) for plan in self.fields))
+
+
+_plans = {}
+
+
+def render_form(form):
+    """ Renders a form as UIkit markup """
+
+    cls = form.__class__
+    if cls not in _plans:
+        _plans[cls] = FormPlan(form)
+
+    return _plans[cls].render(form)
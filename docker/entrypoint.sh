@@ -1,11 +1,19 @@
 #!/bin/sh
 
+# Start the cache shared between all workers
+memcached -d -u nobody -l 127.0.0.1 -p 11211 -m "$DJANGO_CACHE_MEMORY"
+
 # Update static files
 python manage.py collectstatic --noinput
 
 # Run Migrations
 python manage.py migrate --noinput
 
+# Move cvs to content-addressed storage (once they are, this only checks
+# their names). The old files are not removed here, see 'cleancvs' in the
+# README.
+python manage.py migratecvs
+
 # If a parameter is given, run a manage.py command
 # e.g. run 'createsuperuser' to create a super user
 #if ! [ -z "$1" ]; then
@@ -14,8 +22,20 @@ python manage.py migrate --noinput
 #fi;
 
 
+# Share the secret of signed cv urls with nginx
+if [ -z "$DJANGO_CV_SIGNING_SECRET" ]; then
+    export DJANGO_CV_SIGNING_SECRET="$(head -c 32 /dev/urandom | od -An -tx1 | tr -d ' \n')"
+fi;
+echo "set \$cv_signing_secret \"$DJANGO_CV_SIGNING_SECRET\";" > /etc/nginx/cv_signing_secret.conf
+
+# Start the worker running background jobs
+python manage.py runjobs --concurrency "$DJANGO_JOB_CONCURRENCY" &
+
 # Start gunicorn for wsgi on localhost:8000
-gunicorn ApplicationPortal.wsgi:application --bind 127.0.0.1:8000 &
+# (with threads, as a single synchronous worker would serve nothing else
+# during a streamed download or upload, and would be killed by the worker
+# timeout during one that takes longer than it)
+gunicorn ApplicationPortal.wsgi:application --bind 127.0.0.1:8000 --worker-class gthread --threads 4 &
 
 # Run nginx with django configuration
 nginx -c /etc/nginx/django.conf
\ No newline at end of file
@@ -1,56 +1,178 @@
-import unicodecsv
+import csv
+import itertools
+import os
+import pickle
+import tempfile
+import zipfile
+
 import openpyxl
 
-from django.core.exceptions import ObjectDoesNotExist
-from django.http import HttpResponse
+from django.apps import apps
+from django.contrib import messages
+from django.http import FileResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.html import format_html
 
 from openpyxl import styles
-from openpyxl.cell import cell
+from openpyxl.cell import cell, WriteOnlyCell
+from openpyxl.utils import get_column_letter
 
-def get_direct_prop(obj, fields):
-    """ Gets a model property of an object """
+from hacker.jobs import enqueue, job
+from hacker.labels import get_path_labels
 
-    # shouldn't happen, but whatever
-    if len(fields) == 0:
-        return obj
+class Echo(object):
+    """ A file-like object returning everything written to it, so that a csv
+    writer returns each line instead of buffering it """
 
-    # if we have a single field to get
-    elif len(fields) == 1:
-        field = fields[0]
+    def write(self, value):
+        return value
 
-        # we may have a display getter
-        try:
-            display_getter = 'get_{}_display'.format(field)
-            if hasattr(obj, display_getter):
-                return getattr(obj, display_getter)()
-        except:
-            pass
 
-        #if we do not, return the field itself
-        return getattr(obj, field)
+def get_export_fields(model, fields):
+    """ Returns the field names to export, defaulting to all fields """
 
-    # else go recursively
-    else:
-        return get_direct_prop(getattr(obj, fields[0]), fields[1:])
+    if not fields:
+        return [field.name for field in model._meta.fields]
+    return fields
+
+
+def convert_rows(model, field_names, rows):
+    """ Converts rows of raw values of the given fields into values
+    understood by excel (and csv) """
+
+    converters = [get_excel_converter(model, field) for field in field_names]
+
+    for row in rows:
+        yield [convert(c) for (convert, c) in zip(converters, row)]
+
+
+def generate_csv(model, field_names, rows, header=True, chunk_size=2000):
+    """ Generates an encoded CSV file of the given rows of raw values, one
+    chunk of rows at a time """
 
+    writer = csv.writer(Echo())
 
-def get_model_prop(modeladmin, obj, field, default=None):
-    """ Gets a model property or None"""
-    try:
-        try:
-            return get_direct_prop(obj, field.split("__"))
-        except AttributeError:
+    # Write the header
+    if header:
+        yield writer.writerow(field_names).encode('utf-8')
+
+    # Write the content rows
+    rows = convert_rows(model, field_names, rows)
+    while True:
+        chunk = [writer.writerow(row) for row in itertools.islice(rows, chunk_size)]
+        if not chunk:
+            break
+        yield ''.join(chunk).encode('utf-8')
+
+
+def write_xslx(output, model, field_names, rows, header=True, heartbeat=None):
+    """ Writes an XSLX file of the given rows of raw values to output.
+    heartbeat (if given) is called after each row written once all rows
+    have been read, so that a job can show it is still running. """
+
+    # Spool the converted rows to a temporary file, estimating the width of
+    # each column on the way
+    spool = tempfile.TemporaryFile()
+    widths = [len(field) if header else 0 for field in field_names]
+    for values in convert_rows(model, field_names, rows):
+        for (i, value) in enumerate(values):
+            if value is not None:
+                widths[i] = max(widths[i], len(str(value)))
+        pickle.dump(values, spool, pickle.HIGHEST_PROTOCOL)
+
+    # Create a new write-only workbook, which writes each row to disk
+    # as soon as it is appended. The column widths have to be set first.
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(str(model._meta).replace('.', '_'))
+    for (i, width) in enumerate(widths):
+        ws.column_dimensions[get_column_letter(i + 1)].width = (width + 2) * 1.2
+
+    # Write the header (if desired)
+    if header:
+        def makeHeaderCell(field):
+            c = WriteOnlyCell(ws, value=field)
+            c.font = styles.Font(bold=True)
+            return c
+        ws.append([makeHeaderCell(field) for field in field_names])
+
+    # Write each of the spooled rows
+    with spool:
+        spool.seek(0)
+        while True:
             try:
-                attr = getattr(modeladmin, field)
-                return attr(obj)
-            except AttributeError:
-                return default
-    except ObjectDoesNotExist:
-        return default
+                ws.append(pickle.load(spool))
+            except EOFError:
+                break
+            if heartbeat is not None:
+                heartbeat()
+
+    wb.save(output)
+
+
+class ZipBuffer(object):
+    """ An unseekable file-like object collecting everything written to it
+    until it is taken, so that a zip file can be generated while it is
+    written """
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, value):
+        self.chunks.append(bytes(value))
+        return len(value)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        value = b''.join(self.chunks)
+        self.chunks = []
+        return value
+
+
+def generate_zip(files, chunk_size=64 * 1024):
+    """ Generates a ZIP file of the given (name, path) pairs, reading one
+    chunk of a file at a time. Entries are stored uncompressed, and files
+    missing on disk are left out. """
+
+    output = ZipBuffer()
+
+    # as output cannot seek, the sizes and checksum of each entry follow it
+    with zipfile.ZipFile(output, 'w', zipfile.ZIP_STORED) as archive:
+        for (name, path) in files:
+            if not os.path.isfile(path):
+                continue
+
+            info = zipfile.ZipInfo.from_file(path, name)
+            with open(path, 'rb') as file, archive.open(info, 'w') as entry:
+                for chunk in iter(lambda: file.read(chunk_size), b''):
+                    entry.write(chunk)
+                    yield output.take()
+            yield output.take()
+
+    yield output.take()
+
+
+def export_as_zip_action(description, files, filename='files.zip'):
+    """
+        Return an action that streams a ZIP file of the files returned by
+        files(queryset), an iterable of (name, path) pairs
+    """
+
+    def export_as_zip(modeladmin, request, queryset):
+        response = StreamingHttpResponse(generate_zip(files(queryset)), content_type='application/zip')
+        response['Content-Disposition'] = 'attachment; filename={}'.format(filename)
+        return response
+
+    export_as_zip.short_description = description
+    return export_as_zip
+
+
+XSLX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
 
 
 def export_as_csv_action(description="Export selected objects as CSV file",
-                         fields=None, header=True):
+                         fields=None, header=True, chunk_size=2000):
     """
         Return an action that exports the given fields as CSV files
     """
@@ -59,35 +181,23 @@ def export_as_csv_action(description="Export selected objects as CSV file",
 
         # Get fields to export
         opts = modeladmin.model._meta
-        if not fields:
-            field_names = [field.name for field in opts.fields]
-        else:
-            field_names = fields
-
-        # write a response header
-        response = HttpResponse(content_type='text/csv')
+        field_names = get_export_fields(modeladmin.model, fields)
+
+        # Read the rows with a (server-side) cursor, and return a response
+        # generating the file while it is sent
+        rows = queryset.values_list(*field_names).iterator(chunk_size=chunk_size)
+        response = StreamingHttpResponse(
+            generate_csv(modeladmin.model, field_names, rows, header=header, chunk_size=chunk_size),
+            content_type='text/csv; charset=utf-8')
         response['Content-Disposition'] = 'attachment; filename=%s.csv' % str(
             opts).replace('.', '_')
-
-        # Create a CSV file
-        writer = unicodecsv.writer(response, encoding='utf-8')
-
-        # Write the header
-        if header:
-            writer.writerow(field_names)
-
-        # Write the content rows
-        for row in queryset.values_list(*field_names):
-            writer.writerow(row)
-
-        # And return
         return response
 
     export_as_csv.short_description = description
     return export_as_csv
 
 def to_excel(value):
-    """ Turns any value into a value understood by excel """
+    """ Turns any value into a value understood by excel, never failing """
 
     # if we know the type, return it immediatly
     if isinstance(value, cell.KNOWN_TYPES):
@@ -99,15 +209,33 @@ def to_excel(value):
 
     # if we are a list, return the list
     elif isinstance(value, list):
-        return ', '.join(map(to_excel, value))
+        return ', '.join(str(to_excel(v)) for v in value)
 
     # fallback to string
     else:
         return str(value)
 
 
+def get_excel_converter(model, field):
+    """ Returns a function turning values of the given field (path) into
+    values understood by excel, using the labels of choices-backed fields """
+
+    labels = get_path_labels(model, field)
+    if labels is None:
+        return to_excel
+
+    def convert(value):
+        if isinstance(value, list):
+            return ', '.join(labels[v] if v in labels else str(to_excel(v)) for v in value)
+        elif value in labels:
+            return labels[value]
+        return to_excel(value)
+
+    return convert
+
+
 def export_as_xslx_action(description="Export selected objects as XSLX file",
-                          fields=None, header=True):
+                          fields=None, header=True, chunk_size=2000):
     """
     Return an action that exports the given fields as XSLX files
     """
@@ -116,55 +244,81 @@ def export_as_xslx_action(description="Export selected objects as XSLX file",
 
         # get fields to export
         opts = modeladmin.model._meta
-        if not fields:
-            field_names = [field.name for field in opts.fields]
-        else:
-            field_names = fields
+        field_names = get_export_fields(modeladmin.model, fields)
 
-        # Create a response header
-        response = HttpResponse(
-            content_type='application/application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-        response['Content-Disposition'] = 'attachment; filename={}.xlsx'.format(str(opts).replace('.', '_'))
+        # Read all rows with a (server-side) cursor and write them into a
+        # temporary file, then stream that
+        rows = queryset.values_list(*field_names).iterator(chunk_size=chunk_size)
+        output = tempfile.TemporaryFile()
+        write_xslx(output, modeladmin.model, field_names, rows, header=header)
+        output.seek(0)
 
-        # Create a new workbook
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = str(opts).replace('.', '_')
-
-        # Write the header (if desired)
-        if header:
-            def makeHeaderCell(field):
-                c = cell.Cell(ws, value=field)
-                c.font = styles.Font(bold=True)
-                return c
-            ws.append([makeHeaderCell(field) for field in field_names])
-
-        # Write each of the rows
-        for row in queryset.values_list(*field_names):
-            def makeCell(prop):
-                try:
-                    return to_excel(prop)
-                except:
-                    return str(prop)
-            ws.append([makeCell(c) for c in row])
-
-        # adjust column widths
-        # adapted from https://stackoverflow.com/a/39530676
-        for col in ws.columns:
-            max_length = 0
-            column = col[0].column  # Get the column name
-            for c in col:
-                try:
-                    if len(str(c.value)) > max_length:
-                        max_length = len(c.value)
-                except:
-                    pass
-            adjusted_width = (max_length + 2) * 1.2
-            ws.column_dimensions[column].width = adjusted_width
-
-        # and export
-        wb.save(response)
+        response = FileResponse(output, content_type=XSLX_CONTENT_TYPE)
+        response['Content-Disposition'] = 'attachment; filename={}.xlsx'.format(str(opts).replace('.', '_'))
         return response
 
     export_as_xslx.short_description = description
     return export_as_xslx
+
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+
+
+@job('hacker.export')
+def export_job(job, model, fields, ids, format, header=True, chunk_size=500):
+    """ Exports the given fields of the objects with the given ids (in that
+    order) into the result file of a job """
+
+    if format not in EXPORT_FORMATS:
+        raise ValueError('Unsupported export format {!r}'.format(format))
+
+    model = apps.get_model(model)
+    queryset = model._default_manager.all()
+
+    def generate_rows():
+        job.report(0, len(ids))
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            rows = {row[0]: row[1:] for row in queryset.filter(pk__in=chunk).values_list('pk', *fields)}
+            for pk in chunk:
+                if pk in rows:
+                    yield rows[pk]
+            job.report(start + len(chunk))
+
+    with tempfile.TemporaryFile() as output:
+        if format == 'csv':
+            for chunk in generate_csv(model, fields, generate_rows(), header=header):
+                output.write(chunk)
+        else:
+            write_xslx(output, model, fields, generate_rows(), header=header, heartbeat=job.heartbeat)
+        output.seek(0)
+        job.save_result('{}_{}.{}'.format(str(model._meta).replace('.', '_'), job.pk, format), output)
+
+    return 'Exported {} object(s). '.format(len(ids))
+
+
+def export_in_background_action(format, description=None, fields=None, job_name='hacker.export', **arguments):
+    """
+    Return an action that queues a job (registered as job_name) exporting
+    the given fields in the given format
+    """
+
+    def export_in_background(modeladmin, request, queryset):
+        opts = modeladmin.model._meta
+        field_names = get_export_fields(modeladmin.model, fields)
+
+        ids = list(queryset.values_list('pk', flat=True))
+        export = enqueue(
+            job_name, user=request.user,
+            description='Export of {} {} as {}'.format(len(ids), opts.verbose_name_plural, format.upper()),
+            model=opts.label, fields=list(field_names), ids=ids, format=format, **arguments
+        )
+
+        modeladmin.message_user(request, format_html(
+            'Queued the export as <a href="{}">{}</a>. The file can be downloaded from there once it is done. ',
+            reverse('admin:hacker_job_change', args=[export.pk]), export,
+        ), messages.SUCCESS)
+
+    export_in_background.short_description = description or \
+        "Export selected objects as {} file (in the background)".format(format.upper())
+    return export_in_background
@@ -1,8 +1,33 @@
-from django.contrib import admin
-
-from hacker.actions import export_as_xslx_action
+import collections
+import datetime
+import mimetypes
+
+from django.contrib import admin, messages
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR
+from django.db import transaction
+from django.db.models import Case, CharField, Value, When
+from django.db.models.functions import Concat
+from django.core.exceptions import PermissionDenied
+from django.http import Http404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.html import format_html
+from django.utils.http import urlencode
+
+from hacker import search, statistics
+from hacker.actions import export_as_csv_action, export_as_xslx_action, export_as_zip_action, \
+    export_in_background_action
+from hacker.changelist import HackerChangeList
+from hacker.columnar import COLUMNAR_FORMATS, export_columns_action
+from hacker.facets import FacetEngine
+from hacker.hooks import hackers_changed
+from hacker.labels import get_label, get_path_labels
+from registry.views.cv import serve_file
 from .models import Hacker, HackathonApplication, \
-    AcademicData, Approval, Organizational, CV, RSVP
+    AcademicData, Approval, Organizational, CV, RSVP, Job, Tombstone
 
 class HackerApprovalInline(admin.StackedInline):
     model = Approval
@@ -24,27 +49,148 @@ class HackerOrganizationalInline(admin.StackedInline):
 class HackerCVIncline(admin.StackedInline):
     model = CV
 
-class SetupCompleted(admin.SimpleListFilter):
+    def get_readonly_fields(self, request, obj=None):
+        # signed urls skip the permission check of registry.views.cv
+        if request.user.is_superuser:
+            return ('download',)
+        return ()
+
+    def download(self, x):
+        if x.has_cv:
+            return format_html('<a href="{}">Download</a>', x.download_url)
+        return '-'
+    download.short_description = 'Download'
+
+class FacetListFilter(admin.FieldListFilter):
+    """ A list filter showing the number of hackers for the most common values
+    of a field, along with a search box for the remaining ones. The counts
+    are provided by HackerAdmin.get_facet_counts. """
+
+    template = 'admin/hacker/facet_filter.html'
+
+    # the number of values shown without searching
+    top = 10
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = field_path
+        self.lookup_kwarg_isnull = '%s__isnull' % field_path
+        self.search_kwarg = '%s__facet' % field_path
+        self.lookup_val = params.get(self.lookup_kwarg)
+        self.lookup_val_isnull = params.get(self.lookup_kwarg_isnull)
+        self.search = params.get(self.search_kwarg, '')
+        self.labels = get_path_labels(model, field_path)
+        self.empty_value_display = model_admin.get_empty_value_display()
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+        # the search only narrows down the choices, not the hackers
+        self.used_parameters.pop(self.search_kwarg, None)
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg, self.lookup_kwarg_isnull, self.search_kwarg]
+
+    def display(self, value):
+        if value is None:
+            return self.empty_value_display
+        if self.labels is not None and value in self.labels:
+            return self.labels[value]
+        if isinstance(value, bool):
+            return 'Yes' if value else 'No'
+        return str(value)
+
+    def choices(self, changelist):
+        counts = changelist.model_admin.get_facet_counts(changelist).get(self.field_path)
+
+        # parameters to keep when searching
+        self.searchable = len(counts) > self.top
+        self.search_params = [(k, v) for (k, v) in changelist.params.items() if k not in (self.search_kwarg, PAGE_VAR)]
+
+        if self.search:
+            needle = self.search.casefold()
+            counts = [(value, count) for (value, count) in counts if needle in self.display(value).casefold()]
+        self.more = max(len(counts) - self.top, 0)
+
+        yield {
+            'selected': self.lookup_val is None and self.lookup_val_isnull is None,
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull, self.search_kwarg]),
+            'display': 'All',
+        }
+
+        for (value, count) in counts[:self.top]:
+            display = '{} ({})'.format(self.display(value), count)
+            if value is None:
+                yield {
+                    'selected': bool(self.lookup_val_isnull),
+                    'query_string': changelist.get_query_string({self.lookup_kwarg_isnull: 'True'}, [self.lookup_kwarg, self.search_kwarg]),
+                    'display': display,
+                }
+            else:
+                yield {
+                    'selected': self.lookup_val == str(value),
+                    'query_string': changelist.get_query_string({self.lookup_kwarg: str(value)}, [self.lookup_kwarg_isnull, self.search_kwarg]),
+                    'display': display,
+                }
+
+
+class FacetCountsMixin(object):
+    """ Adds the number of hackers to each lookup of a SimpleListFilter """
+
+    # the dimension of HackerAdmin.facet_engine to count
+    facet_dimension = None
+
+    def get_lookup_counts(self, counts):
+        """ Returns a dict mapping each lookup to the number of hackers,
+        given a dict mapping each value of facet_dimension to its count. By
+        default, a lookup counts the hackers with the value it is the string
+        of, e.g. 'True' for True. """
+
+        lookup_counts = collections.Counter()
+        for (value, count) in counts.items():
+            lookup_counts[str(value)] += count
+        return lookup_counts
+
+    def choices(self, changelist):
+        counts = changelist.model_admin.get_facet_counts(changelist).get(self.facet_dimension)
+        lookup_counts = self.get_lookup_counts(dict(counts))
+
+        choices = super().choices(changelist)
+        yield next(choices)
+        for ((lookup, title), choice) in zip(self.lookup_choices, choices):
+            choice['display'] = '{} ({})'.format(choice['display'], lookup_counts.get(lookup, 0))
+            yield choice
+
+
+class SetupCompleted(FacetCountsMixin, admin.SimpleListFilter):
+    """ Filters hackers by whether they have set up all components (see
+    Hacker.setupProgress). This used to check for the organizational data
+    only, the last step of the setup, which hackers that skipped or deleted
+    an earlier component also have. """
+
     title = 'Setup Status'
     parameter_name = 'completed'
+    facet_dimension = 'setupProgress'
     
     def lookups(self, request, modeladmin):
         return [
             ('1', 'Completed'), 
             ('0', 'Incomplete')
         ]
+
+    def get_lookup_counts(self, counts):
+        completed = counts.get(Hacker.setup_completed_mask(), 0)
+        return {'1': completed, '0': sum(counts.values()) - completed}
     
     def queryset(self, request, queryset):
         if self.value() == '1':
-            return queryset.filter(organizational__isnull=False)
+            return queryset.filter(setupProgress=Hacker.setup_completed_mask())
         elif self.value() == '0':
-            return queryset.filter(organizational__isnull=True)
+            return queryset.exclude(setupProgress=Hacker.setup_completed_mask())
         else:
             return queryset
 
-class ApprovalFilter(admin.SimpleListFilter):
+class ApprovalFilter(FacetCountsMixin, admin.SimpleListFilter):
     title = 'Approval'
     parameter_name = 'approval'
+    facet_dimension = 'approval__approval'
     
     def lookups(self, request, modeladmin):
         return [
@@ -52,6 +198,9 @@ class ApprovalFilter(admin.SimpleListFilter):
             ('false', 'Rejected'),
             ('null',  'Pending')
         ]
+
+    def get_lookup_counts(self, counts):
+        return {'true': counts.get(True, 0), 'false': counts.get(False, 0), 'null': counts.get(None, 0)}
     
     def queryset(self, request, queryset):
         if self.value() == 'true':
@@ -64,6 +213,70 @@ class ApprovalFilter(admin.SimpleListFilter):
             return queryset
 
 
+class ChangedSinceFilter(admin.SimpleListFilter):
+    """ Filters objects changed since a given time, i.e. a watermark of an
+    incremental export. Besides the listed choices, the parameter accepts
+    any ISO date or datetime, e.g. ?changed_since=2018-10-01T12:00:00Z. """
+
+    title = 'Changed'
+    parameter_name = 'changed_since'
+
+    # the modification time of the objects
+    field_name = 'updatedAt'
+
+    intervals = [
+        ('1d', 'In the last 24 hours', datetime.timedelta(days=1)),
+        ('7d', 'In the last 7 days', datetime.timedelta(days=7)),
+        ('30d', 'In the last 30 days', datetime.timedelta(days=30)),
+    ]
+
+    # the watermarks of the intervals are rounded down to a multiple of this,
+    # so that the facet counts cached for them can be re-used in between
+    # (see HackerAdmin.get_facet_counts)
+    interval_step = datetime.timedelta(minutes=5)
+
+    def lookups(self, request, model_admin):
+        return [(value, title) for (value, title, _) in self.intervals]
+
+    def get_watermark(self):
+        """ Returns the time given by the value of this filter """
+
+        value = self.value()
+        for (name, _, interval) in self.intervals:
+            if value == name:
+                watermark = timezone.now() - interval
+                return watermark - (watermark - datetime.datetime.min.replace(tzinfo=watermark.tzinfo)) % self.interval_step
+
+        try:
+            watermark = parse_datetime(value)
+            if watermark is None:
+                date = parse_date(value)
+                if date is not None:
+                    watermark = datetime.datetime.combine(date, datetime.time.min)
+        except ValueError:
+            watermark = None
+        if watermark is None:
+            raise IncorrectLookupParameters('Invalid watermark {!r}'.format(value))
+
+        if timezone.is_naive(watermark):
+            watermark = timezone.make_aware(watermark)
+        return watermark
+
+    def queryset(self, request, queryset):
+        if self.value() is None:
+            return queryset
+        return queryset.filter(**{'{}__gte'.format(self.field_name): self.get_watermark()})
+
+
+def cv_files(hackers):
+    """ Generates the filename and the path of the uploaded CV of each of
+    the given hackers, for HackerAdmin.cv_zip_export """
+
+    cvs = CV.objects.filter(hacker__in=hackers.values('pk')).exclude(cv='').exclude(cv=None)
+    for cv in cvs.select_related('hacker__profile').order_by('hacker__profile__username').iterator(chunk_size=500):
+        yield (cv.filename, cv.cv.path)
+
+
 class HackerAdmin(admin.ModelAdmin):
     inlines = [
         HackerApprovalInline,
@@ -75,10 +288,20 @@ class HackerAdmin(admin.ModelAdmin):
     ]
 
     # Fields that should be searchable
+    # (used only where the database does not support hacker.search)
     search_fields = [
         'firstName', 'middleName', 'lastName', 'email', 'academic__school',
     ]
 
+    def get_search_results(self, request, queryset, search_term):
+        """ Searches the full-text index of hackers, ordering the results by
+        relevance unless another order was picked """
+
+        if not search_term or search.get_backend() is None:
+            return super().get_search_results(request, queryset, search_term)
+
+        return search.search(queryset, search_term, ranked=ORDER_VAR not in request.GET), False
+
     # Fields that are displayed in the admin view
     list_display = (
         # basic information
@@ -89,17 +312,87 @@ class HackerAdmin(admin.ModelAdmin):
         'shirtSize', 'needVisa', 'needReimbursement'
     )
 
+    # Relations used by list_display, fetched along with each hacker
+    list_select_related = ('profile', 'approval', 'rsvp', 'academic', 'organizational', 'cv')
+
+    def get_list_display(self, request):
+        # signed urls skip the permission check of registry.views.cv
+        if request.user.is_superuser:
+            return self.list_display + ('cvLink',)
+        return self.list_display
+
     # Fields that can be dynamically filtered for
     list_filter = (
-        ApprovalFilter, 'rsvp__going', SetupCompleted, 
+        ChangedSinceFilter,
+
+        ApprovalFilter, ('rsvp__going', FacetListFilter), SetupCompleted, 
 
-        'academic__school', 'academic__degree', 'academic__year',
+        ('academic__school', FacetListFilter), ('academic__degree', FacetListFilter),
+        ('academic__year', FacetListFilter),
 
-        'application__firstHackathon',
+        ('application__firstHackathon', FacetListFilter),
+
+        ('organizational__shirtSize', FacetListFilter), ('organizational__needVisa', FacetListFilter),
+        ('organizational__needReimbursement', FacetListFilter),
+    )
 
-        'organizational__shirtSize', 'organizational__needVisa', 'organizational__needReimbursement',
+    # Counts for all of the filters above
+    facet_engine = FacetEngine(
+        [ApprovalFilter.facet_dimension, SetupCompleted.facet_dimension] +
+        [path for (path, _) in [f for f in list_filter if isinstance(f, tuple)]]
     )
 
+    def get_facet_counts(self, changelist, root=False):
+        """ Returns the facet counts of the hackers shown in a changelist, or
+        of all hackers if root is True """
+
+        attr = '_root_facet_counts' if root else '_facet_counts'
+        if not hasattr(changelist, attr):
+            if root:
+                (queryset, key) = (changelist.root_queryset, '')
+            else:
+                queryset = changelist.queryset
+                params = dict(changelist.params)
+
+                # relative watermarks select other hackers as time passes
+                for spec in changelist.filter_specs:
+                    if isinstance(spec, ChangedSinceFilter) and spec.value() is not None:
+                        params[spec.parameter_name] = spec.get_watermark().isoformat()
+
+                key = urlencode(sorted(
+                    (k, v) for (k, v) in params.items()
+                    if k not in (PAGE_VAR, ORDER_VAR) and not k.endswith('__facet')
+                ))
+            setattr(changelist, attr, self.facet_engine.get_counts(queryset, key))
+
+        return getattr(changelist, attr)
+
+    def get_changelist(self, request, **kwargs):
+        return HackerChangeList
+
+    # Statistics page (linked from admin/hacker/hacker/change_list.html),
+    # reading the counts maintained by hacker.statistics
+    def get_urls(self):
+        return [
+            path('statistics/', self.admin_site.admin_view(self.statistics_view), name='hacker_hacker_statistics'),
+        ] + super().get_urls()
+
+    def statistics_view(self, request):
+        """ Shows the number of hackers by segment for each dimension of
+        hacker.statistics, without reading any hackers """
+
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title='Statistics',
+            segments=[title for (_, title, _) in statistics.SEGMENTS],
+            tables=statistics.get_tables(),
+        )
+        return TemplateResponse(request, 'admin/hacker/statistics.html', context)
+
     # List of all fields, for the xslx export
 
     full_export_fields = (
@@ -141,38 +434,102 @@ class HackerAdmin(admin.ModelAdmin):
         actions = super(HackerAdmin, self).get_actions(request)
         if 'delete_selected' in actions:
             del actions['delete_selected']
+        # parquet files need pyarrow
+        if 'parquet' not in COLUMNAR_FORMATS:
+            actions.pop('parquet_export_job', None)
+        # only superusers may download cvs, see registry.views.cv
+        if not request.user.is_superuser:
+            actions.pop('cv_zip_export', None)
         return actions
 
 
     xslx_export = export_as_xslx_action("Export as XSLX",
                                         fields=full_export_fields)
+    csv_export = export_as_csv_action("Export as CSV",
+                                      fields=full_export_fields)
+
+    # the same, but run by a background job (see hacker.jobs)
+    xslx_export_job = export_in_background_action('xlsx', "Export as XSLX (in the background)",
+                                                  fields=full_export_fields)
+    csv_export_job = export_in_background_action('csv', "Export as CSV (in the background)",
+                                                 fields=full_export_fields)
+
+    # column-wise exports for analysis, see hacker.columnar
+    ndjson_export_job = export_columns_action('ndjson', "Export as NDJSON (in the background)",
+                                              fields=full_export_fields)
+    csv_gz_export_job = export_columns_action('csv.gz', "Export as CSV.gz (in the background)",
+                                              fields=full_export_fields)
+    parquet_export_job = export_columns_action('parquet', "Export as Parquet (in the background)",
+                                               fields=full_export_fields)
+
+    # the cvs themselves, streamed as a single file
+    cv_zip_export = export_as_zip_action("Download CVs as ZIP", cv_files, filename='cvs.zip')
     
     # Approval and rejection options
-    def approve_hacker(modeladmin, request, queryset):
-        for hacker in queryset:
-            (approval, created) = Approval.objects.get_or_create(hacker=hacker)
-            approval.approval = True
-            approval.save()
+    def set_approval(self, request, queryset, approval, chunk_size=500):
+        """ Sets the approval of the selected hackers to approval, or makes
+        them pending if approval is None. Runs a constant number of queries
+        per chunk of chunk_size hackers (as the ids of each are sent as query
+        parameters, which e.g. SQLite limits) in a single transaction and
+        reports how many hackers were in each state before. """
+
+        with transaction.atomic():
+            (hacker_ids, previous, changed) = ([], {}, [])
+            selected = sorted(queryset.order_by().values_list('pk', flat=True))
+
+            for start in range(0, len(selected), chunk_size):
+                # lock the hackers (in a fixed order), so that concurrent changes
+                # of their approvals wait for this one instead of conflicting
+                chunk = list(Hacker.objects.filter(pk__in=selected[start:start + chunk_size]).order_by('pk').select_for_update().values_list('pk', flat=True))
+
+                approvals = dict(Approval.objects.filter(hacker_id__in=chunk).values_list('hacker_id', 'approval'))
+                if approval is None:
+                    # a single DELETE, without collecting and signalling each approval
+                    chunk_changed = list(approvals.keys())
+                    Approval.objects.filter(hacker_id__in=chunk_changed)._raw_delete(Approval.objects.db)
+                else:
+                    chunk_changed = [pk for (pk, value) in approvals.items() if value != approval]
+                    Approval.objects.filter(hacker_id__in=chunk_changed).update(approval=approval, updatedAt=timezone.now())
+                    pending = [pk for pk in chunk if pk not in approvals]
+                    Approval.objects.bulk_create(Approval(hacker_id=pk, approval=approval) for pk in pending)
+                    chunk_changed += pending
+
+                hacker_ids += chunk
+                previous.update(approvals)
+                changed += chunk_changed
+
+            # the signals that would otherwise take care of this were not sent
+            hackers_changed(changed, 'approval')
+
+        pending = [pk for pk in hacker_ids if pk not in previous]
+        counts = collections.Counter(previous.values())
+        states = [(True, 'accepted'), (False, 'rejected'), (None, 'pending')]
+        self.message_user(request, '{} of {} application(s) changed. Previously {}. '.format(
+            len(changed), len(hacker_ids),
+            ', '.join('{} {}'.format(len(pending) if value is None else counts[value], name) for (value, name) in states)
+        ), messages.SUCCESS)
+
+    def approve_hacker(self, request, queryset):
+        self.set_approval(request, queryset, True)
     approve_hacker.short_description = "Approve Application(s)"
     
-    def reject_hacker(modeladmin, request, queryset):
-        for hacker in queryset:
-            (approval, created) = Approval.objects.get_or_create(hacker=hacker)
-            approval.approval = False
-            approval.save()
+    def reject_hacker(self, request, queryset):
+        self.set_approval(request, queryset, False)
     reject_hacker.short_description = "Reject Application(s)"
 
-    def autopend_hackers(modeladmin, request, queryset):
-        for hacker in queryset:
-            try:
-                hacker.approval.delete()
-            except Approval.DoesNotExist:
-                pass
+    def autopend_hackers(self, request, queryset):
+        self.set_approval(request, queryset, None)
     autopend_hackers.short_description = "Pendify Applications(s)"
 
     actions = [
         'xslx_export',
         'csv_export',
+        'xslx_export_job',
+        'csv_export_job',
+        'ndjson_export_job',
+        'csv_gz_export_job',
+        'parquet_export_job',
+        'cv_zip_export',
 
         'approve_hacker',
         'reject_hacker',
@@ -183,6 +540,16 @@ class HackerAdmin(admin.ModelAdmin):
         return x.fullName
     fullName.short_description = 'Full Name'
 
+    # the full name as computed by Hacker.fullName, to sort by. This is an
+    # expression rather than an annotation in get_queryset, so that counting
+    # the hackers does not have to group by it.
+    fullName.admin_order_field = Concat(
+        'firstName', Value(' '),
+        Case(When(middleName__isnull=True, then=Value('')), default=Concat('middleName', Value(' '))),
+        'lastName',
+        output_field=CharField(),
+    )
+
     def userApproval(self, x):
         return x.approval.approval
     userApproval.short_description = 'Approved'
@@ -201,17 +568,17 @@ class HackerAdmin(admin.ModelAdmin):
     school.admin_order_field = 'academic__school'
 
     def degree(self, x):
-        return x.academic.degree
+        return get_label(AcademicData, 'degree', x.academic.degree)
     degree.short_description = 'Degree'
     degree.admin_order_field = 'academic__degree'
 
     def year(self, x):
-        return x.academic.year
+        return get_label(AcademicData, 'year', x.academic.year)
     year.short_description = 'Year'
     year.admin_order_field = 'academic__year'
 
     def shirtSize(self, x):
-        return x.organizational.shirtSize
+        return get_label(Organizational, 'shirtSize', x.organizational.shirtSize)
     shirtSize.short_description = 'Shirt Size'
     shirtSize.admin_order_field = 'organizational__shirtSize'
 
@@ -227,20 +594,85 @@ class HackerAdmin(admin.ModelAdmin):
     needReimbursement.boolean = True
     needReimbursement.admin_order_field = 'organizational__needReimbursement'
 
+    def cvLink(self, x):
+        if x.cv.has_cv:
+            return format_html('<a href="{}">CV</a>', x.cv.download_url)
+        return None
+    cvLink.short_description = 'CV'
+
     def completedSetup(self, x):
-        try:
-            if x.organizational:
-                return True
-            else:
-                return False
-        except:
-            return False
+        return x.setupCompleted
     completedSetup.short_description = 'Setup Done'
     completedSetup.boolean = True
-    completedSetup.admin_order_field = 'organizational__id'
+    completedSetup.admin_order_field = 'setupProgress'
 
 
 admin.site.register(Hacker, HackerAdmin)
 
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'state', 'jobProgress', 'attempts', 'createdBy', 'createdAt', 'finishedAt', 'download')
+    list_filter = ('state', 'name')
+
+    readonly_fields = [field.name for field in Job._meta.fields] + ['download']
+
+    def has_add_permission(self, request):
+        # jobs are queued by actions elsewhere
+        return False
+
+    def get_urls(self):
+        return [
+            path('<path:object_id>/download/', self.admin_site.admin_view(self.download_view), name='hacker_job_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, object_id):
+        """ Serves the result file of a finished job, like registry.views.cv
+        serves CVs """
+
+        job = self.get_object(request, object_id)
+        if job is None or not job.has_result or not self.has_view_permission(request, job):
+            raise Http404
+
+        content_type = mimetypes.guess_type(job.filename)[0] or 'application/octet-stream'
+        return serve_file(request, job.result, job.filename, job.internal_url, content_type)
+
+    def jobProgress(self, x):
+        if x.total:
+            return '{} / {} ({:.0%})'.format(x.progress, x.total, x.progress / x.total)
+        return x.progress or ''
+    jobProgress.short_description = 'Progress'
+
+    def download(self, x):
+        if x.has_result:
+            return format_html('<a href="{}">{}</a>', reverse('admin:hacker_job_download', args=[x.pk]), x.filename)
+        return ''
+    download.short_description = 'Result'
+
+
+admin.site.register(Job, JobAdmin)
+
+
+class DeletedSinceFilter(ChangedSinceFilter):
+    title = 'Deleted'
+    field_name = 'deletedAt'
+
+
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ('hackerId', 'username', 'deletedAt')
+    list_filter = (DeletedSinceFilter,)
+    search_fields = ('username',)
+
+    readonly_fields = [field.name for field in Tombstone._meta.fields]
+
+    def has_add_permission(self, request):
+        # tombstones are created when hackers are deleted
+        return False
+
+    csv_export = export_as_csv_action("Export as CSV")
+    actions = ['csv_export']
+
+
+admin.site.register(Tombstone, TombstoneAdmin)
+
 from django.contrib.auth.models import Group
 admin.site.unregister(Group)
\ No newline at end of file
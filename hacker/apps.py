@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class HackerConfig(AppConfig):
     name = 'hacker'
+
+    def ready(self):
+        # Side-effect import: Initialize hooks
+        import hacker.hooks
+
+        # Side-effect import: Register the job functions
+        import hacker.actions
+        import hacker.columnar
@@ -0,0 +1,87 @@
+""" In-memory indexes used to autocomplete the values of FuzzyChoiceFields """
+
+import bisect
+import re
+import unicodedata
+
+from django.apps import apps
+
+from .fields import FuzzyChoiceField
+
+
+def normalize(text):
+    """ Normalizes text for case- and accent-insensitive matching """
+
+    text = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+
+
+def _tokenize(text):
+    return re.findall(r'\w+', text)
+
+
+def _prefixed(keys, prefix):
+    """ Yields the values of all (key, value) pairs in the sorted list keys
+    where key starts with the given prefix """
+
+    for (key, value) in keys[bisect.bisect_left(keys, (prefix, )):]:
+        if not key.startswith(prefix):
+            break
+        yield value
+
+
+class PrefixIndex(object):
+    """ An index over a fixed list of entries that finds all entries starting
+    with a query, or with a word of each entry starting with each word of
+    the query """
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+        self._normalized = normalized = [normalize(e).strip() for e in self.entries]
+
+        # sorted lists of (key, entry number) pairs
+        self._names = sorted((name, i) for (i, name) in enumerate(normalized))
+        self._tokens = sorted(set(
+            (token, i) for (i, name) in enumerate(normalized) for token in _tokenize(name)))
+
+    def search(self, query, limit=10):
+        """ Returns up to limit entries matching query, best matches first """
+
+        query = normalize(query).strip()
+        tokens = _tokenize(query)
+        if not tokens:
+            return []
+
+        # entries where each word of the query prefixes some word of the entry
+        matches = None
+        for token in tokens:
+            found = set(_prefixed(self._tokens, token))
+            matches = found if matches is None else matches & found
+
+        # rank exact matches first, then entries starting with the query,
+        # then everything else; shorter entries win a tie
+        ranks = {i: 2 for i in matches}
+        for i in _prefixed(self._names, query):
+            ranks[i] = 0 if self._normalized[i] == query else 1
+
+        best = sorted(ranks, key=lambda i: (ranks[i], len(self.entries[i]), self.entries[i]))
+        return [self.entries[i] for i in best[:limit]]
+
+
+_indexes = None
+
+
+def get_index(name):
+    """ Returns the index of the FuzzyChoiceField with the given name,
+    or None if no such field exists """
+
+    global _indexes
+    if _indexes is None:
+        _indexes = {
+            field.name: PrefixIndex(field.data)
+            for model in apps.get_app_config('hacker').get_models()
+            for field in model._meta.get_fields()
+            if isinstance(field, FuzzyChoiceField)
+        }
+
+    return _indexes.get(name)
@@ -0,0 +1,154 @@
+""" An admin changelist for large tables of hackers.
+
+The default ChangeList counts the filtered and the unfiltered rows on every
+request and pages with OFFSET, both of which get slower with the number of
+hackers. The HackerChangeList instead:
+
+- takes both counts from the (cached) facet counts of its model admin
+- pages by keyset: the 'after' and 'before' parameters hold the pk of the
+  last (or first) hacker of the previous (or next) page, and the page is
+  found by comparing against its values of the ordering columns, which
+  costs the same on every page
+
+Keyset paging requires every ordering column to be non-null. For any other
+ordering (e.g. by a column of a component, or by search rank), the page
+number based paging is used as a fallback.
+"""
+
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import InvalidPage
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+from django.db.models.functions import Concat
+
+AFTER_VAR = 'after'
+BEFORE_VAR = 'before'
+
+
+class HackerChangeList(ChangeList):
+    def get_queryset(self, request):
+        # the cursor only picks the page, so it is not kept by any links
+        self.cursor = {var: self.params.pop(var) for var in (AFTER_VAR, BEFORE_VAR) if var in self.params}
+        return super().get_queryset(request)
+
+    def get_filters_params(self, params=None):
+        params = super().get_filters_params(params)
+        params.pop(AFTER_VAR, None)
+        params.pop(BEFORE_VAR, None)
+        return params
+
+    def get_keys(self):
+        """ Returns a list of (expression, descending) pairs of the ordering
+        of the queryset, or None if it cannot be used for keyset paging """
+
+        keys = []
+        for term in self.queryset.query.order_by:
+            if isinstance(term, str):
+                descending = term.startswith('-')
+                name = term.lstrip('-')
+                if name == 'pk':
+                    name = self.lookup_opts.pk.name
+                try:
+                    field = self.lookup_opts.get_field(name)
+                except FieldDoesNotExist:
+                    return None
+                if field.null or not field.concrete:
+                    return None
+                expression = F(name)
+            elif isinstance(term, OrderBy) and isinstance(term.expression, Concat):
+                # a concatenation is never null
+                descending = term.descending
+                expression = term.expression
+            else:
+                return None
+            keys.append((expression, descending))
+        return keys
+
+    def get_keyset_page(self, keys):
+        """ Returns the list of hackers on the page selected by the cursor, and
+        whether there are more before and after it """
+
+        (var, pk) = next(iter(self.cursor.items()), (None, None))
+        names = ['keyset{}'.format(i) for i in range(len(keys))]
+        queryset = self.queryset.annotate(**{name: expression for (name, (expression, _)) in zip(names, keys)})
+
+        # the first page
+        if var is None:
+            result_list = list(queryset[:self.list_per_page + 1])
+            return (result_list[:self.list_per_page], False, len(result_list) > self.list_per_page)
+
+        # the values of the hacker at the cursor, which need not match the filters
+        try:
+            values = self.root_queryset.filter(pk=pk).annotate(
+                **{name: expression for (name, (expression, _)) in zip(names, keys)}
+            ).values_list(*names).first()
+        except ValueError:
+            values = None
+        if values is None:
+            raise IncorrectLookupParameters
+
+        # hackers coming after (or before) them in the ordering of the page
+        backwards = var == BEFORE_VAR
+        condition = Q()
+        for (i, (_, descending)) in enumerate(keys):
+            term = Q(**{'{}__{}'.format(names[i], 'lt' if descending != backwards else 'gt'): values[i]})
+            for j in range(i):
+                term &= Q(**{names[j]: values[j]})
+            condition |= term
+        queryset = queryset.filter(condition)
+
+        if not backwards:
+            result_list = list(queryset[:self.list_per_page + 1])
+            return (result_list[:self.list_per_page], True, len(result_list) > self.list_per_page)
+
+        result_list = list(queryset.reverse()[:self.list_per_page + 1])
+        more = len(result_list) > self.list_per_page
+        result_list = result_list[:self.list_per_page]
+        result_list.reverse()
+        return (result_list, more, True)
+
+    def get_results(self, request):
+        result_count = self.model_admin.get_facet_counts(self).total
+        if self.model_admin.show_full_result_count:
+            full_result_count = self.model_admin.get_facet_counts(self, root=True).total
+        else:
+            full_result_count = None
+
+        # the count is known already, so the paginator does not need to run it
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        paginator.count = result_count
+
+        can_show_all = result_count <= self.list_max_show_all
+        multi_page = result_count > self.list_per_page
+
+        self.keyset = None
+        keys = None if self.list_editable else self.get_keys()
+
+        # Get the list of objects to display on this page.
+        if (self.show_all and can_show_all) or not multi_page:
+            result_list = self.queryset._clone()
+        elif keys is not None and (self.cursor or not self.page_num):
+            (result_list, previous, following) = self.get_keyset_page(keys)
+            self.keyset = {
+                'first_url': self.get_query_string() if previous else None,
+                'previous_url': self.get_query_string({BEFORE_VAR: result_list[0].pk}) if previous and result_list else None,
+                'next_url': self.get_query_string({AFTER_VAR: result_list[-1].pk}) if following and result_list else None,
+            }
+        else:
+            try:
+                result_list = paginator.page(self.page_num + 1).object_list
+            except InvalidPage:
+                raise IncorrectLookupParameters
+
+        self.result_count = result_count
+        self.show_full_result_count = self.model_admin.show_full_result_count
+        # Admin actions are shown if there is at least one entry
+        # or if entries are not counted because show_full_result_count is disabled
+        self.show_admin_actions = not self.show_full_result_count or bool(full_result_count)
+        self.full_result_count = full_result_count
+        self.result_list = result_list
+        self.can_show_all = can_show_all
+        self.multi_page = multi_page
+        self.paginator = paginator
@@ -0,0 +1,270 @@
+""" Column-wise exports of hackers, for loading them into analysis tools.
+
+Instead of a single query joining every component table, the fields of each
+table are read with a query of their own, and the rows are joined on the
+hacker id in Python. Hackers are exported in batches ordered by id, and each
+batch is built as a list of columns.
+
+Fields with choices (and countries) are dictionary-encoded: each distinct
+value of a batch is labelled once, and the column holds the index of its
+label. Parquet files keep this encoding, the other formats write the labels.
+
+Parquet files can only be written when pyarrow is installed.
+"""
+
+import collections
+import csv
+import datetime
+import gzip
+import itertools
+import json
+import tempfile
+
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from hacker.actions import Echo, export_in_background_action, get_excel_converter, to_excel
+from hacker.jobs import job
+from hacker.labels import get_path_labels
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# The formats supported by write_columns, given their dependencies
+COLUMNAR_FORMATS = ('ndjson', 'csv.gz') + (('parquet',) if pyarrow is not None else ())
+
+
+# Types of values that need no conversion (checked faster than to_excel can)
+PLAIN_TYPES = {str, int, float, bool, datetime.date, datetime.datetime}
+
+
+class Column(object):
+    """ The values of a field in a batch of rows. If dictionary is not None,
+    values are indexes into dictionary (or None). """
+
+    def __init__(self, name, values, dictionary=None):
+        self.name = name
+        self.values = values
+        self.dictionary = dictionary
+
+    def decode(self):
+        """ Returns the (labelled) values of this column """
+
+        if self.dictionary is None:
+            return self.values
+        return [None if i is None else self.dictionary[i] for i in self.values]
+
+
+def get_path_field(model, path):
+    """ Returns the model field of a field path relative to model """
+
+    parts = path.split('__')
+    for part in parts[:-1]:
+        model = model._meta.get_field(part).related_model
+    return model._meta.get_field(parts[-1])
+
+
+def get_tables(model, field_names):
+    """ Groups the field paths by the table they are read from. Returns a
+    list of (queryset, key, names, paths) tuples, where key is the lookup of
+    the id of the exported object and paths are relative to the queryset. """
+
+    groups = collections.OrderedDict()
+    for name in field_names:
+        (relation, _, path) = name.partition('__')
+        if not path:
+            (relation, path) = (None, name)
+        groups.setdefault(relation, []).append((name, path))
+
+    tables = []
+    for (relation, fields) in groups.items():
+        if relation is None:
+            (queryset, key) = (model._default_manager.all(), 'pk')
+        else:
+            field = model._meta.get_field(relation)
+            if not field.one_to_one:
+                raise ValueError('Cannot export {!r}, only one-to-one relations are supported'.format(relation))
+            queryset = field.related_model._default_manager.all()
+            if field.auto_created:
+                # a component, which references the object by its own column
+                key = field.field.attname
+            else:
+                key = '{}__pk'.format(field.related_query_name())
+        tables.append((queryset, key, [name for (name, _) in fields], [path for (_, path) in fields]))
+
+    return tables
+
+
+def encode_column(model, name, values):
+    """ Turns the raw values of a field into a Column of values understood by
+    all formats, dictionary-encoding fields with choices """
+
+    if get_path_labels(model, name) is None:
+        return Column(name, [v if v is None or type(v) in PLAIN_TYPES else to_excel(v) for v in values])
+
+    codes = {}
+    indices = [
+        None if v is None else codes.setdefault(tuple(v) if isinstance(v, list) else v, len(codes))
+        for v in values
+    ]
+    convert = get_excel_converter(model, name)
+    dictionary = [str(convert(list(v) if isinstance(v, tuple) else v)) for v in codes]
+    return Column(name, indices, dictionary)
+
+
+def read_batch(model, field_names, ids):
+    """ Returns the columns of the objects with the given (sorted) ids, using
+    one query per table """
+
+    index = {pk: i for (i, pk) in enumerate(ids)}
+
+    values = {}
+    for (queryset, key, names, paths) in get_tables(model, field_names):
+        columns = [[None] * len(ids) for _ in names]
+        rows = queryset.filter(**{'{}__gte'.format(key): ids[0], '{}__lte'.format(key): ids[-1]}).values_list(key, *paths)
+        for (pk, *row) in rows.iterator():
+            # the range may include objects that are not exported
+            i = index.get(pk)
+            if i is not None:
+                for (column, value) in zip(columns, row):
+                    column[i] = value
+        values.update(zip(names, columns))
+
+    return [encode_column(model, name, values[name]) for name in field_names]
+
+
+def read_batches(model, field_names, ids, batch_size=5000, report=None):
+    """ Generates the columns of the objects with the given (integer) ids,
+    in batches ordered by id. Each batch covers a distinct range of at most
+    batch_size ids, so that every row of every table is read at most once,
+    however sparse the ids are. """
+
+    ids = sorted(ids)
+    done = 0
+    for (_, batch) in itertools.groupby(ids, key=lambda pk: (pk - ids[0]) // batch_size):
+        batch = list(batch)
+        yield read_batch(model, field_names, batch)
+        done += len(batch)
+        if report is not None:
+            report(done)
+
+
+def write_ndjson(output, model, field_names, batches):
+    """ Writes one JSON object per line """
+
+    for batch in batches:
+        lines = [
+            json.dumps(dict(zip(field_names, row)), cls=DjangoJSONEncoder)
+            for row in zip(*[column.decode() for column in batch])
+        ]
+        output.write(''.join(line + '\n' for line in lines).encode('utf-8'))
+
+
+def write_csv_gz(output, model, field_names, batches):
+    """ Writes a gzip-compressed CSV file with a header """
+
+    writer = csv.writer(Echo())
+    with gzip.GzipFile(fileobj=output, mode='wb') as gz:
+        gz.write(writer.writerow(field_names).encode('utf-8'))
+        for batch in batches:
+            lines = [writer.writerow(row) for row in zip(*[column.decode() for column in batch])]
+            gz.write(''.join(lines).encode('utf-8'))
+
+
+def get_arrow_type(model, name):
+    """ Returns the arrow type of the column of a field path """
+
+    if get_path_labels(model, name) is not None:
+        return pyarrow.dictionary(pyarrow.int32(), pyarrow.string())
+
+    field = get_path_field(model, name)
+    if isinstance(field, (models.BooleanField, models.NullBooleanField)):
+        return pyarrow.bool_()
+    if isinstance(field, models.DateTimeField):
+        return pyarrow.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pyarrow.date32()
+    if isinstance(field, (models.IntegerField, models.AutoField)):
+        return pyarrow.int64()
+    if isinstance(field, models.FloatField):
+        return pyarrow.float64()
+    return pyarrow.string()
+
+
+def get_arrow_array(column, type):
+    """ Returns the arrow array of a column """
+
+    if column.dictionary is not None:
+        return pyarrow.DictionaryArray.from_arrays(
+            pyarrow.array(column.values, type=pyarrow.int32()),
+            pyarrow.array(column.dictionary, type=pyarrow.string()),
+        )
+
+    values = column.values
+    if type == pyarrow.string():
+        values = [None if v is None else str(v) for v in values]
+    return pyarrow.array(values, type=type)
+
+
+def write_parquet(output, model, field_names, batches):
+    """ Writes a Parquet file with one row group per batch """
+
+    schema = pyarrow.schema([pyarrow.field(name, get_arrow_type(model, name)) for name in field_names])
+    writer = pyarrow.parquet.ParquetWriter(output, schema)
+    try:
+        for batch in batches:
+            arrays = [get_arrow_array(column, field.type) for (column, field) in zip(batch, schema)]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+    finally:
+        writer.close()
+
+
+WRITERS = {
+    'ndjson': write_ndjson,
+    'csv.gz': write_csv_gz,
+    'parquet': write_parquet,
+}
+
+
+def write_columns(format, output, model, field_names, ids, report=None):
+    """ Writes the given fields of the objects with the given ids to output,
+    in one of COLUMNAR_FORMATS """
+
+    if format not in COLUMNAR_FORMATS:
+        raise ValueError('Unsupported export format {!r}'.format(format))
+
+    batches = read_batches(model, field_names, ids, report=report)
+    WRITERS[format](output, model, field_names, batches)
+
+
+@job('hacker.export_columns')
+def export_columns_job(job, model, fields, ids, format):
+    """ Exports the given fields of the objects with the given ids into the
+    result file of a job, in one of COLUMNAR_FORMATS """
+
+    model = apps.get_model(model)
+
+    with tempfile.TemporaryFile() as output:
+        job.report(0, len(ids))
+        write_columns(format, output, model, fields, ids, report=job.report)
+        output.seek(0)
+        job.save_result('{}_{}.{}'.format(str(model._meta).replace('.', '_'), job.pk, format), output)
+
+    return 'Exported {} object(s). '.format(len(ids))
+
+
+def export_columns_action(format, description=None, fields=None):
+    """
+    Return an action that queues a job exporting the given fields in one of
+    the formats of WRITERS. Formats missing from COLUMNAR_FORMATS fail when
+    the job is run.
+    """
+
+    if format not in WRITERS:
+        raise ValueError('Unsupported export format {!r}'.format(format))
+
+    return export_in_background_action(format, description, fields, job_name='hacker.export_columns')
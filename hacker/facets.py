@@ -0,0 +1,63 @@
+""" Cached facet counts for filtering lists of hackers.
+
+A FacetEngine counts the number of hackers for every value of a set of
+dimensions (field paths relative to Hacker) over a filtered queryset, using
+one grouped aggregate query per dimension. All counts for a filter
+combination are cached together and invalidated whenever any hacker data
+changes (see the 'hackers' version in hacker.hooks).
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from hacker.versions import get_versions
+
+FACET_CACHE_TIMEOUT = getattr(settings, 'FACET_CACHE_TIMEOUT', 60 * 60)
+
+
+class FacetCounts(object):
+    """ The facet counts of a single filter combination """
+
+    def __init__(self, total, counts):
+        self.total = total
+        self.counts = counts
+
+    def get(self, dimension):
+        """ Returns a list of (value, count) pairs of the given dimension,
+        most frequent first """
+
+        return self.counts.get(dimension, [])
+
+
+class FacetEngine(object):
+    def __init__(self, dimensions):
+        self.dimensions = list(dimensions)
+
+    def get_counts(self, queryset, key):
+        """ Returns the FacetCounts of queryset. key should uniquely identify
+        the filters applied to queryset. """
+
+        version = get_versions(['hackers'])['hackers']
+        cache_key = 'facets:{}:{}'.format(hashlib.sha1(key.encode('utf-8')).hexdigest(), version)
+
+        counts = cache.get(cache_key)
+        if counts is None:
+            counts = self.compute(queryset)
+            cache.set(cache_key, counts, FACET_CACHE_TIMEOUT)
+
+        return counts
+
+    def compute(self, queryset):
+        """ Computes the FacetCounts of queryset without using the cache """
+
+        queryset = queryset.order_by()
+
+        counts = {}
+        for dimension in self.dimensions:
+            rows = queryset.values_list(dimension).annotate(count=Count('pk', distinct=True))
+            counts[dimension] = sorted(rows, key=lambda row: (-row[1], str(row[0])))
+
+        return FacetCounts(queryset.count(), counts)
@@ -1,17 +1,84 @@
 from django import forms
 
 from django.db import models
+from django.urls import reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
 from django_countries.fields import CountryField as OriginalCountryField
 from django_countries.fields import Country
+from django_countries.widgets import LazySelect, LazySelectMultiple
 
 from phonenumber_field.modelfields import PhoneNumberField
 from phonenumber_field.widgets import PhoneNumberInternationalFallbackWidget
 
 
+class CachedOptionsMixin(object):
+    """ A mixin for select widgets with a long, fixed list of choices.
+
+    The options are rendered only once per process and language and stored
+    under cache_name, which needs to be unique for every list of choices.
+    Each render then only applies the selected state. """
+
+    _options = {}
+
+    def __init__(self, *args, cache_name=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_name = cache_name
+
+    def _get_options(self):
+        key = (self.cache_name, get_language())
+        if key not in self._options:
+            positions, unselected, selected = {}, [], []
+            for (value, label) in self.choices:
+                positions[str(value)] = len(unselected)
+                unselected.append(format_html('<option value="{}">{}</option>', value, label))
+                selected.append(format_html('<option value="{}" selected>{}</option>', value, label))
+
+            self._options[key] = (positions, unselected, selected)
+
+        return self._options[key]
+
+    def render(self, name, value, attrs=None, renderer=None):
+        (positions, unselected, selected) = self._get_options()
+
+        options = list(unselected)
+        for v in self.format_value(value):
+            if v in positions:
+                options[positions[v]] = selected[positions[v]]
+                if not self.allow_multiple_selected:
+                    break
+
+        final_attrs = self.build_attrs(self.attrs, attrs)
+        if self.allow_multiple_selected:
+            final_attrs['multiple'] = True
+
+        # render the attributes in order, like django/forms/widgets/attrs.html
+        html_attrs = format_html_join('', ' {}{}', (
+            (key, '' if value is True else format_html('="{}"', value))
+            for (key, value) in final_attrs.items() if value is not False
+        ))
+
+        return format_html('<select name="{}"{}>{}</select>', name, html_attrs, mark_safe(''.join(options)))
+
+
+class CachedCountrySelect(CachedOptionsMixin, LazySelect):
+    pass
+
+
+class CachedCountrySelectMultiple(CachedOptionsMixin, LazySelectMultiple):
+    pass
+
+
 class CountryField(OriginalCountryField):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+    def formfield(self, **kwargs):
+        WidgetClass = CachedCountrySelectMultiple if self.multiple else CachedCountrySelect
+        kwargs.setdefault('widget', WidgetClass(cache_name='{}.{}'.format(self.model._meta.label, self.name)))
+        return super().formfield(**kwargs)
+
     def value_to_string(self, obj):
         value = self.value_from_object(obj)
         return self.get_prep_value(value)
@@ -59,6 +126,19 @@ class PhoneField(PhoneNumberField):
 
 
 class ListTextWidget(forms.TextInput):
+    """ A text input suggesting values from a list.
+
+    Short lists are sent along with the page as a datalist, longer ones are
+    queried from the 'autocomplete' view while typing. """
+
+    # the longest list that is sent along with the page
+    inline_limit = 50
+
+    _data_lists = {}
+
+    class Media:
+        js = ('autocomplete/autocomplete.js', )
+
     def __init__(self, data_list, name, *args, **kwargs):
         super(ListTextWidget, self).__init__(*args, **kwargs)
         self._name = name
@@ -66,13 +146,25 @@ class ListTextWidget(forms.TextInput):
         self.attrs.update({'list':'list__%s' % self._name})
 
     def render(self, name, value, attrs=None, renderer=None):
-        text_html = super(ListTextWidget, self).render(name, value, attrs=attrs)
-        data_list = '<datalist id="list__%s">' % self._name
-        for item in self._list:
-            data_list += '<option value="%s">' % item
-        data_list += '</datalist>'
+        if len(self._list) > self.inline_limit:
+            attrs = dict(attrs or {})
+            attrs['data-autocomplete-url'] = reverse('autocomplete', args=[self._name])
+            attrs['autocomplete'] = 'off'
+
+        text_html = super(ListTextWidget, self).render(name, value, attrs=attrs, renderer=renderer)
+        return (text_html + self._get_data_list())
+
+    def _get_data_list(self):
+        """ Renders the datalist once per process """
+
+        if self._name not in self._data_lists:
+            if len(self._list) > self.inline_limit:
+                options = ''
+            else:
+                options = format_html_join('', '<option value="{}">', ((item, ) for item in self._list))
+            self._data_lists[self._name] = format_html('<datalist id="list__{}">{}</datalist>', self._name, options)
 
-        return (text_html + data_list)
+        return self._data_lists[self._name]
 
 class FuzzyChoiceField(models.CharField):
     def __init__(self, data=None, *args, **kwargs):
@@ -1,37 +1,168 @@
-import os.path
-
-from django.db import models
+from django.contrib.auth.models import User
+from django.db import models, transaction
+from django.db.models import F
 from django.dispatch import receiver
+from django.utils import timezone
+
+from hacker.models import Hacker, Approval, RSVP, Job, Tombstone
+from hacker.search import SEARCH_MODELS, update_documents
+from hacker.statistics import remove_statistics, update_statistics
+from hacker.versions import bump_versions, hacker_version_name, hackers_version_name
+
+# CV files may be shared by several CVs, unreferenced ones are removed by the
+# 'cleancvs' command (see hacker.storage)
+@receiver(models.signals.post_delete, sender=Job)
+def auto_delete_job_result_on_delete(sender, instance, **kwargs):
+    """ Deletes the result file of a job when the job is deleted """
+    if instance.result:
+        instance.result.delete(save=False)
+
+
+# These keep Hacker.setupProgress in sync with the component tables
+def _component_name(model):
+    """ Returns the name a component model is registered under """
+
+    return model.hacker.field.remote_field.name
+
+
+def _set_progress_bit(instance, value):
+    """ Sets or clears the setupProgress bit of a component instance """
+
+    bit = Hacker.component_bit(_component_name(type(instance)))
+    if value:
+        progress = F('setupProgress').bitor(bit)
+    else:
+        progress = F('setupProgress').bitand(Hacker.setup_completed_mask() & ~bit)
+
+    Hacker.objects.filter(pk=instance.hacker_id).update(setupProgress=progress)
+
+    # also update an already loaded hacker object
+    if type(instance).hacker.field.is_cached(instance):
+        hacker = instance.hacker
+        if value:
+            hacker.setupProgress |= bit
+        else:
+            hacker.setupProgress &= ~bit
+
+
+def setup_progress_on_save(sender, instance, created, raw=False, **kwargs):
+    """ Marks a component as set up when it is created """
+    if created and not raw:
+        _set_progress_bit(instance, True)
+
+
+def setup_progress_on_delete(sender, instance, **kwargs):
+    """ Marks a component as not set up when it is deleted """
+    _set_progress_bit(instance, False)
+
+
+for component in Hacker.components.values():
+    models.signals.post_save.connect(setup_progress_on_save, sender=component)
+    models.signals.post_delete.connect(setup_progress_on_delete, sender=component)
+
+
+# These bump the data versions and modification times used to invalidate
+# cached data of a hacker, and the 'hackers' version covering all hackers.
+# They only happen once the change is committed, as otherwise a concurrent
+# request could cache the old data under the new version.
+def bump_hacker_version(sender, instance, **kwargs):
+    """ Bumps the version of a hacker after it is saved or deleted """
+    names = [hacker_version_name(instance.pk, 'hacker'), 'hackers']
+    transaction.on_commit(lambda: bump_versions(names))
+
+
+def _hackers_changed(hacker_ids, names):
+    """ Bumps the given versions and the modification time of each of the
+    given hackers, and updates their statistics, once committed """
+
+    hacker_ids = list(hacker_ids)
+
+    def changed():
+        bump_versions(names + ['hackers'])
+        now = timezone.now()
+        for start in range(0, len(hacker_ids), 500):
+            Hacker.objects.filter(pk__in=hacker_ids[start:start + 500]).update(updatedAt=now)
+        update_statistics(hacker_ids)
+
+    transaction.on_commit(changed)
+
+
+def hackers_changed(hacker_ids, component):
+    """ Bumps the version of a component shared by all hackers and the
+    modification time of each of the given hackers. Must be called by code
+    changing components of many hackers without sending signals, e.g. using
+    QuerySet.update(). """
+    _hackers_changed(hacker_ids, [hackers_version_name(component)])
+
+
+def component_changed(sender, instance, **kwargs):
+    """ Bumps the version of a component and the modification time of its
+    hacker after it is saved or deleted """
+    _hackers_changed([instance.hacker_id], [hacker_version_name(instance.hacker_id, _component_name(sender))])
+
+
+models.signals.post_save.connect(bump_hacker_version, sender=Hacker)
+models.signals.post_delete.connect(bump_hacker_version, sender=Hacker)
+
+for component in list(Hacker.components.values()) + [Approval, RSVP]:
+    models.signals.post_save.connect(component_changed, sender=component)
+    models.signals.post_delete.connect(component_changed, sender=component)
+
+
+# These keep the data used by incremental exports up-to-date
+@receiver(models.signals.post_save, sender=User)
+def profile_changed(sender, instance, raw=False, **kwargs):
+    """ Updates the modification time of the hacker of a user after the user
+    is saved, as its fields are exported along with the hacker """
+    if not raw:
+        Hacker.objects.filter(profile_id=instance.pk).update(updatedAt=timezone.now())
+
+
+@receiver(models.signals.post_delete, sender=Hacker)
+def tombstone_on_delete(sender, instance, **kwargs):
+    """ Records the deletion of a hacker """
+
+    # the user is deleted after the hacker (if at all)
+    username = User.objects.filter(pk=instance.profile_id).values_list('username', flat=True).first()
+    Tombstone.objects.create(hackerId=instance.pk, username=username or '')
+
+
+# These keep the search documents of hackers up-to-date
+def search_document_on_save(sender, instance, raw=False, **kwargs):
+    """ Updates the search document of a hacker after it or one of its
+    searchable components is saved """
+    if not raw:
+        update_documents([instance.pk if sender is Hacker else instance.hacker_id])
+
+
+def search_document_on_delete(sender, instance, **kwargs):
+    """ Updates the search document of a hacker after one of its searchable
+    components is deleted """
+
+    # the hacker itself might be deleted in the same transaction, which also
+    # deletes the document, so only update it afterwards
+    hacker_id = instance.hacker_id
+    transaction.on_commit(lambda: update_documents([hacker_id]))
+
+
+for model in SEARCH_MODELS:
+    models.signals.post_save.connect(search_document_on_save, sender=model)
+    if model is not Hacker:
+        models.signals.post_delete.connect(search_document_on_delete, sender=model)
+
+
+# These keep the materialized statistics of hackers up-to-date (changes of
+# components are handled by hackers_changed)
+@receiver(models.signals.post_save, sender=Hacker)
+def statistics_on_save(sender, instance, raw=False, **kwargs):
+    """ Updates the statistics after a hacker is saved """
+    if not raw:
+        hacker_id = instance.pk
+        transaction.on_commit(lambda: update_statistics([hacker_id]))
+
 
-from hacker.models import CV
-
-# These two auto-delete files from filesystem when they are unneeded:
-@receiver(models.signals.post_delete, sender=CV)
-def auto_delete_file_on_delete(sender, instance, **kwargs):
-    """Deletes file from filesystem
-    when corresponding `MediaFile` object is deleted.
-    """
-    if instance.cv:
-        if os.path.isfile(instance.cv.path):
-            os.remove(instance.cv.path)
-
-@receiver(models.signals.pre_save, sender=CV)
-def auto_delete_file_on_change(sender, instance, **kwargs):
-    """Deletes file from filesystem
-    when corresponding `MediaFile` object is changed.
-    """
-    if not instance.pk:
-        return False
-
-    try:
-        old_file = CV.objects.get(pk=instance.pk).cv
-    except CV.DoesNotExist:
-        return False
-
-    new_file = instance.cv
-    if not old_file == new_file:
-        try:
-            if os.path.isfile(old_file.path):
-                os.remove(old_file.path)
-        except ValueError:
-            return False
\ No newline at end of file
+@receiver(models.signals.pre_delete, sender=Hacker)
+def statistics_on_delete(sender, instance, **kwargs):
+    """ Removes a hacker from the statistics before it is deleted, as its
+    statistics entry is deleted along with it """
+    remove_statistics([instance.pk])
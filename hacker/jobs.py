@@ -0,0 +1,130 @@
+""" Background jobs, stored in the database and run by the 'runjobs' command.
+
+A job function is registered under a name using the job decorator:
+
+    @job('hacker.something')
+    def something(job, **arguments):
+        ...
+        job.report(done, total)
+        ...
+        return 'A message shown in the admin. '
+
+Jobs are created using enqueue(), which only stores a Job row, so that it
+can be called from a request and return at once. Workers claim pending jobs
+with a conditional UPDATE, so that each job is run by a single worker without
+any locking (or broker) beyond the database itself. A failing job is retried
+(with a growing delay) until it has been attempted Job.maxAttempts times.
+"""
+
+import json
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from hacker.models import Job
+
+logger = logging.getLogger(__name__)
+
+# The registered job functions, by name
+JOBS = {}
+
+# Running jobs without a progress update (see Job.report and Job.heartbeat)
+# for this long are considered to have lost their worker
+STALE_AFTER = timedelta(minutes=5)
+
+
+def job(name):
+    """ A decorator to register a job function under a given name """
+
+    def register(f):
+        JOBS[name] = f
+        return f
+    return register
+
+
+def enqueue(name, description='', user=None, max_attempts=3, **arguments):
+    """ Creates a pending job to call the job function registered under name
+    with the given (JSON-serializable) arguments """
+
+    if name not in JOBS:
+        raise KeyError('No job registered as {!r}'.format(name))
+
+    return Job.objects.create(
+        name=name, arguments=json.dumps(arguments), description=description,
+        createdBy=user, maxAttempts=max_attempts,
+    )
+
+
+def worker_name():
+    """ Returns the name of the current worker process """
+
+    return '{}:{}'.format(socket.gethostname(), os.getpid())
+
+
+def claim(worker):
+    """ Marks the next pending job as running on the given worker and returns
+    it, or returns None if there are no pending jobs """
+
+    now = timezone.now()
+    candidates = Job.objects.filter(state=Job.PENDING, runAfter__lte=now).order_by('runAfter', 'pk')
+    for pk in candidates.values_list('pk', flat=True)[:10]:
+        # another worker may have claimed the job in the meantime
+        claimed = Job.objects.filter(pk=pk, state=Job.PENDING).update(
+            state=Job.RUNNING, worker=worker, attempts=F('attempts') + 1,
+            startedAt=now, heartbeatAt=now, progress=0, total=None,
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+
+    return None
+
+
+def requeue_stale():
+    """ Makes running jobs whose worker has stopped reporting pending again
+    (or failed, if they have used up their attempts), and returns their
+    number """
+
+    stale = Job.objects.filter(state=Job.RUNNING, heartbeatAt__lt=timezone.now() - STALE_AFTER)
+    message = 'The worker running the job stopped responding. '
+    failed = stale.filter(attempts__gte=F('maxAttempts')).update(
+        state=Job.FAILED, message=message, finishedAt=timezone.now())
+    retried = stale.update(state=Job.PENDING, message=message, runAfter=timezone.now())
+    return failed + retried
+
+
+def retry_delay(attempts):
+    """ Returns the delay before attempting a job again """
+
+    return timedelta(seconds=30 * 2 ** (attempts - 1))
+
+
+def run(job):
+    """ Runs a claimed job, recording its outcome """
+
+    # the outcome is dropped if the job was taken over by another worker
+    claimed = Job.objects.filter(pk=job.pk, state=Job.RUNNING, worker=job.worker)
+
+    try:
+        f = JOBS[job.name]
+        message = f(job, **json.loads(job.arguments))
+    except Exception:
+        logger.exception('%s failed', job)
+        error = traceback.format_exc()
+        if job.attempts < job.maxAttempts:
+            update = dict(state=Job.PENDING, runAfter=timezone.now() + retry_delay(job.attempts))
+        else:
+            update = dict(state=Job.FAILED, finishedAt=timezone.now())
+        claimed.update(message=error, **update)
+    else:
+        claimed.update(
+            state=Job.DONE, message=message or '', progress=job.total or job.progress,
+            finishedAt=timezone.now(), heartbeatAt=timezone.now(),
+        )
+
+    job.refresh_from_db()
+    return job
@@ -0,0 +1,75 @@
+""" Precomputed display labels of all choices-backed fields in hacker.models.
+
+Labels are looked up with plain dicts mapping each stored value to its label.
+Country names depend on the active language and are computed once per
+language. """
+
+from django.apps import apps
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.translation import get_language
+from django_countries import countries
+
+from .fields import CountryField
+
+_choice_labels = None
+_country_labels = {}
+
+
+def _get_choice_labels():
+    global _choice_labels
+    if _choice_labels is None:
+        _choice_labels = {
+            (model, field.name): dict(field.flatchoices)
+            for model in apps.get_app_config('hacker').get_models()
+            for field in model._meta.concrete_fields
+            if field.choices and not isinstance(field, CountryField)
+        }
+
+    return _choice_labels
+
+
+def _get_country_labels():
+    language = get_language()
+    if language not in _country_labels:
+        _country_labels[language] = dict(countries)
+
+    return _country_labels[language]
+
+
+def get_labels(model, name):
+    """ Returns a dict mapping the values of the given field to their labels,
+    or None if the field has no choices """
+
+    if isinstance(model._meta.get_field(name), CountryField):
+        return _get_country_labels()
+
+    return _get_choice_labels().get((model, name))
+
+
+def get_path_labels(model, path):
+    """ Like get_labels, but for a field path relative to model, e.g.
+    'academic__degree'. Returns None for fields without choices. """
+
+    parts = path.split('__')
+    try:
+        for part in parts[:-1]:
+            model = model._meta.get_field(part).related_model
+
+        if model is None or model._meta.app_label != 'hacker':
+            return None
+
+        return get_labels(model, parts[-1])
+    except FieldDoesNotExist:
+        return None
+
+
+def get_label(model, name, value):
+    """ Returns the label of a value (or a list of labels, for a list of values)
+    of the given field. Values without a label (e.g. those no longer among the
+    choices) are returned as they are. """
+
+    labels = get_labels(model, name) or {}
+    if isinstance(value, list):
+        return [labels.get(v, v) for v in value]
+
+    return labels.get(value, value)
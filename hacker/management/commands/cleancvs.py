@@ -0,0 +1,51 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from hacker.models import CV
+from hacker.storage import cv_storage
+
+
+class Command(BaseCommand):
+    help = 'Remove the CV files that are no longer referenced by any CV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=60 * 60,
+                            help='Only remove files unused for this many seconds, as uploads are saved before they are referenced')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only list the files that would be removed')
+
+    def handle(self, *args, **options):
+        root = cv_storage.path(cv_storage.prefix)
+        if not os.path.isdir(root):
+            self.stdout.write(self.style.SUCCESS('There are no CV files. '))
+            return
+
+        referenced = set(CV.objects.exclude(cv='').exclude(cv=None).values_list('cv', flat=True))
+        cutoff = time.time() - options['min_age']
+
+        (removed, size) = (0, 0)
+        for (dirpath, dirnames, filenames) in os.walk(root, topdown=False):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, cv_storage.location).replace(os.sep, '/')
+                if name in referenced:
+                    continue
+
+                stat = os.stat(path)
+                if stat.st_mtime > cutoff:
+                    continue
+
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    os.remove(path)
+                (removed, size) = (removed + 1, size + stat.st_size)
+
+            # remove the fan-out directories left empty
+            if dirpath != root and not options['dry_run'] and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+
+        self.stdout.write(self.style.SUCCESS('{} {} unreferenced CV file(s) ({:.1f} MiB) of {} referenced. '.format(
+            'Would remove' if options['dry_run'] else 'Removed', removed, size / 2 ** 20, len(referenced))))
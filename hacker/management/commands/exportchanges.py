@@ -0,0 +1,68 @@
+import datetime
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from hacker import columnar
+from hacker.admin import HackerAdmin
+from hacker.models import Hacker, Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Export the hackers changed (and deleted) since a watermark as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since',
+                            help='Watermark (an ISO datetime) printed by a previous export, exports everything if omitted')
+        parser.add_argument('--output', default='-',
+                            help='File to write to, defaults to standard output')
+        parser.add_argument('--margin', type=int, default=15 * 60,
+                            help='Seconds the watermark is moved back to include changes committed after they were '
+                                 'timestamped, defaults to 15 minutes')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError('Invalid watermark {!r}. '.format(options['since']))
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        # anything changed from now on is exported the next time. Changes are
+        # timestamped before they are committed, so a change timestamped now
+        # may only become visible after the hackers are read below. Such
+        # changes are included in the next export by moving the watermark
+        # back, which exports the changes in between twice (for transactions
+        # taking less than the margin).
+        watermark = timezone.now() - datetime.timedelta(seconds=options['margin'])
+
+        hackers = Hacker.objects.all()
+        tombstones = Tombstone.objects.order_by('deletedAt')
+        if since is not None:
+            hackers = hackers.filter(updatedAt__gte=since)
+            tombstones = tombstones.filter(deletedAt__gte=since)
+        ids = list(hackers.values_list('pk', flat=True))
+
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            # changed hackers, with their id
+            fields = ['id'] + list(HackerAdmin.full_export_fields)
+            columnar.write_columns('ndjson', output, Hacker, fields, ids)
+
+            # deleted hackers, marked by their deletion time
+            count = 0
+            for (hacker_id, username, deletedAt) in tombstones.values_list('hackerId', 'username', 'deletedAt').iterator():
+                line = json.dumps({'id': hacker_id, 'profile__username': username, 'deletedAt': deletedAt}, cls=DjangoJSONEncoder)
+                output.write((line + '\n').encode('utf-8'))
+                count += 1
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+
+        self.stderr.write('Exported {} changed and {} deleted hacker(s). '.format(len(ids), count))
+        self.stderr.write('Watermark: {}'.format(watermark.isoformat()))
@@ -0,0 +1,64 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hacker.hooks import hackers_changed
+
+from hacker.models import CV
+from hacker.storage import cv_storage
+
+
+def store(name):
+    """ Stores the file of a CV under its hash, returning the new name or
+    None if it is missing """
+
+    path = cv_storage.path(name)
+    if not os.path.isfile(path):
+        return None
+
+    with open(path, 'rb') as file:
+        return cv_storage.save(name, File(file, name))
+
+
+class Command(BaseCommand):
+    help = 'Move the CV files stored under other names (e.g. usernames) to content-addressed storage'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Number of files copied at the same time')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of CVs updated per transaction')
+
+    def handle(self, *args, **options):
+        cvs = CV.objects.exclude(cv='').exclude(cv=None).values_list('pk', 'hacker_id', 'cv')
+        legacy = [(pk, hacker_id, name) for (pk, hacker_id, name) in cvs if not cv_storage.is_hashed_name(name)]
+        batch_size = max(options['batch_size'], 1)
+
+        # the files are hashed and copied by the workers, while the CVs are
+        # updated here (unless they were changed in the meantime) in batches,
+        # bumping the cv versions of the hackers like any bulk change. The old
+        # files are left for 'cleancvs'.
+        (moved, missing) = (0, 0)
+        with ThreadPoolExecutor(max(options['workers'], 1)) as pool:
+            for start in range(0, len(legacy), batch_size):
+                batch = legacy[start:start + batch_size]
+                stored = list(pool.map(store, [name for (_, _, name) in batch]))
+                changed = []
+                with transaction.atomic():
+                    for ((pk, hacker_id, old), new) in zip(batch, stored):
+                        if new is None:
+                            self.stdout.write(self.style.WARNING('CV {} is missing its file {}. '.format(pk, old)))
+                            missing += 1
+                            continue
+
+                        if CV.objects.filter(pk=pk, cv=old).update(cv=new):
+                            changed.append(hacker_id)
+                        moved += 1
+
+                    if changed:
+                        hackers_changed(changed, 'cv')
+
+        self.stdout.write(self.style.SUCCESS('Moved {} CV file(s), {} missing. Run cleancvs to remove the old files. '.format(moved, missing)))
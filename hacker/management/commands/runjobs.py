@@ -0,0 +1,86 @@
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from hacker import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run background jobs queued in the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Number of worker processes running jobs at the same time')
+        parser.add_argument('--poll', type=float, default=2,
+                            help='Seconds to wait before checking for new jobs when there are none')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once there are no more pending jobs')
+
+    def handle(self, *args, **options):
+        concurrency = max(options['concurrency'], 1)
+        if concurrency == 1:
+            self.work(options)
+            return
+
+        # each worker has to open its own database connections
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=self.work, args=(options,), daemon=True)
+            for _ in range(concurrency)
+        ]
+        for worker in workers:
+            worker.start()
+
+        def stop(signum, frame):
+            for worker in workers:
+                worker.terminate()
+        signal.signal(signal.SIGTERM, stop)
+
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            stop(None, None)
+
+    def work(self, options):
+        """ Runs jobs until there are none left (with --once) or until the
+        process is told to stop """
+
+        # finish the current job before stopping
+        self.stopping = False
+
+        def stop(signum, frame):
+            self.stopping = True
+        signal.signal(signal.SIGTERM, stop)
+
+        worker = jobs.worker_name()
+        self.stdout.write('Worker {} started. '.format(worker))
+
+        while not self.stopping:
+            requeued = jobs.requeue_stale()
+            if requeued:
+                self.stdout.write(self.style.WARNING('Requeued {} stale job(s). '.format(requeued)))
+
+            job = jobs.claim(worker)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll'])
+                continue
+
+            self.stdout.write('{} started (attempt {} of {}). '.format(job, job.attempts, job.maxAttempts))
+            started = time.monotonic()
+            job = jobs.run(job)
+            took = time.monotonic() - started
+
+            if job.state == job.DONE:
+                self.stdout.write(self.style.SUCCESS('{} done after {:.1f}s. {}'.format(job, took, job.message)))
+            elif job.state == job.PENDING:
+                self.stdout.write(self.style.WARNING('{} failed after {:.1f}s, retrying at {}. '.format(job, took, job.runAfter)))
+            elif job.state == job.FAILED:
+                self.stdout.write(self.style.ERROR('{} failed after {:.1f}s. '.format(job, took)))
+
+        connections.close_all()
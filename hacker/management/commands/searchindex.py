@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from hacker import search
+from hacker.models import Hacker, SearchDocument
+
+
+class Command(BaseCommand):
+    help = 'Check (and optionally rebuild) the full-text search index of hackers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Re-create the search index and the search documents of all hackers')
+
+    def handle(self, *args, **options):
+        if search.get_backend() is None:
+            raise CommandError('Full-text search is not supported on {}. '.format(connection.vendor))
+
+        if options['rebuild']:
+            with transaction.atomic():
+                count = search.rebuild_index()
+            self.stdout.write(self.style.SUCCESS('Rebuilt the search documents of {} hacker(s). '.format(count)))
+            return
+
+        hackers = Hacker.objects.count()
+        documents = SearchDocument.objects.count()
+        if hackers == documents:
+            self.stdout.write(self.style.SUCCESS('Search index of {} hacker(s) is complete. '.format(hackers)))
+        else:
+            self.stdout.write(self.style.ERROR('Search index has {} document(s) for {} hacker(s), re-run with --rebuild. '.format(documents, hackers)))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from hacker.models import Hacker
+
+
+class Command(BaseCommand):
+    help = 'Check (and optionally rebuild) the setup progress of all hackers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true',
+                            help='Write the correct setup progress for all mismatched hackers')
+
+    def handle(self, *args, **options):
+        # compute the real progress from the component tables, one query each
+        progress = {pk: 0 for pk in Hacker.objects.values_list('pk', flat=True)}
+        for (name, model) in Hacker.components.items():
+            bit = Hacker.component_bit(name)
+            for pk in model.objects.values_list('hacker_id', flat=True):
+                progress[pk] |= bit
+
+        # find the hackers where the stored value differs
+        mismatched = [
+            (pk, stored) for (pk, stored) in Hacker.objects.values_list('pk', 'setupProgress')
+            if progress[pk] != stored
+        ]
+
+        for (pk, stored) in mismatched:
+            self.stdout.write('Hacker {}: stored {:b}, actual {:b}'.format(pk, stored, progress[pk]))
+            if options['fix']:
+                Hacker.objects.filter(pk=pk).update(setupProgress=progress[pk])
+
+        if not mismatched:
+            self.stdout.write(self.style.SUCCESS('Setup progress of {} hacker(s) is correct. '.format(len(progress))))
+        elif options['fix']:
+            self.stdout.write(self.style.SUCCESS('Fixed setup progress of {} hacker(s). '.format(len(mismatched))))
+        else:
+            self.stdout.write(self.style.ERROR('Setup progress of {} hacker(s) is incorrect, re-run with --fix. '.format(len(mismatched))))
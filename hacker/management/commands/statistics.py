@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from hacker import statistics
+
+
+class Command(BaseCommand):
+    help = 'Check (and optionally rebuild) the materialized statistics of hackers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Re-compute the statistics of all hackers')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            with transaction.atomic():
+                count = statistics.rebuild_statistics()
+            self.stdout.write(self.style.SUCCESS('Rebuilt the statistics of {} hacker(s). '.format(count)))
+            return
+
+        (hackers, outdated, differing) = statistics.check_statistics()
+        if not outdated and not differing:
+            self.stdout.write(self.style.SUCCESS('Statistics of {} hacker(s) are up-to-date. '.format(hackers)))
+        else:
+            self.stdout.write(self.style.ERROR('Statistics of {} of {} hacker(s) and {} count(s) are outdated, re-run with --rebuild. '.format(outdated, hackers, differing)))
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+# The components registered on Hacker at the time of this migration, in order
+COMPONENTS = ['academic', 'application', 'organizational', 'cv']
+
+
+def backfill_setup_progress(apps, schema_editor):
+    Hacker = apps.get_model('hacker', 'Hacker')
+    for (i, name) in enumerate(COMPONENTS):
+        bit = 1 << i
+        ids = Hacker._meta.get_field(name).related_model.objects.values_list('hacker_id', flat=True)
+        Hacker.objects.filter(pk__in=ids).update(setupProgress=models.F('setupProgress').bitor(bit))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hacker', '0025_organizational_visaletteraddress'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hacker',
+            name='setupProgress',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_setup_progress, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,98 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+import re
+import unicodedata
+
+
+# The searchable fields at the time of this migration
+SEARCH_FIELDS = [
+    'firstName', 'middleName', 'lastName', 'email',
+    'academic__school', 'academic__major',
+    'application__whyJacobsHack', 'application__whatHaveYouBuilt',
+    'organizational__comments',
+]
+
+# The index of the search documents on each database, as created by
+# hacker.search at the time of this migration
+CREATE_SQL = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE hacker_searchdocument_fts USING fts5(text, content='hacker_searchdocument', "
+        "content_rowid='hacker_id', prefix='2 3')",
+        "CREATE TRIGGER hacker_searchdocument_fts_ai AFTER INSERT ON hacker_searchdocument BEGIN "
+        "INSERT INTO hacker_searchdocument_fts(rowid, text) VALUES (new.hacker_id, new.text); END",
+        "CREATE TRIGGER hacker_searchdocument_fts_ad AFTER DELETE ON hacker_searchdocument BEGIN "
+        "INSERT INTO hacker_searchdocument_fts(hacker_searchdocument_fts, rowid, text) "
+        "VALUES ('delete', old.hacker_id, old.text); END",
+        "CREATE TRIGGER hacker_searchdocument_fts_au AFTER UPDATE ON hacker_searchdocument BEGIN "
+        "INSERT INTO hacker_searchdocument_fts(hacker_searchdocument_fts, rowid, text) "
+        "VALUES ('delete', old.hacker_id, old.text); "
+        "INSERT INTO hacker_searchdocument_fts(rowid, text) VALUES (new.hacker_id, new.text); END",
+    ],
+    'postgresql': [
+        "CREATE INDEX hacker_searchdocument_fts ON hacker_searchdocument USING GIN (to_tsvector('simple', text))",
+    ],
+}
+
+DROP_SQL = {
+    'sqlite': [
+        "DROP TRIGGER IF EXISTS hacker_searchdocument_fts_ai",
+        "DROP TRIGGER IF EXISTS hacker_searchdocument_fts_ad",
+        "DROP TRIGGER IF EXISTS hacker_searchdocument_fts_au",
+        "DROP TABLE IF EXISTS hacker_searchdocument_fts",
+    ],
+    'postgresql': [
+        "DROP INDEX IF EXISTS hacker_searchdocument_fts",
+    ],
+}
+
+
+def create_index(apps, schema_editor):
+    for sql in CREATE_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    for sql in DROP_SQL.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def document_text(values):
+    """ The text of a search document, as computed by hacker.search at the
+    time of this migration """
+
+    words = []
+    for value in values:
+        if value:
+            text = unicodedata.normalize('NFKD', str(value))
+            text = ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+            words.extend(re.findall(r'[^\W_]+', text))
+    return ' '.join(words)
+
+
+def backfill_documents(apps, schema_editor):
+    Hacker = apps.get_model('hacker', 'Hacker')
+    SearchDocument = apps.get_model('hacker', 'SearchDocument')
+    SearchDocument.objects.bulk_create(
+        SearchDocument(hacker_id=pk, text=document_text(values))
+        for (pk, *values) in Hacker.objects.values_list('pk', *SEARCH_FIELDS).iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hacker', '0027_updatedat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('hacker', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='searchDocument', serialize=False, to='hacker.Hacker')),
+                ('text', models.TextField()),
+            ],
+        ),
+        migrations.RunPython(create_index, drop_index),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
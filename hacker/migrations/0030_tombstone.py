@@ -0,0 +1,22 @@
+# Generated by Django 2.1.15 on 2026-10-18 20:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hacker', '0029_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hackerId', models.PositiveIntegerField(db_index=True)),
+                ('username', models.CharField(blank=True, max_length=150)),
+                ('deletedAt', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
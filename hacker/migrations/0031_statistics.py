@@ -0,0 +1,116 @@
+# Generated by Django 2.1.15 on 2026-10-18 20:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+import collections
+import json
+import re
+import unicodedata
+
+
+# The statistics as computed by hacker.statistics at the time of this migration
+SEGMENTS = [
+    ('all', lambda approval, going: True),
+    ('approved', lambda approval, going: approval is True),
+    ('going', lambda approval, going: going is True),
+    ('not_going', lambda approval, going: going is False),
+]
+
+DIMENSIONS = [
+    'organizational__shirtSize', 'dietary', 'academic__school', 'academic__degree', 'academic__year',
+    'organizational__needVisa', 'organizational__needReimbursement', 'application__firstHackathon', 'nationality',
+]
+
+DIETARY_BUCKETS = [
+    ('vegan', r'vegan'),
+    ('vegetarian', r'veg(etari|gie|gi)'),
+    ('gluten', r'gluten|c(o|oe)?eliac'),
+    ('lactose', r'lactose|dairy|milk'),
+    ('nuts', r'nut'),
+    ('halal', r'halal'),
+    ('kosher', r'kosher'),
+    ('pork', r'pork'),
+]
+
+FIELDS = ['approval__approval', 'rsvp__going', 'organizational__dietaryRequirements'] + \
+    [dimension for dimension in DIMENSIONS if dimension != 'dietary']
+
+
+def dietary_buckets(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+    if re.fullmatch(r'\W*(no|none|nothing|n\W?a|no requirements?)?\W*', text):
+        return ['none']
+    return [name for (name, pattern) in DIETARY_BUCKETS if re.search(pattern, text)] or ['other']
+
+
+def get_keys(queryset):
+    for (pk, *row) in queryset.values_list('pk', *FIELDS).iterator():
+        values = dict(zip(FIELDS, row))
+
+        dimensions = [('total', None)]
+        for dimension in DIMENSIONS:
+            if dimension == 'dietary':
+                dimensions.extend((dimension, b) for b in dietary_buckets(values['organizational__dietaryRequirements']))
+            elif isinstance(values[dimension], list):
+                dimensions.extend((dimension, v) for v in values[dimension])
+            else:
+                dimensions.append((dimension, values[dimension]))
+
+        yield (pk, {
+            (segment, dimension, json.dumps(value))
+            for (segment, condition) in SEGMENTS
+            if condition(values['approval__approval'], values['rsvp__going'])
+            for (dimension, value) in dimensions
+        })
+
+
+def backfill_statistics(apps, schema_editor):
+    Hacker = apps.get_model('hacker', 'Hacker')
+    Statistic = apps.get_model('hacker', 'Statistic')
+    StatisticsEntry = apps.get_model('hacker', 'StatisticsEntry')
+
+    counts = collections.Counter()
+    entries = []
+    for (pk, keys) in get_keys(Hacker.objects.all()):
+        counts.update(keys)
+        entries.append(StatisticsEntry(hacker_id=pk, keys=json.dumps(sorted(keys))))
+
+    StatisticsEntry.objects.bulk_create(entries)
+    Statistic.objects.bulk_create(
+        Statistic(segment=segment, dimension=dimension, value=value, count=count)
+        for ((segment, dimension, value), count) in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hacker', '0030_tombstone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Statistic',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('segment', models.CharField(max_length=32)),
+                ('dimension', models.CharField(max_length=255)),
+                ('value', models.CharField(max_length=512)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StatisticsEntry',
+            fields=[
+                ('hacker', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statisticsEntry', serialize=False, to='hacker.Hacker')),
+                ('keys', models.TextField(default='[]')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='statistic',
+            unique_together={('segment', 'dimension', 'value')},
+        ),
+        migrations.RunPython(backfill_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.1.15 on 2026-10-18 21:03
+
+import django.core.validators
+from django.db import migrations, models
+import hacker.models
+import hacker.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hacker', '0031_statistics'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='cv',
+            name='cv',
+            field=models.FileField(blank=True, db_index=True, help_text='Optionally upload your CV here. Uploading your CV <b>does not</b> constitute consent to transmitting the CV to our sponsors. We will contact you regarding this seperatly. ', null=True, storage=hacker.storage.ContentAddressedStorage('cvs'), upload_to=hacker.models.upload_to, validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['pdf'])]),
+        ),
+    ]
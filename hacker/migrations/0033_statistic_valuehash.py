@@ -0,0 +1,58 @@
+# Generated by Django 2.1.15 on 2026-10-18 21:31
+
+from django.db import migrations, models
+
+import hashlib
+import json
+
+
+def reencode(value):
+    """ Re-encodes a JSON value without escaping non-ASCII characters, as
+    done by hacker.statistics since this migration """
+
+    return json.dumps(json.loads(value), ensure_ascii=False)
+
+
+def reencode_statistics(apps, schema_editor):
+    Statistic = apps.get_model('hacker', 'Statistic')
+    StatisticsEntry = apps.get_model('hacker', 'StatisticsEntry')
+
+    for statistic in Statistic.objects.all().iterator():
+        statistic.value = reencode(statistic.value)
+        statistic.valueHash = hashlib.sha256(statistic.value.encode()).hexdigest()
+        statistic.save(update_fields=['value', 'valueHash'])
+
+    for entry in StatisticsEntry.objects.all().iterator():
+        keys = [[segment, dimension, reencode(value)] for (segment, dimension, value) in json.loads(entry.keys)]
+        entry.keys = json.dumps(sorted(keys), ensure_ascii=False)
+        entry.save(update_fields=['keys'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hacker', '0032_cv_storage'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='statistic',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='statistic',
+            name='valueHash',
+            field=models.CharField(default='', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='statistic',
+            name='value',
+            field=models.TextField(),
+        ),
+        migrations.RunPython(reencode_statistics, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='statistic',
+            unique_together={('segment', 'dimension', 'valueHash')},
+        ),
+    ]
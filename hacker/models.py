@@ -1,20 +1,44 @@
+import base64
 import collections
+import hashlib
+import os
+import time
+from urllib.parse import quote
 from django.conf import settings
 
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.exceptions import ObjectDoesNotExist
+from django.core.files import File
 from django.core.validators import FileExtensionValidator
+from django.utils import timezone
+from django.utils.http import urlencode
 
 from . import fields
+from .storage import cv_storage
 
 from phonenumber_field.modelfields import PhoneNumberField
 
+
+class HackerQuerySet(models.QuerySet):
+    def with_components(self):
+        """ Fetches all registered components, the approval and the rsvp
+        together with each hacker, in a single query """
+
+        return self.select_related('approval', 'rsvp', *self.model.components.keys())
+
+
 class Hacker(models.Model):
     """ The information about a Hacker """
 
+    objects = HackerQuerySet.as_manager()
+
     profile = models.OneToOneField(User, on_delete=models.CASCADE)
 
+    # Last time this hacker or any of its components, approval or rsvp was
+    # changed. Kept up-to-date for the related objects by hacker.hooks.
+    updatedAt = models.DateTimeField(auto_now=True, db_index=True)
+
     # name and basic contact information
     firstName = models.CharField(max_length=255, help_text="Your first name. ")
     middleName = models.CharField(max_length=255, blank=True, null=True,
@@ -75,8 +99,32 @@ class Hacker(models.Model):
         cls.components[name] = f
         return f
 
+    # Bitmask of the components that have been set up, one bit per entry in
+    # the components registry (in registration order). It is kept up-to-date
+    # by the hooks in hacker.hooks and can be checked and rebuilt using the
+    # 'setupprogress' management command.
+    setupProgress = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+
+    @classmethod
+    def component_bit(cls, component):
+        """ Returns the setupProgress bit of a given component """
+
+        return 1 << list(cls.components.keys()).index(component)
+
+    @classmethod
+    def setup_completed_mask(cls):
+        """ Returns the setupProgress value of a hacker that has set up
+        every component """
+
+        return (1 << len(cls.components)) - 1
+
     def has_component(self, component):
         """ Checks if this hacker has a given component"""
+
+        # registered components are read from the setup progress
+        if component in self.__class__.components:
+            return bool(self.setupProgress & self.component_bit(component))
+
         try:
             _ = getattr(self, component)
             return True
@@ -87,12 +135,16 @@ class Hacker(models.Model):
         """ Gets the first unset component or returns None if it
         already exists. """
 
-        for c in self.__class__.components.keys():
-            if not self.has_component(c):
+        for (i, c) in enumerate(self.__class__.components.keys()):
+            if not self.setupProgress & (1 << i):
                 return c
 
         return None
 
+    @property
+    def setupCompleted(self):
+        return self.setupProgress == self.setup_completed_mask()
+
     def __str__(self):
         return "Hacker [{}]".format(self.fullName)
 
@@ -100,6 +152,7 @@ class Hacker(models.Model):
 class Approval(models.Model):
     """ The approval status of a hacker """
     hacker = models.OneToOneField(Hacker, related_name='approval', on_delete=models.CASCADE)
+    updatedAt = models.DateTimeField(auto_now=True, db_index=True)
 
     approval = models.BooleanField(default=False, blank=True,
                                    help_text="Has the application been approved?")
@@ -107,6 +160,7 @@ class Approval(models.Model):
 class RSVP(models.Model):
     """ The approval status of a hacker """
     hacker = models.OneToOneField(Hacker, related_name='rsvp', on_delete=models.CASCADE)
+    updatedAt = models.DateTimeField(auto_now=True, db_index=True)
 
     going = models.BooleanField(default=False, blank=True,
                                    help_text="Are you coming to jacobsHack! 2018?")
@@ -117,6 +171,7 @@ class AcademicData(models.Model):
     """ The academic data of a Hacker """
 
     hacker = models.OneToOneField(Hacker, related_name='academic', on_delete=models.CASCADE)
+    updatedAt = models.DateTimeField(auto_now=True, db_index=True)
 
     degree = fields.DegreeField(help_text="Which academic degree are you hoping to achieve? ")
     major = models.CharField(max_length=255, help_text="What is your current major? ")
@@ -129,6 +184,7 @@ class HackathonApplication(models.Model):
     """ The hackathon application  """
 
     hacker = models.OneToOneField(Hacker, related_name='application', on_delete=models.CASCADE)
+    updatedAt = models.DateTimeField(auto_now=True, db_index=True)
 
     whyJacobsHack = models.TextField()
 
@@ -142,6 +198,7 @@ class Organizational(models.Model):
     """ The organizational information about a Hacker """
 
     hacker = models.OneToOneField(Hacker, related_name='organizational', on_delete=models.CASCADE)
+    updatedAt = models.DateTimeField(auto_now=True, db_index=True)
 
     shirtSize = fields.ShirtSizeField(help_text="Select your EU T-Shirt size. ")
 
@@ -161,17 +218,21 @@ class Organizational(models.Model):
     comments = models.TextField(blank=True,
                                 help_text="If you are applying as a Team, mention the names of your teammates here. ")
 
-import os.path
 def upload_to(instance, filename):
-    return 'cvs/{0}{1}'.format(instance.hacker.profile.username, os.path.splitext(filename)[1])
+    # only the extension is kept, CVs are stored under their hash by
+    # hacker.storage.cv_storage
+    return filename
 
 @Hacker.register_component
 class CV(models.Model):
     """ The CV of a Hacker """
 
     hacker = models.OneToOneField(Hacker, related_name='cv', on_delete=models.CASCADE)
+    updatedAt = models.DateTimeField(auto_now=True, db_index=True)
     cv = models.FileField(
         upload_to=upload_to,
+        storage=cv_storage,
+        db_index=True,
         validators=[FileExtensionValidator(allowed_extensions=["pdf"])],
         null=True,
         blank=True,
@@ -190,3 +251,171 @@ class CV(models.Model):
     @property
     def filename(self):
         return '{}.pdf'.format(self.hacker.profile.username)
+
+    @staticmethod
+    def signed_url_expires():
+        """ The expiry time of the signed URLs generated now, or None if the
+        URLs are not signed. It is rounded, so that the URLs (and the pages
+        and cached downloads using them) stay the same for a while. """
+
+        if not settings.CV_SIGNING_SECRET:
+            return None
+
+        ttl = settings.CV_SIGNED_URL_TTL
+        return (int(time.time()) // ttl + 2) * ttl
+
+    @property
+    def download_url(self):
+        """ The URL to download the CV from. If CV_SIGNING_SECRET is set, this
+        is a signed URL that nginx serves without asking django (see
+        docker/django.conf), otherwise the URL of registry.views.cv. """
+
+        if not self.has_cv:
+            return None
+
+        expires = self.signed_url_expires()
+        if expires is None:
+            return self.cv.url
+
+        # nginx checks the md5 of "$secure_link_expires$uri$arg_filename <secret>",
+        # where the filename (sent by nginx, as files are named by their hash)
+        # is not url-decoded
+        uri = settings.SIGNED_PREFIX + settings.MEDIA_URL + self.cv.name
+        filename = quote(self.filename)
+        digest = hashlib.md5('{}{}{} {}'.format(expires, uri, filename, settings.CV_SIGNING_SECRET).encode('utf-8')).digest()
+        signature = base64.urlsafe_b64encode(digest).decode('ascii').rstrip('=')
+
+        return '{}{}?{}&filename={}'.format(settings.SIGNED_PREFIX, self.cv.url,
+                                            urlencode({'md5': signature, 'expires': expires}), filename)
+
+
+class SearchDocument(models.Model):
+    """ The searchable text of a hacker, maintained by hacker.search """
+
+    hacker = models.OneToOneField(Hacker, primary_key=True, related_name='searchDocument', on_delete=models.CASCADE)
+    text = models.TextField()
+
+
+class Job(models.Model):
+    """ A unit of work run in the background by the 'runjobs' command, see
+    hacker.jobs """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATE_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    # the name the job function is registered under, and its (JSON) arguments
+    name = models.CharField(max_length=255)
+    arguments = models.TextField(default='{}')
+    description = models.CharField(max_length=255, blank=True)
+
+    createdBy = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    createdAt = models.DateTimeField(auto_now_add=True)
+
+    state = models.CharField(max_length=16, choices=STATE_CHOICES, default=PENDING, db_index=True)
+
+    # pending jobs are not run before this time (to back off retries)
+    runAfter = models.DateTimeField(default=timezone.now, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    maxAttempts = models.PositiveIntegerField(default=3)
+
+    # the worker running the job, and the last time it reported progress
+    worker = models.CharField(max_length=255, blank=True)
+    startedAt = models.DateTimeField(null=True, blank=True)
+    heartbeatAt = models.DateTimeField(null=True, blank=True)
+    finishedAt = models.DateTimeField(null=True, blank=True)
+
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+
+    # a message of a finished job (or the error of the last attempt)
+    message = models.TextField(blank=True)
+    result = models.FileField(upload_to='jobs/', null=True, blank=True)
+
+    # minimum time (in seconds) between two progress updates of a running job
+    REPORT_INTERVAL = 1
+
+    def report(self, progress, total=None):
+        """ Reports the progress of a running job. Only writes to the
+        database once every REPORT_INTERVAL seconds, unless the total
+        changes. """
+
+        now = time.monotonic()
+        if total is None and now - getattr(self, '_reportedAt', 0) < self.REPORT_INTERVAL:
+            return
+        self._reportedAt = now
+
+        self.progress = progress
+        if total is not None:
+            self.total = total
+        Job.objects.filter(pk=self.pk).update(progress=self.progress, total=self.total, heartbeatAt=timezone.now())
+
+    def heartbeat(self):
+        """ Reports that a running job is still making progress, without
+        changing its progress. Just as throttled as report. """
+
+        self.report(self.progress)
+
+    def save_result(self, name, content):
+        """ Stores a file as the result of a running job """
+
+        self.result.save(name, File(content), save=False)
+        Job.objects.filter(pk=self.pk).update(result=self.result.name)
+
+    @property
+    def has_result(self):
+        return self.state == self.DONE and bool(self.result)
+
+    @property
+    def internal_url(self):
+        if self.has_result:
+            return settings.INTERNAL_PREFIX + self.result.url
+
+    @property
+    def filename(self):
+        return os.path.basename(self.result.name)
+
+    def __str__(self):
+        return "Job #{} [{}]".format(self.pk, self.description or self.name)
+
+
+class Tombstone(models.Model):
+    """ A record of a deleted hacker, so that incremental exports can report
+    the deletion """
+
+    hackerId = models.PositiveIntegerField(db_index=True)
+    username = models.CharField(max_length=150, blank=True)
+    deletedAt = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return "Tombstone [{}]".format(self.username or self.hackerId)
+
+
+class Statistic(models.Model):
+    """ The number of hackers in a segment with a value of a dimension,
+    maintained by hacker.statistics """
+
+    segment = models.CharField(max_length=32)
+    dimension = models.CharField(max_length=255)
+    # the value, encoded as JSON, and its hash (see hacker.statistics.value_hash)
+    value = models.TextField()
+    valueHash = models.CharField(max_length=64)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('segment', 'dimension', 'valueHash')
+
+
+class StatisticsEntry(models.Model):
+    """ The keys of hacker.statistics a hacker is currently counted under """
+
+    hacker = models.OneToOneField(Hacker, primary_key=True, related_name='statisticsEntry', on_delete=models.CASCADE)
+    keys = models.TextField(default='[]')
@@ -0,0 +1,199 @@
+""" A full-text search index over hackers and their applications.
+
+Every hacker has a SearchDocument holding the normalized words of the fields
+in SEARCH_FIELDS. The documents are kept up-to-date by hacker.hooks and are
+indexed by the database itself:
+
+- on SQLite by an FTS5 table, kept in sync with the documents by triggers
+- on PostgreSQL by a GIN index over the tsvector of each document
+
+Queries match every word of the query as a prefix and are ranked by the
+database (bm25 on SQLite, ts_rank on PostgreSQL).
+"""
+
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from hacker.autocomplete import normalize
+from hacker.models import Hacker, SearchDocument
+
+# Fields (relative to Hacker) that are searchable
+SEARCH_FIELDS = [
+    'firstName', 'middleName', 'lastName', 'email',
+    'academic__school', 'academic__major',
+    'application__whyJacobsHack', 'application__whatHaveYouBuilt',
+    'organizational__comments',
+]
+
+# Models whose changes require updating the search document of their hacker
+SEARCH_MODELS = [Hacker] + [
+    Hacker._meta.get_field(name).related_model
+    for name in {path.split('__')[0] for path in SEARCH_FIELDS if '__' in path}
+]
+
+FTS_TABLE = 'hacker_searchdocument_fts'
+
+
+def tokenize(text):
+    """ Returns the normalized words of text, the same on every backend """
+
+    return re.findall(r'[^\W_]+', normalize(text))
+
+
+def document_text(values):
+    """ Returns the text of a search document given the values of its fields """
+
+    return ' '.join(word for value in values if value for word in tokenize(str(value)))
+
+
+def update_documents(hacker_ids):
+    """ Updates the search documents of the given hackers, removing those of
+    hackers that no longer exist """
+
+    hacker_ids = set(hacker_ids)
+    for (pk, *values) in Hacker.objects.filter(pk__in=hacker_ids).values_list('pk', *SEARCH_FIELDS):
+        hacker_ids.discard(pk)
+        text = document_text(values)
+        if not SearchDocument.objects.filter(hacker_id=pk).update(text=text):
+            SearchDocument.objects.create(hacker_id=pk, text=text)
+
+    if hacker_ids:
+        SearchDocument.objects.filter(hacker_id__in=hacker_ids).delete()
+
+
+def rebuild_index(batch_size=1000):
+    """ Re-creates the search index and the search documents of all hackers,
+    and returns the number of documents """
+
+    # drop the index first, so that it is not updated for each document
+    drop_index()
+    SearchDocument.objects.all().delete()
+    create_index()
+
+    count = 0
+    batch = []
+    for (pk, *values) in Hacker.objects.order_by().values_list('pk', *SEARCH_FIELDS).iterator():
+        batch.append(SearchDocument(hacker_id=pk, text=document_text(values)))
+        if len(batch) >= batch_size:
+            SearchDocument.objects.bulk_create(batch)
+            count += len(batch)
+            batch = []
+    SearchDocument.objects.bulk_create(batch)
+    count += len(batch)
+
+    return count
+
+
+#
+# Database specific parts
+#
+
+class SQLiteBackend(object):
+    create_sql = [
+        "CREATE VIRTUAL TABLE {fts} USING fts5(text, content='hacker_searchdocument', content_rowid='hacker_id', prefix='2 3')",
+        "CREATE TRIGGER {fts}_ai AFTER INSERT ON hacker_searchdocument BEGIN "
+        "INSERT INTO {fts}(rowid, text) VALUES (new.hacker_id, new.text); END",
+        "CREATE TRIGGER {fts}_ad AFTER DELETE ON hacker_searchdocument BEGIN "
+        "INSERT INTO {fts}({fts}, rowid, text) VALUES ('delete', old.hacker_id, old.text); END",
+        "CREATE TRIGGER {fts}_au AFTER UPDATE ON hacker_searchdocument BEGIN "
+        "INSERT INTO {fts}({fts}, rowid, text) VALUES ('delete', old.hacker_id, old.text); "
+        "INSERT INTO {fts}(rowid, text) VALUES (new.hacker_id, new.text); END",
+    ]
+    drop_sql = [
+        "DROP TRIGGER IF EXISTS {fts}_ai",
+        "DROP TRIGGER IF EXISTS {fts}_ad",
+        "DROP TRIGGER IF EXISTS {fts}_au",
+        "DROP TABLE IF EXISTS {fts}",
+    ]
+
+    # the table joined to hackers, and the condition to join on
+    table = FTS_TABLE
+    join = '{0}.rowid = hacker_hacker.id'.format(FTS_TABLE)
+
+    def query(self, words):
+        return ' '.join('"{}"*'.format(word) for word in words)
+
+    def match(self, query):
+        return ('{0} MATCH %s'.format(FTS_TABLE), [query])
+
+    def rank(self, query):
+        # bm25 is smaller for better matches
+        return ('-{}.rank'.format(FTS_TABLE), [])
+
+
+class PostgreSQLBackend(object):
+    create_sql = [
+        "CREATE INDEX {fts} ON hacker_searchdocument USING GIN (to_tsvector('simple', text))",
+    ]
+    drop_sql = [
+        "DROP INDEX IF EXISTS {fts}",
+    ]
+
+    table = 'hacker_searchdocument'
+    join = 'hacker_searchdocument.hacker_id = hacker_hacker.id'
+
+    def query(self, words):
+        return ' & '.join('{}:*'.format(word) for word in words)
+
+    def match(self, query):
+        return ("to_tsvector('simple', hacker_searchdocument.text) @@ to_tsquery('simple', %s)", [query])
+
+    def rank(self, query):
+        return ("ts_rank(to_tsvector('simple', hacker_searchdocument.text), to_tsquery('simple', %s))", [query])
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend(),
+    'postgresql': PostgreSQLBackend(),
+}
+
+
+def get_backend(conn=connection):
+    """ Returns the search backend of a database connection, or None if
+    full-text search is not supported """
+
+    return BACKENDS.get(conn.vendor)
+
+
+def create_index(conn=connection):
+    """ Creates the database index of the search documents """
+
+    backend = get_backend(conn)
+    if backend is not None:
+        with conn.cursor() as cursor:
+            for sql in backend.create_sql:
+                cursor.execute(sql.format(fts=FTS_TABLE))
+
+
+def drop_index(conn=connection):
+    """ Drops the database index of the search documents """
+
+    backend = get_backend(conn)
+    if backend is not None:
+        with conn.cursor() as cursor:
+            for sql in backend.drop_sql:
+                cursor.execute(sql.format(fts=FTS_TABLE))
+
+
+def search(queryset, text, ranked=True):
+    """ Filters a queryset of hackers to those matching the search text. If
+    ranked is True, orders them by relevance (best first). """
+
+    words = tokenize(text)
+    if not words:
+        return queryset
+
+    backend = get_backend()
+    query = backend.query(words)
+
+    # join the matching documents, so that their rank is computed only once,
+    # and only when ordering by it (i.e. not when counting them)
+    (where, params) = backend.match(query)
+    queryset = queryset.extra(tables=[backend.table], where=[backend.join, where], params=params)
+
+    if ranked:
+        queryset = queryset.order_by(RawSQL(*backend.rank(query)).desc(), '-pk')
+
+    return queryset
@@ -0,0 +1,294 @@
+""" Materialized statistics about the applicants, for the admin statistics page.
+
+Each hacker is counted under a set of keys (segment, dimension, value), e.g.
+('going', 'organizational__shirtSize', 'M'). A Statistic row holds the number
+of hackers counted under each key, and a StatisticsEntry holds the keys each
+hacker is currently counted under. When a hacker changes, its keys are
+recomputed and only the difference is applied to the counts, so that the
+statistics never have to be computed over all hackers (except by the
+'statistics --rebuild' command).
+
+The statistics are kept up-to-date by hacker.hooks.
+"""
+
+import collections
+import hashlib
+import json
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from hacker.autocomplete import normalize
+from hacker.labels import get_path_labels
+from hacker.models import Hacker, Statistic, StatisticsEntry
+
+# The segments of hackers the statistics are broken down into, and the
+# condition on the approval and the rsvp of a hacker to be in each
+SEGMENTS = [
+    ('all', 'Applicants', lambda approval, going: True),
+    ('approved', 'Approved', lambda approval, going: approval is True),
+    ('going', 'Going', lambda approval, going: going is True),
+    ('not_going', 'Not going', lambda approval, going: going is False),
+]
+
+# The dimensions (field paths relative to Hacker) that are counted
+DIMENSIONS = [
+    ('organizational__shirtSize', 'Shirt Size'),
+    ('dietary', 'Dietary Requirements'),
+    ('academic__school', 'School'),
+    ('academic__degree', 'Degree'),
+    ('academic__year', 'Year'),
+    ('organizational__needVisa', 'Visa'),
+    ('organizational__needReimbursement', 'Reimbursement'),
+    ('application__firstHackathon', 'First Hackathon'),
+    ('nationality', 'Nationality'),
+]
+
+# The dimension counting all hackers of a segment
+TOTAL = 'total'
+
+# Buckets of the (free-text) dietary requirements, matched against the
+# normalized text. A hacker may be counted in several buckets.
+DIETARY_BUCKETS = [
+    ('vegan', 'Vegan', r'vegan'),
+    ('vegetarian', 'Vegetarian', r'veg(etari|gie|gi)'),
+    ('gluten', 'Gluten-free', r'gluten|c(o|oe)?eliac'),
+    ('lactose', 'Lactose-free', r'lactose|dairy|milk'),
+    ('nuts', 'Nut allergy', r'nut'),
+    ('halal', 'Halal', r'halal'),
+    ('kosher', 'Kosher', r'kosher'),
+    ('pork', 'No pork', r'pork'),
+]
+DIETARY_NONE = ('none', 'None')
+DIETARY_OTHER = ('other', 'Other')
+DIETARY_LABELS = dict([(name, title) for (name, title, _) in DIETARY_BUCKETS] + [DIETARY_NONE, DIETARY_OTHER])
+
+_none_re = re.compile(r'\W*(no|none|nothing|n\W?a|no requirements?)?\W*')
+
+# The fields read to compute the keys of a hacker
+_FIELDS = ['approval__approval', 'rsvp__going', 'organizational__dietaryRequirements'] + \
+    [dimension for (dimension, _) in DIMENSIONS if dimension != 'dietary']
+
+
+def dietary_buckets(text):
+    """ Returns the dietary buckets of a free-text dietary requirement """
+
+    text = normalize(text or '')
+    if _none_re.fullmatch(text):
+        return [DIETARY_NONE[0]]
+
+    buckets = [name for (name, _, pattern) in DIETARY_BUCKETS if re.search(pattern, text)]
+    return buckets or [DIETARY_OTHER[0]]
+
+
+def get_dimension_labels(dimension):
+    """ Returns a dict mapping the values of a dimension to their labels, or
+    None if it has none """
+
+    if dimension == 'dietary':
+        return DIETARY_LABELS
+    return get_path_labels(Hacker, dimension)
+
+
+def get_keys(queryset):
+    """ Generates the id of each hacker in queryset along with the set of
+    keys it is counted under """
+
+    for (pk, *row) in queryset.values_list('pk', *_FIELDS).iterator():
+        values = dict(zip(_FIELDS, row))
+
+        dimensions = [(TOTAL, None)]
+        for (dimension, _) in DIMENSIONS:
+            if dimension == 'dietary':
+                dimensions.extend((dimension, b) for b in dietary_buckets(values['organizational__dietaryRequirements']))
+            elif isinstance(values[dimension], list):
+                dimensions.extend((dimension, v) for v in values[dimension])
+            else:
+                dimensions.append((dimension, values[dimension]))
+
+        yield (pk, {
+            (segment, dimension, json.dumps(value, ensure_ascii=False))
+            for (segment, _, condition) in SEGMENTS
+            if condition(values['approval__approval'], values['rsvp__going'])
+            for (dimension, value) in dimensions
+        })
+
+
+def value_hash(value):
+    """ Returns the hash of an encoded value a Statistic is unique by, as the
+    values themselves may be too long to be indexed """
+
+    return hashlib.sha256(value.encode()).hexdigest()
+
+
+def apply_deltas(deltas):
+    """ Adds the given changes (a dict mapping keys to the difference of
+    their counts) to the Statistic rows """
+
+    for ((segment, dimension, value), delta) in deltas.items():
+        if not delta:
+            continue
+
+        statistic = Statistic.objects.filter(segment=segment, dimension=dimension, valueHash=value_hash(value))
+        if statistic.update(count=F('count') + delta):
+            continue
+
+        try:
+            with transaction.atomic():
+                Statistic.objects.create(segment=segment, dimension=dimension, value=value,
+                                         valueHash=value_hash(value), count=delta)
+        except IntegrityError:
+            # created concurrently
+            statistic.update(count=F('count') + delta)
+
+
+def encode_keys(keys):
+    """ Encodes a set of keys to be stored in a StatisticsEntry """
+
+    return json.dumps(sorted(keys), ensure_ascii=False)
+
+
+def decode_keys(keys):
+    """ Decodes the keys stored in a StatisticsEntry """
+
+    return {tuple(key) for key in json.loads(keys)}
+
+
+def update_statistics(hacker_ids, chunk_size=500):
+    """ Updates the statistics after the given hackers have changed (or
+    have been deleted) """
+
+    hacker_ids = sorted(set(hacker_ids))
+    deltas = collections.Counter()
+
+    # the entries and the counts are changed together. The hackers and their
+    # entries are locked (in the same order as everywhere else), so that
+    # concurrent updates of the same hacker are not both applied to the
+    # counts against the same old entry.
+    with transaction.atomic():
+        for start in range(0, len(hacker_ids), chunk_size):
+            chunk = hacker_ids[start:start + chunk_size]
+            list(Hacker.objects.filter(pk__in=chunk).order_by('pk').select_for_update().values_list('pk', flat=True))
+            locked = StatisticsEntry.objects.filter(hacker_id__in=chunk).order_by('hacker_id').select_for_update()
+            entries = {pk: decode_keys(keys) for (pk, keys) in locked.values_list('hacker_id', 'keys')}
+            current = dict(get_keys(Hacker.objects.filter(pk__in=chunk)))
+
+            changed = [pk for pk in chunk if current.get(pk) != entries.get(pk)]
+            if not changed:
+                continue
+
+            for pk in changed:
+                (old, new) = (entries.get(pk, set()), current.get(pk, set()))
+                deltas.update({key: 1 for key in new - old})
+                deltas.subtract({key: 1 for key in old - new})
+
+            StatisticsEntry.objects.filter(hacker_id__in=changed).delete()
+            StatisticsEntry.objects.bulk_create(
+                StatisticsEntry(hacker_id=pk, keys=encode_keys(current[pk])) for pk in changed if pk in current
+            )
+
+        apply_deltas(deltas)
+
+
+def remove_statistics(hacker_ids):
+    """ Removes the given hackers from the statistics, before they are
+    deleted (as the deletion also deletes their entries) """
+
+    deltas = collections.Counter()
+    entries = StatisticsEntry.objects.filter(hacker_id__in=hacker_ids)
+    with transaction.atomic():
+        for keys in entries.order_by('hacker_id').select_for_update().values_list('keys', flat=True):
+            deltas.subtract({key: 1 for key in decode_keys(keys)})
+        entries.delete()
+        apply_deltas(deltas)
+
+
+def rebuild_statistics(batch_size=1000):
+    """ Re-computes the statistics of all hackers, and returns the number of
+    hackers """
+
+    Statistic.objects.all().delete()
+    StatisticsEntry.objects.all().delete()
+
+    counts = collections.Counter()
+    batch = []
+    for (pk, keys) in get_keys(Hacker.objects.order_by()):
+        counts.update(keys)
+        batch.append(StatisticsEntry(hacker_id=pk, keys=encode_keys(keys)))
+        if len(batch) >= batch_size:
+            StatisticsEntry.objects.bulk_create(batch)
+            batch = []
+    StatisticsEntry.objects.bulk_create(batch)
+
+    Statistic.objects.bulk_create(
+        Statistic(segment=segment, dimension=dimension, value=value, valueHash=value_hash(value), count=count)
+        for ((segment, dimension, value), count) in counts.items()
+    )
+
+    return sum(count for ((segment, dimension, _), count) in counts.items() if segment == 'all' and dimension == TOTAL)
+
+
+def check_statistics():
+    """ Re-computes the statistics of all hackers without changing them, and
+    returns a tuple of the number of hackers, the number of hackers whose
+    entry is outdated and the number of counts that differ """
+
+    entries = {pk: decode_keys(keys) for (pk, keys) in StatisticsEntry.objects.values_list('hacker_id', 'keys').iterator()}
+
+    counts = collections.Counter()
+    (hackers, outdated) = (0, 0)
+    for (pk, keys) in get_keys(Hacker.objects.order_by()):
+        counts.update(keys)
+        hackers += 1
+        if entries.pop(pk, None) != keys:
+            outdated += 1
+
+    # entries of hackers that no longer exist
+    outdated += len(entries)
+
+    stored = collections.Counter({
+        (segment, dimension, value): count
+        for (segment, dimension, value, count) in Statistic.objects.values_list('segment', 'dimension', 'value', 'count').iterator()
+    })
+    differing = len({key for key in set(counts) | set(stored) if counts[key] != stored[key]})
+
+    return (hackers, outdated, differing)
+
+
+def get_tables(limit=20):
+    """ Returns the statistics as a list of tables (one per dimension), each
+    a dict with a title, the rows (a label followed by the count of each
+    segment, most frequent first) and the number of rows left out """
+
+    counts = collections.defaultdict(dict)
+    for (segment, dimension, value, count) in Statistic.objects.filter(count__gt=0).values_list('segment', 'dimension', 'value', 'count'):
+        counts[dimension].setdefault(value, {})[segment] = count
+
+    segments = [name for (name, _, _) in SEGMENTS]
+    totals = counts.get(TOTAL, {}).get(json.dumps(None), {})
+
+    tables = [{
+        'title': 'Total',
+        'rows': [['Hackers'] + [totals.get(segment, 0) for segment in segments]],
+        'more': 0,
+    }]
+    for (dimension, title) in DIMENSIONS:
+        labels = get_dimension_labels(dimension) or {}
+
+        def label(value):
+            value = json.loads(value)
+            if value is None:
+                return '-'
+            if isinstance(value, bool):
+                return 'Yes' if value else 'No'
+            return labels.get(value, str(value))
+
+        values = sorted(counts.get(dimension, {}).items(), key=lambda item: -item[1].get('all', 0))
+        tables.append({
+            'title': title,
+            'rows': [[label(value)] + [c.get(segment, 0) for segment in segments] for (value, c) in values[:limit]],
+            'more': max(len(values) - limit, 0),
+        })
+
+    return tables
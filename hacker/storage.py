@@ -0,0 +1,115 @@
+""" Content-addressed storage of uploaded files.
+
+Files are stored under the SHA-256 hash of their content, e.g.
+'cvs/ab/cd/abcd...ef.pdf', fanned out into directories by the first bytes
+of the hash. Identical uploads are stored only once, and a stored file never
+changes.
+
+Files are written to a temporary file next to them and then renamed, so
+that a file stored under a hash is always complete. Two identical files
+stored at the same time replace each other with the same content.
+
+Files are never deleted when the objects referencing them change, as other
+objects may reference the same file. Instead, the 'cleancvs' command
+removes the files that are no longer referenced (and temporary files left
+by failed writes).
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+import uuid
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+# The name of a file stored by ContentAddressedStorage, relative to its prefix
+HASHED_NAME_RE = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.\w+)?$')
+
+
+def hash_content(content):
+    """ Returns the hex digest of the SHA-256 hash of a File """
+
+    sha = hashlib.sha256()
+    for chunk in content.chunks():
+        sha.update(chunk)
+    return sha.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """ A FileSystemStorage storing files under prefix by their hash,
+    keeping only the extension of the name they are saved under """
+
+    def __init__(self, prefix, **kwargs):
+        super().__init__(**kwargs)
+        self.prefix = prefix
+
+    def hashed_name(self, name, content):
+        """ Returns the name a file is stored under """
+
+        digest = hash_content(content)
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(self.prefix, digest[:2], digest[2:4], digest + extension)
+
+    def is_hashed_name(self, name):
+        """ Checks if a name is one this storage stores files under """
+
+        (prefix, _, rest) = name.partition('/')
+        return prefix == self.prefix and HASHED_NAME_RE.match(rest) is not None
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.hashed_name(name, content)
+
+        # an identical file has been stored before, which must not be removed
+        # as unreferenced while the new reference is saved (see 'cleancvs')
+        if self.exists(name):
+            try:
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                # removed by 'cleancvs' in the meantime
+                pass
+
+        return self._save(name, content)
+
+    def _save(self, name, content):
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        if self.directory_permissions_mode is not None:
+            old_umask = os.umask(0)
+            try:
+                os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+            finally:
+                os.umask(old_umask)
+        else:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_path = '{}.{}.part'.format(full_path, uuid.uuid4().hex)
+        try:
+            with open(temp_path, 'xb') as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+
+            # atomically, replacing an identical file stored at the same time
+            os.replace(temp_path, full_path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+        return name
+
+
+cv_storage = ContentAddressedStorage('cvs')
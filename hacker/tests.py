@@ -1,3 +1,1053 @@
-from django.test import TestCase
+import csv
+import datetime
+import gzip
+import importlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import unittest
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+
+from django.apps import apps
+from django.contrib import admin
+from django.conf import settings
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone, translation
+from django.utils.dateparse import parse_datetime
+
+from hacker import columnar, jobs, search, statistics
+from hacker.actions import convert_rows, write_xslx
+from hacker.autocomplete import PrefixIndex
+from hacker.admin import FacetCountsMixin, HackerAdmin, SetupCompleted
+from hacker.hooks import hackers_changed
+from hacker.fields import CachedOptionsMixin, ListTextWidget
+from hacker.labels import get_label
+from hacker.storage import cv_storage
+from hacker.versions import get_versions, hacker_version_name, hackers_version_name
+from hacker.models import Hacker, AcademicData, HackathonApplication, Organizational, CV, Approval, Job, Tombstone, Statistic
+from registry.forms import HackerForm
+
+
+def make_hacker(username='hackerman', complete=True):
+    """ Creates a user along with a hacker, and all of its components if
+    complete is True. The password of the user is 'pw'. """
+
+    user = User.objects.create_user(username, None, password='pw')
+    hacker = Hacker.objects.create(
+        profile=user, firstName='Huber', lastName='Ackerman', gender='Male', race='Hispanic',
+        email='{}@example.com'.format(username), phoneNumber='+4915112345678', dob=datetime.date(1990, 1, 1),
+        nationality=['DE', 'FR'], countryOfResidence='DE',
+        jacobsHackTerms=True, mlhCodeOfConduct=True, mlhContestTerms=True,
+    )
+
+    if complete:
+        AcademicData.objects.create(hacker=hacker, degree='bsc', major='CS', year=2020, school='Jacobs University')
+        HackathonApplication.objects.create(hacker=hacker, whyJacobsHack='fun', whatHaveYouBuilt='stuff')
+        Organizational.objects.create(hacker=hacker, shirtSize='M')
+        CV.objects.create(hacker=hacker)
+
+    return hacker
+
+
+class MediaTestMixin(object):
+    """ Stores the files of each test in a temporary MEDIA_ROOT """
+
+    def setUp(self):
+        super().setUp()
+
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+
+        override = self.settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+
+class LabelsTest(TestCase):
+    def test_get_label(self):
+        self.assertEqual(get_label(AcademicData, 'degree', 'bsc'), 'Bachelor of Science')
+        self.assertEqual(get_label(Hacker, 'nationality', ['DE', 'FR']), ['Germany', 'France'])
+
+        # values which are not among the choices
+        self.assertEqual(get_label(AcademicData, 'degree', 'phd-ish'), 'phd-ish')
+        self.assertEqual(get_label(Hacker, 'nationality', ['DE', 'XX']), ['Germany', 'XX'])
+        self.assertEqual(get_label(Hacker, 'firstName', 'Huber'), 'Huber')
+
+
+class ChangelistTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+
+    def test_constant_queries(self):
+        for count in (2, 20):
+            while Hacker.objects.count() < count:
+                hacker = make_hacker('hacker{}'.format(Hacker.objects.count()))
+                Approval.objects.create(hacker=hacker, approval=True)
+
+            # the first request fills the facet cache
+            cache.clear()
+            self.client.get('/admin/hacker/hacker/')
+
+            # the session, the user and the rows with all of their columns
+            with self.assertNumQueries(3):
+                response = self.client.get('/admin/hacker/hacker/')
+            self.assertEqual(len(response.context['cl'].result_list), count)
+
+
+class FacetsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+
+    def test_counts(self):
+        hackers = [make_hacker('hacker{}'.format(i)) for i in range(3)]
+        Approval.objects.create(hacker=hackers[0], approval=True)
+        AcademicData.objects.filter(hacker=hackers[1]).update(school='Constructor University')
+
+        response = self.client.get('/admin/hacker/hacker/')
+        self.assertContains(response, 'Accepted (1)')
+        self.assertContains(response, 'Pending (2)')
+        self.assertContains(response, 'Jacobs University (2)')
+
+        response = self.client.get('/admin/hacker/hacker/', {'academic__school': 'Jacobs University'})
+        self.assertContains(response, 'Accepted (1)')
+        self.assertContains(response, 'Pending (1)')
+
+    def test_default_lookup_counts(self):
+        self.assertEqual(dict(FacetCountsMixin().get_lookup_counts({True: 2, None: 1})), {'True': 2, 'None': 1})
+
+    def test_changed_since_interval_moves(self):
+        now = timezone.now()
+        hacker = make_hacker()
+        Hacker.objects.filter(pk=hacker.pk).update(updatedAt=now - datetime.timedelta(hours=23))
+
+        with mock.patch('django.utils.timezone.now', return_value=now):
+            response = self.client.get('/admin/hacker/hacker/', {'changed_since': '1d'})
+        self.assertContains(response, 'Pending (1)')
+
+        # the hacker is no longer changed in the last 24 hours, without any
+        # change invalidating the cached counts
+        with mock.patch('django.utils.timezone.now', return_value=now + datetime.timedelta(hours=2)):
+            response = self.client.get('/admin/hacker/hacker/', {'changed_since': '1d'})
+        self.assertEqual(response.context['cl'].result_count, 0)
+        self.assertContains(response, 'Pending (0)')
+
+
+class SearchTest(TestCase):
+    def setUp(self):
+        self.first = make_hacker('first')
+        self.second = make_hacker('second')
+
+        self.second.firstName = 'Zoë'
+        self.second.save()
+        application = self.first.application
+        application.whatHaveYouBuilt = 'A robot playing chess'
+        application.save()
+
+    def test_search(self):
+        hackers = Hacker.objects.all()
+        self.assertEqual(list(search.search(hackers, 'zoe')), [self.second])
+        self.assertEqual(list(search.search(hackers, 'ches rob')), [self.first])
+        self.assertEqual(set(search.search(hackers, 'ackerm')), {self.first, self.second})
+        self.assertEqual(list(search.search(hackers, 'first@exam')), [self.first])
+        self.assertEqual(set(search.search(hackers, '"*()')), {self.first, self.second})
+
+        self.second.delete()
+        self.assertEqual(list(search.search(hackers, 'ackerman')), [self.first])
+
+    def test_rebuild(self):
+        search.rebuild_index()
+        self.assertEqual(list(search.search(Hacker.objects.all(), 'zoe')), [self.second])
+
+    def test_admin(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+
+        response = self.client.get('/admin/hacker/hacker/', {'q': 'chess'})
+        self.assertContains(response, 'first@example.com')
+        self.assertNotContains(response, 'second@example.com')
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+
+        # with duplicate and null values in the ordering columns
+        names = ['Zed', 'Amy', 'Bob', 'Amy', 'Cat']
+        for i in range(23):
+            hacker = make_hacker('hacker{:02}'.format(i))
+            hacker.firstName = names[i % len(names)]
+            hacker.middleName = 'M' if i % 3 == 0 else None
+            hacker.save()
+
+    def get(self, url):
+        response = self.client.get('/admin/hacker/hacker/' + url)
+        self.assertEqual(response.status_code, 200, url)
+        return (response.context['cl'], [hacker.pk for hacker in response.context['cl'].result_list])
+
+    def walk(self, url):
+        """ Returns the pks of each page, following the 'Next' links """
+
+        pages = []
+        while url is not None:
+            (cl, pks) = self.get(url)
+            self.assertIsNotNone(cl.keyset, url)
+            pages.append(pks)
+            url = cl.keyset['next_url']
+
+            # the 'Previous' link of the second page leads to the first page
+            if len(pages) == 2:
+                self.assertEqual(self.get(cl.keyset['previous_url'])[1], pages[0])
+
+        return pages
+
+    @mock.patch.object(HackerAdmin, 'list_per_page', 5)
+    def test_pages(self):
+        pages = self.walk('?')
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+        self.assertEqual(sum(pages, []), list(Hacker.objects.order_by('-pk').values_list('pk', flat=True)))
+
+        for order in ['1', '-1', '2', '-2.1']:
+            pages = self.walk('?o=' + order)
+            self.assertEqual(sum(pages, []), self.get('?all=&o=' + order)[1], order)
+
+    @mock.patch.object(HackerAdmin, 'list_per_page', 5)
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/admin/hacker/hacker/', {'after': 'abc'}).status_code, 302)
+        self.assertEqual(self.client.get('/admin/hacker/hacker/', {'after': '9999'}).status_code, 302)
+
+    @mock.patch.object(HackerAdmin, 'list_per_page', 5)
+    def test_counts_from_facets(self):
+        (cl, _) = self.get('?firstName=Amy')
+        self.assertEqual((cl.result_count, cl.full_result_count), (9, 23))
+
+        # the counts are cached along with the facets
+        with self.assertNumQueries(3):
+            self.get('?firstName=Amy')
+
+
+class ApprovalActionsTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+
+        self.hackers = [make_hacker('hacker{}'.format(i)) for i in range(5)]
+        Approval.objects.create(hacker=self.hackers[0], approval=True)
+        Approval.objects.create(hacker=self.hackers[1], approval=False)
+
+    def act(self, action, hackers):
+        """ Runs an action, returning its message and number of queries """
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/admin/hacker/hacker/', {
+                'action': action, '_selected_action': [hacker.pk for hacker in hackers],
+            }, follow=True)
+        return (str(list(response.context['messages'])[0]), len(queries))
+
+    def approvals(self):
+        return dict(Approval.objects.values_list('hacker_id', 'approval'))
+
+    def test_actions(self):
+        (message, _) = self.act('approve_hacker', self.hackers)
+        self.assertEqual(message, '4 of 5 application(s) changed. Previously 1 accepted, 1 rejected, 3 pending. ')
+        self.assertEqual(self.approvals(), {hacker.pk: True for hacker in self.hackers})
+
+        (message, _) = self.act('reject_hacker', self.hackers[:3])
+        self.assertEqual(message, '3 of 3 application(s) changed. Previously 3 accepted, 0 rejected, 0 pending. ')
+
+        (message, _) = self.act('autopend_hackers', self.hackers[1:])
+        self.assertEqual(message, '4 of 4 application(s) changed. Previously 2 accepted, 2 rejected, 0 pending. ')
+        self.assertEqual(self.approvals(), {self.hackers[0].pk: False})
+
+    def test_constant_queries(self):
+        (_, few) = self.act('approve_hacker', self.hackers)
+
+        # with the same approvals as before
+        Approval.objects.exclude(hacker__in=self.hackers[:2]).delete()
+        Approval.objects.filter(hacker=self.hackers[1]).update(approval=False)
+
+        more = self.hackers + [make_hacker('more{}'.format(i)) for i in range(30)]
+        (_, many) = self.act('approve_hacker', more)
+        self.assertEqual(few, many)
+
+    def test_chunks(self):
+        request = RequestFactory().post('/admin/hacker/hacker/')
+        modeladmin = HackerAdmin(Hacker, admin.site)
+        queryset = Hacker.objects.filter(pk__in=[hacker.pk for hacker in self.hackers])
+
+        with mock.patch.object(modeladmin, 'message_user') as message_user:
+            modeladmin.set_approval(request, queryset, False, chunk_size=2)
+            self.assertEqual(self.approvals(), {hacker.pk: False for hacker in self.hackers})
+
+            modeladmin.set_approval(request, queryset, None, chunk_size=2)
+            self.assertEqual(self.approvals(), {})
+
+        self.assertEqual([str(call[0][1]) for call in message_user.call_args_list], [
+            '4 of 5 application(s) changed. Previously 1 accepted, 1 rejected, 3 pending. ',
+            '5 of 5 application(s) changed. Previously 0 accepted, 5 rejected, 0 pending. ',
+        ])
+
+    def test_changes_are_seen(self):
+        hacker = self.hackers[2]
+        before = Hacker.objects.get(pk=hacker.pk).updatedAt
+        names = [hackers_version_name('approval'), hacker_version_name(hacker.pk, 'approval')]
+        versions = get_versions(names)
+
+        self.client.login(username=hacker.profile.username, password='pw')
+        self.assertContains(self.client.get('/portal/'), 'Pending')
+
+        self.client.login(username='admin', password='pw')
+        self.act('approve_hacker', self.hackers)
+
+        # a single version is bumped for all of the hackers
+        after = get_versions(names)
+        self.assertNotEqual(after[names[0]], versions[names[0]])
+        self.assertEqual(after[names[1]], versions[names[1]])
+        self.assertGreater(Hacker.objects.get(pk=hacker.pk).updatedAt, before)
+
+        self.client.login(username=hacker.profile.username, password='pw')
+        self.assertContains(self.client.get('/portal/'), 'Accepted')
+
+
+class XLSXExportTest(TestCase):
+    def setUp(self):
+        self.hackers = [make_hacker('hacker{}'.format(i)) for i in range(3)]
+        Approval.objects.create(hacker=self.hackers[0], approval=True)
+
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+
+    def test_convert_rows(self):
+        rows = convert_rows(Hacker, ['nationality', 'academic__degree', 'firstName'], [
+            (['DE', 'XX'], 'bsc', [1, 2]),
+            (None, 'unknown', datetime.date(2018, 10, 1)),
+        ])
+        self.assertEqual(list(rows), [
+            ['Germany, XX', 'Bachelor of Science', '1, 2'],
+            [None, 'unknown', datetime.date(2018, 10, 1)],
+        ])
+
+    def test_export(self):
+        response = self.client.post('/admin/hacker/hacker/', {
+            'action': 'xslx_export', '_selected_action': [hacker.pk for hacker in self.hackers],
+        })
+        content = b''.join(response.streaming_content)
+        sheet = openpyxl.load_workbook(io.BytesIO(content)).active
+
+        rows = [[cell.value for cell in row] for row in sheet.rows]
+        self.assertEqual(len(rows), 4)
+        row = dict(zip(rows[0], rows[1]))
+        self.assertEqual(row['nationality'], 'Germany, France')
+        self.assertEqual(row['academic__degree'], 'Bachelor of Science')
+
+        self.assertTrue(sheet['A1'].font.b)
+        self.assertFalse(sheet['A2'].font.b)
+        self.assertEqual(sheet.column_dimensions['A'].width, (len('profile__username') + 2) * 1.2)
+
+
+class CSVExportTest(TestCase):
+    def setUp(self):
+        self.hackers = [make_hacker('hacker{}'.format(i)) for i in range(3)]
+        self.hackers.append(make_hacker('incomplete', complete=False))
+        Approval.objects.create(hacker=self.hackers[0], approval=True)
+
+    def export(self, queryset):
+        request = RequestFactory().post('/admin/hacker/hacker/')
+        modeladmin = HackerAdmin(Hacker, admin.site)
+
+        # nothing is read before the response is sent
+        with self.assertNumQueries(0):
+            response = HackerAdmin.csv_export(modeladmin, request, queryset)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename=hacker_hacker.csv')
+
+        content = b''.join(response.streaming_content).decode('utf-8')
+        return list(csv.reader(io.StringIO(content)))
+
+    def test_export(self):
+        rows = self.export(Hacker.objects.order_by('pk'))
+        self.assertEqual(rows[0], list(HackerAdmin.full_export_fields))
+        self.assertEqual(len(rows), 5)
+
+        row = dict(zip(rows[0], rows[1]))
+        self.assertEqual(row['profile__username'], 'hacker0')
+        self.assertEqual(row['nationality'], 'Germany, France')
+        self.assertEqual(row['countryOfResidence'], 'Germany')
+        self.assertEqual(row['academic__degree'], 'Bachelor of Science')
+        self.assertEqual(row['organizational__shirtSize'], 'Medium (M)')
+        self.assertEqual(row['approval__approval'], 'True')
+
+        # a hacker without components
+        row = dict(zip(rows[0], rows[4]))
+        self.assertEqual(row['profile__username'], 'incomplete')
+        self.assertEqual((row['academic__degree'], row['organizational__shirtSize'], row['approval__approval']), ('', '', ''))
+
+    def test_iterator(self):
+        queryset = Hacker.objects.order_by('pk')
+        with mock.patch.object(QuerySet, 'iterator', autospec=True, side_effect=QuerySet.iterator) as iterator, \
+                mock.patch.object(QuerySet, '_fetch_all', autospec=True, side_effect=AssertionError('cached')):
+            self.assertEqual(len(self.export(queryset)), 5)
+
+        self.assertEqual(iterator.call_count, 1)
+        self.assertIsNone(queryset._result_cache)
+
+class ColumnarExportTest(TestCase):
+    fields = list(HackerAdmin.full_export_fields)
+
+    def setUp(self):
+        self.hackers = [make_hacker('hacker{}'.format(i)) for i in range(3)]
+        self.hackers.append(make_hacker('incomplete', complete=False))
+        Approval.objects.create(hacker=self.hackers[0], approval=True)
+        AcademicData.objects.filter(hacker=self.hackers[1]).update(degree='msc', school='Universität Zürich')
+        Hacker.objects.filter(pk=self.hackers[2].pk).update(nationality=['FR'], middleName='Ü')
+        self.ids = [hacker.pk for hacker in self.hackers]
+
+    def export(self, format):
+        output = io.BytesIO()
+        columnar.write_columns(format, output, Hacker, self.fields, self.ids)
+        output.seek(0)
+        return output
+
+    def csv_rows(self):
+        """ The rows of the CSV export of the hackers, as dicts """
+
+        request = RequestFactory().post('/admin/hacker/hacker/')
+        response = HackerAdmin.csv_export(HackerAdmin(Hacker, admin.site), request, Hacker.objects.order_by('pk'))
+        return list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+
+    def assertSameValues(self, rows):
+        """ Checks rows of values against the CSV export, compared as
+        written to a CSV file (with datetimes to the millisecond, as JSON) """
+
+        def normalize(name, value):
+            if name in ('profile__date_joined', 'profile__last_login') and value:
+                value = parse_datetime(str(value).replace(' ', 'T'))
+                return value.replace(microsecond=value.microsecond // 1000 * 1000)
+            return '' if value is None else str(value)
+
+        expected = self.csv_rows()
+        self.assertEqual(len(rows), len(expected))
+        for (row, other) in zip(rows, expected):
+            self.assertEqual({k: normalize(k, v) for (k, v) in row.items()}, {k: normalize(k, v) for (k, v) in other.items()})
+
+    def test_ndjson(self):
+        rows = [json.loads(line) for line in self.export('ndjson').read().decode('utf-8').splitlines()]
+        self.assertEqual([list(row.keys()) for row in rows], [self.fields] * 4)
+        self.assertEqual(rows[1]['academic__degree'], 'Master of Science')
+        self.assertEqual(rows[3]['academic__degree'], None)
+        self.assertSameValues(rows)
+
+    def test_csv_gz(self):
+        with gzip.GzipFile(fileobj=self.export('csv.gz')) as gz:
+            rows = list(csv.DictReader(io.StringIO(gz.read().decode('utf-8'))))
+        self.assertEqual(rows[2]['nationality'], 'France')
+        self.assertEqual(rows[1]['academic__school'], 'Universität Zürich')
+        self.assertSameValues(rows)
+
+    @unittest.skipIf(columnar.pyarrow is None, 'pyarrow is not installed')
+    def test_parquet(self):
+        import pyarrow
+        import pyarrow.parquet
+
+        table = pyarrow.parquet.read_table(self.export('parquet'))
+        self.assertEqual(table.column_names, self.fields)
+        for name in ['nationality', 'countryOfResidence', 'academic__degree', 'organizational__shirtSize']:
+            self.assertTrue(pyarrow.types.is_dictionary(table.schema.field(name).type), name)
+            self.assertTrue(all(isinstance(chunk, pyarrow.DictionaryArray) for chunk in table.column(name).chunks), name)
+
+        rows = table.to_pylist()
+        self.assertEqual([row['academic__degree'] for row in rows], ['Bachelor of Science', 'Master of Science', 'Bachelor of Science', None])
+        self.assertEqual([row['nationality'] for row in rows], ['Germany, France', 'Germany, France', 'France', 'Germany, France'])
+        self.assertEqual(rows[0]['dob'], datetime.date(1990, 1, 1))
+        self.assertEqual([row['approval__approval'] for row in rows], [True, None, None, None])
+
+    def test_encode_column(self):
+        column = columnar.encode_column(Hacker, 'academic__degree', ['bsc', 'msc', None, 'bsc', 'unknown'])
+        self.assertEqual(column.values, [0, 1, None, 0, 2])
+        self.assertEqual(column.dictionary, ['Bachelor of Science', 'Master of Science', 'unknown'])
+        self.assertEqual(column.decode(), ['Bachelor of Science', 'Master of Science', None, 'Bachelor of Science', 'unknown'])
+
+        column = columnar.encode_column(Hacker, 'nationality', [['DE', 'FR'], ['FR'], ['DE', 'FR']])
+        self.assertEqual(column.values, [0, 1, 0])
+        self.assertEqual(column.dictionary, ['Germany, France', 'France'])
+
+        # fields without choices are not encoded
+        column = columnar.encode_column(Hacker, 'firstName', ['Huber', 'Huber'])
+        self.assertEqual((column.values, column.dictionary), (['Huber', 'Huber'], None))
+
+    def test_batches(self):
+        # sparse ids, in batches covering at most 2 ids each
+        ids = [self.ids[0], self.ids[3]]
+        batches = list(columnar.read_batches(Hacker, ['profile__username', 'academic__degree'], ids, batch_size=2))
+        self.assertEqual([[column.decode() for column in batch] for batch in batches], [
+            [['hacker0'], ['Bachelor of Science']],
+            [['incomplete'], [None]],
+        ])
+
+class JobsTest(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.hackers = [make_hacker('hacker{}'.format(i)) for i in range(3)]
+
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+
+    def export(self, action):
+        response = self.client.post('/admin/hacker/hacker/', {
+            'action': action, '_selected_action': [hacker.pk for hacker in self.hackers],
+        })
+        self.assertEqual(response.status_code, 302)
+        return Job.objects.latest('pk')
+
+    def test_export(self):
+        job = self.export('csv_export_job')
+        self.assertEqual(job.state, Job.PENDING)
+
+        claimed = jobs.claim('worker')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertIsNone(jobs.claim('other'))
+
+        job = jobs.run(claimed)
+        self.assertEqual(job.state, Job.DONE)
+        self.assertEqual((job.progress, job.total), (3, 3))
+
+        with job.result.open('rb') as result:
+            rows = list(csv.reader(io.StringIO(result.read().decode('utf-8'))))
+        self.assertEqual([row[0] for row in rows[1:]], ['hacker2', 'hacker1', 'hacker0'])
+
+        url = '/admin/hacker/job/{}/download/'.format(job.pk)
+        with self.settings(CV_SERVE_MODE='stream'):
+            self.assertEqual(b''.join(self.client.get(url).streaming_content).decode('utf-8').splitlines()[0], ','.join(rows[0]))
+        with self.settings(CV_SERVE_MODE='accel'):
+            self.assertEqual(self.client.get(url)['X-Accel-Redirect'], '/internal/media/' + job.result.name)
+
+    def test_retry(self):
+        calls = []
+
+        @jobs.job('test.fail')
+        def fail(job, value):
+            calls.append(value)
+            raise ValueError('failed')
+        self.addCleanup(jobs.JOBS.pop, 'test.fail')
+
+        job = jobs.enqueue('test.fail', value=1, max_attempts=2)
+        with self.assertLogs('hacker.jobs', 'ERROR'):
+            job = jobs.run(jobs.claim('worker'))
+        self.assertEqual((job.state, job.attempts), (Job.PENDING, 1))
+
+        # only after a delay
+        self.assertIsNone(jobs.claim('worker'))
+        Job.objects.filter(pk=job.pk).update(runAfter=job.createdAt)
+
+        with self.assertLogs('hacker.jobs', 'ERROR'):
+            job = jobs.run(jobs.claim('worker'))
+        self.assertEqual((job.state, job.attempts), (Job.FAILED, 2))
+        self.assertIn('failed', job.message)
+        self.assertEqual(calls, [1, 1])
+
+    def test_requeue_stale(self):
+        job = self.export('csv_export_job')
+        job = jobs.claim('worker')
+        self.assertEqual(jobs.requeue_stale(), 0)
+
+        Job.objects.filter(pk=job.pk).update(heartbeatAt=job.heartbeatAt - jobs.STALE_AFTER * 2)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).state, Job.PENDING)
+
+        # the worker of the stale job can no longer finish it
+        jobs.claim('other')
+        jobs.run(job)
+        self.assertEqual(Job.objects.get(pk=job.pk).worker, 'other')
+        self.assertEqual(Job.objects.get(pk=job.pk).state, Job.RUNNING)
+
+    def test_heartbeat_while_writing_xlsx(self):
+        rows = [('hacker{}'.format(i), ) for i in range(5)]
+        heartbeats = []
+        write_xslx(io.BytesIO(), Hacker, ['profile__username'], iter(rows), heartbeat=lambda: heartbeats.append(1))
+        self.assertEqual(len(heartbeats), 5)
+
+        job = self.export('xslx_export_job')
+        with mock.patch.object(Job, 'heartbeat', autospec=True) as heartbeat:
+            job = jobs.run(jobs.claim('worker'))
+        self.assertEqual(job.state, Job.DONE)
+        self.assertEqual(heartbeat.call_count, 3)
+
+
+class ExportChangesTest(MediaTestMixin, TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.hackers = [make_hacker('hacker{}'.format(i)) for i in range(3)]
+        self.output = os.path.join(settings.MEDIA_ROOT, 'changes.ndjson')
+
+    def export(self, since=None):
+        """ Runs exportchanges, returning the exported lines and the watermark """
+
+        stderr = io.StringIO()
+        call_command('exportchanges', '--output', self.output, *(['--since', since] if since else []), stderr=stderr)
+        with open(self.output) as output:
+            lines = [json.loads(line) for line in output]
+        return (lines, stderr.getvalue().split('Watermark: ')[1].strip())
+
+    def test_changes(self):
+        (lines, watermark) = self.export()
+        self.assertEqual(len(lines), 3)
+
+        Hacker.objects.update(updatedAt=timezone.now() - datetime.timedelta(days=1))
+        (lines, watermark) = self.export(watermark)
+        self.assertEqual(lines, [])
+
+        # a change of the user and a deletion
+        user = self.hackers[1].profile
+        user.first_name = 'Huber'
+        user.save()
+        self.hackers[2].profile.delete()
+        self.assertEqual(list(Tombstone.objects.values_list('hackerId', 'username')), [(self.hackers[2].pk, 'hacker2')])
+
+        (lines, watermark) = self.export(watermark)
+        self.assertEqual([line['id'] for line in lines], [self.hackers[1].pk, self.hackers[2].pk])
+        self.assertIn('deletedAt', lines[1])
+
+    def test_change_committed_after_export(self):
+        Hacker.objects.update(updatedAt=timezone.now() - datetime.timedelta(days=1))
+        start = timezone.now()
+        (lines, watermark) = self.export()
+
+        # timestamped before the export started, but committed after it read the hackers
+        Hacker.objects.filter(pk=self.hackers[0].pk).update(updatedAt=start - datetime.timedelta(seconds=1))
+
+        (lines, _) = self.export(watermark)
+        self.assertEqual([line['id'] for line in lines], [self.hackers[0].pk])
+
+
+class StatisticsTest(TransactionTestCase):
+    def setUp(self):
+        self.hackers = [make_hacker('hacker{}'.format(i)) for i in range(3)]
+
+    def assertUpToDate(self):
+        """ Checks that the maintained statistics equal re-computed ones """
+
+        self.assertEqual(statistics.check_statistics(), (Hacker.objects.count(), 0, 0))
+
+    def get_count(self, segment, dimension, value):
+        value = json.dumps(value, ensure_ascii=False)
+        statistic = Statistic.objects.filter(segment=segment, dimension=dimension, valueHash=statistics.value_hash(value)).first()
+        return statistic.count if statistic else 0
+
+    def test_changes(self):
+        self.assertUpToDate()
+        self.assertEqual(self.get_count('all', statistics.TOTAL, None), 3)
+        self.assertEqual(self.get_count('all', 'nationality', 'DE'), 3)
+
+        Organizational.objects.filter(hacker=self.hackers[0]).update(dietaryRequirements='Vegan, no nuts')
+        AcademicData.objects.filter(hacker=self.hackers[1]).update(school='Universität Zürich')
+        Approval.objects.create(hacker=self.hackers[2], approval=True)
+        self.hackers[1].nationality = ['CH']
+        self.hackers[1].save()
+        self.hackers[0].profile.delete()
+
+        # changes by QuerySet.update() have to be announced
+        hackers_changed([self.hackers[0].pk], 'organizational')
+        hackers_changed([self.hackers[1].pk], 'academic')
+
+        self.assertUpToDate()
+        self.assertEqual(self.get_count('all', statistics.TOTAL, None), 2)
+        self.assertEqual(self.get_count('all', 'dietary', 'vegan'), 0)
+        self.assertEqual(self.get_count('all', 'nationality', 'DE'), 1)
+        self.assertEqual(self.get_count('approved', statistics.TOTAL, None), 1)
+
+        # non-ASCII values are stored as they are
+        self.assertEqual(self.get_count('all', 'academic__school', 'Universität Zürich'), 1)
+        self.assertTrue(Statistic.objects.filter(value='"Universität Zürich"').exists())
+
+    def test_long_values(self):
+        Organizational.objects.filter(hacker=self.hackers[0]).update(dietaryRequirements='')
+        AcademicData.objects.filter(hacker=self.hackers[0]).update(school='"\\' * 100)
+        statistics.update_statistics([self.hackers[0].pk])
+
+        self.assertUpToDate()
+        self.assertEqual(self.get_count('all', 'academic__school', '"\\' * 100), 1)
+
+    def test_check(self):
+        output = io.StringIO()
+        call_command('statistics', stdout=output)
+        self.assertIn('Statistics of 3 hacker(s) are up-to-date', output.getvalue())
+
+        Statistic.objects.filter(segment='all', dimension=statistics.TOTAL).update(count=5)
+        output = io.StringIO()
+        call_command('statistics', stdout=output)
+        self.assertIn('Statistics of 0 of 3 hacker(s) and 1 count(s) are outdated', output.getvalue())
+
+        call_command('statistics', '--rebuild', stdout=io.StringIO())
+        self.assertUpToDate()
+
+    def test_migration_keys(self):
+        """ The keys computed by the migration creating the statistics equal
+        the current ones (re-encoded by a later migration) """
+
+        Organizational.objects.filter(hacker=self.hackers[0]).update(dietaryRequirements='Halal')
+        migration = importlib.import_module('hacker.migrations.0031_statistics')
+        reencode = importlib.import_module('hacker.migrations.0033_statistic_valuehash').reencode
+
+        frozen = {pk: {(s, d, reencode(v)) for (s, d, v) in keys} for (pk, keys) in migration.get_keys(Hacker.objects.all())}
+        self.assertEqual(frozen, dict(statistics.get_keys(Hacker.objects.all())))
+
+
+class CVZipTest(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.login(username='admin', password='pw')
+
+        self.hackers = [make_hacker('hacker{}'.format(i)) for i in range(4)]
+        for (hacker, content) in zip(self.hackers, [b'%PDF-a', b'%PDF-b' * 100000, b'%PDF-a']):
+            hacker.cv.cv.save('cv.pdf', ContentFile(content))
+
+    def download(self, hackers):
+        response = self.client.post('/admin/hacker/hacker/', {
+            'action': 'cv_zip_export', '_selected_action': [hacker.pk for hacker in hackers],
+        })
+        self.assertTrue(response.streaming)
+        return zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+
+    def test_zip(self):
+        archive = self.download(self.hackers)
+        self.assertIsNone(archive.testzip())
+
+        # hackers without a cv are left out, and identical cvs are included for each hacker
+        self.assertEqual(archive.namelist(), ['hacker0.pdf', 'hacker1.pdf', 'hacker2.pdf'])
+        self.assertEqual(archive.read('hacker1.pdf'), b'%PDF-b' * 100000)
+        self.assertEqual(archive.read('hacker2.pdf'), b'%PDF-a')
+        self.assertEqual(archive.getinfo('hacker1.pdf').compress_type, zipfile.ZIP_STORED)
+
+    def test_missing_files(self):
+        os.remove(self.hackers[1].cv.cv.path)
+        self.assertEqual(self.download(self.hackers[:2]).namelist(), ['hacker0.pdf'])
+
+    def test_superusers_only(self):
+        user = User.objects.create_user('staff', password='pw', is_staff=True)
+        user.user_permissions.add(*Permission.objects.filter(codename='change_hacker'))
+        self.client.login(username='staff', password='pw')
+
+        response = self.client.get('/admin/hacker/hacker/')
+        self.assertEqual(response.status_code, 200)
+        actions = [name for (name, _) in response.context['action_form'].fields['action'].choices]
+        self.assertIn('approve_hacker', actions)
+        self.assertNotIn('cv_zip_export', actions)
+
+
+class CVStorageTest(MediaTestMixin, TestCase):
+    def files(self):
+        """ Returns the names of all files in the CV storage """
+
+        root = cv_storage.path('')
+        return sorted(
+            os.path.relpath(os.path.join(dirpath, filename), root).replace(os.sep, '/')
+            for (dirpath, _, filenames) in os.walk(root) for filename in filenames
+        )
+
+    def test_deduplication(self):
+        first = cv_storage.save('hackerman.pdf', ContentFile(b'%PDF-a'))
+        self.assertTrue(cv_storage.is_hashed_name(first))
+        self.assertEqual(cv_storage.save('other.PDF', ContentFile(b'%PDF-a')), first)
+        self.assertNotEqual(cv_storage.save('other.pdf', ContentFile(b'%PDF-b')), first)
+        self.assertEqual(len(self.files()), 2)
+
+        # uploads spooled to disk
+        upload = TemporaryUploadedFile('cv.pdf', 'application/pdf', 6, None)
+        upload.write(b'%PDF-a')
+        self.assertEqual(cv_storage.save(upload.name, upload), first)
+        upload.close()
+
+    def test_stored_at_the_same_time(self):
+        name = cv_storage.save('cv.pdf', ContentFile(b'%PDF-a'))
+
+        # the identical file is created after the check for it
+        with mock.patch.object(cv_storage, 'exists', return_value=False):
+            self.assertEqual(cv_storage.save('cv.pdf', ContentFile(b'%PDF-a')), name)
+        self.assertEqual(self.files(), [name])
+        with cv_storage.open(name) as file:
+            self.assertEqual(file.read(), b'%PDF-a')
+
+        # the identical file is removed after the check for it
+        os.remove(cv_storage.path(name))
+        with mock.patch.object(cv_storage, 'exists', return_value=True):
+            self.assertEqual(cv_storage.save('cv.pdf', ContentFile(b'%PDF-a')), name)
+        self.assertEqual(self.files(), [name])
+
+    def test_failed_write(self):
+        def failing():
+            yield b'%PDF'
+            raise IOError('connection reset')
+
+        # the file is hashed completely, but cannot be read completely again
+        content = ContentFile(b'%PDF-a')
+        with mock.patch.object(content, 'chunks', side_effect=[iter([b'%PDF-a']), failing()]):
+            with self.assertRaises(IOError):
+                cv_storage.save('cv.pdf', content)
+
+        # neither a partial file nor a temporary one is left
+        self.assertEqual(self.files(), [])
+
+    def test_cleancvs(self):
+        hacker = make_hacker()
+        hacker.cv.cv.save('cv.pdf', ContentFile(b'%PDF-a'))
+        unreferenced = cv_storage.save('cv.pdf', ContentFile(b'%PDF-b'))
+        recent = cv_storage.save('cv.pdf', ContentFile(b'%PDF-c'))
+
+        old = time.time() - 2 * 60 * 60
+        for name in [hacker.cv.cv.name, unreferenced]:
+            os.utime(cv_storage.path(name), (old, old))
+
+        call_command('cleancvs', stdout=io.StringIO())
+        self.assertEqual(self.files(), sorted([hacker.cv.cv.name, recent]))
+
+        # storing an identical file again keeps it from being removed
+        os.utime(cv_storage.path(recent), (old, old))
+        cv_storage.save('cv.pdf', ContentFile(b'%PDF-c'))
+        call_command('cleancvs', stdout=io.StringIO())
+        self.assertEqual(self.files(), sorted([hacker.cv.cv.name, recent]))
+
+    def test_migratecvs(self):
+        hacker = make_hacker()
+        os.makedirs(cv_storage.path('cvs'))
+        with open(cv_storage.path('cvs/hackerman.pdf'), 'wb') as file:
+            file.write(b'%PDF-a')
+        CV.objects.filter(pk=hacker.cv.pk).update(cv='cvs/hackerman.pdf')
+
+        call_command('migratecvs', stdout=io.StringIO())
+        cv = CV.objects.get(pk=hacker.cv.pk)
+        self.assertTrue(cv_storage.is_hashed_name(cv.cv.name))
+        with cv.cv.open() as file:
+            self.assertEqual(file.read(), b'%PDF-a')
+
+
+
+class MigrateCVsTest(MediaTestMixin, TransactionTestCase):
+    def test_changes_are_seen(self):
+        hackers = [make_hacker('hacker{}'.format(i)) for i in range(3)]
+        os.makedirs(cv_storage.path('cvs'))
+        for hacker in hackers[:2]:
+            with open(cv_storage.path('cvs/{}.pdf'.format(hacker.profile.username)), 'wb') as file:
+                file.write(b'%PDF-' + hacker.profile.username.encode())
+            CV.objects.filter(pk=hacker.cv.pk).update(cv='cvs/{}.pdf'.format(hacker.profile.username))
+        Hacker.objects.update(updatedAt=timezone.now() - datetime.timedelta(days=1))
+        before = dict(Hacker.objects.values_list('pk', 'updatedAt'))
+        names = [hackers_version_name('cv'), hacker_version_name(hackers[0].pk, 'cv')]
+        versions = get_versions(names)
+
+        call_command('migratecvs', batch_size=1, stdout=io.StringIO())
+
+        # a single version is bumped for all of the hackers
+        after = get_versions(names)
+        self.assertNotEqual(after[names[0]], versions[names[0]])
+        self.assertEqual(after[names[1]], versions[names[1]])
+        for (pk, updated) in Hacker.objects.values_list('pk', 'updatedAt'):
+            if pk == hackers[2].pk:
+                self.assertEqual(updated, before[pk])
+            else:
+                self.assertGreater(updated, before[pk])
+
+class SetupProgressTest(TestCase):
+    def setUp(self):
+        self.hacker = make_hacker(complete=False)
+
+    def probe(self, hacker):
+        """ Returns the components of a hacker, as found in their tables """
+
+        return [name for (name, model) in Hacker.components.items() if model.objects.filter(hacker=hacker).exists()]
+
+    def assertProgress(self, hacker):
+        """ Checks the setup progress of a hacker (as loaded and as stored)
+        against the component tables """
+
+        components = self.probe(hacker)
+        unset = [name for name in Hacker.components if name not in components]
+        for h in [hacker, Hacker.objects.get(pk=hacker.pk)]:
+            self.assertEqual([name for name in Hacker.components if h.has_component(name)], components)
+            self.assertEqual(h.get_first_unset_component(), unset[0] if unset else None)
+            self.assertEqual(h.setupCompleted, not unset)
+
+    def test_signals(self):
+        self.assertEqual(self.hacker.setupProgress, 0)
+        self.assertProgress(self.hacker)
+
+        # created out of order
+        CV.objects.create(hacker=self.hacker)
+        academic = AcademicData.objects.create(hacker=self.hacker, degree='bsc', major='CS', year=2020, school='Jacobs University')
+        self.assertProgress(self.hacker)
+        self.assertEqual(self.hacker.get_first_unset_component(), 'application')
+
+        HackathonApplication.objects.create(hacker=self.hacker, whyJacobsHack='fun', whatHaveYouBuilt='stuff')
+        Organizational.objects.create(hacker=self.hacker, shirtSize='M')
+        self.assertProgress(self.hacker)
+        self.assertTrue(self.hacker.setupCompleted)
+
+        # saving an existing component changes nothing
+        academic.major = 'Math'
+        academic.save()
+        self.assertProgress(self.hacker)
+
+        academic.delete()
+        self.assertProgress(self.hacker)
+        self.assertEqual(self.hacker.get_first_unset_component(), 'academic')
+        self.assertFalse(self.hacker.setupCompleted)
+
+        self.hacker.cv.delete()
+        self.assertProgress(self.hacker)
+        self.assertEqual(Hacker.objects.get(pk=self.hacker.pk).setupProgress, 0b0110)
+
+    def test_command(self):
+        complete = make_hacker('complete')
+        Hacker.objects.filter(pk=complete.pk).update(setupProgress=0b0101)
+        Hacker.objects.filter(pk=self.hacker.pk).update(setupProgress=0b1000)
+
+        output = io.StringIO()
+        call_command('setupprogress', stdout=output)
+        self.assertIn('Setup progress of 2 hacker(s) is incorrect', output.getvalue())
+        self.assertEqual(Hacker.objects.get(pk=complete.pk).setupProgress, 0b0101)
+
+        output = io.StringIO()
+        call_command('setupprogress', '--fix', stdout=output)
+        self.assertIn('Fixed setup progress of 2 hacker(s)', output.getvalue())
+        self.assertProgress(Hacker.objects.get(pk=complete.pk))
+        self.assertProgress(Hacker.objects.get(pk=self.hacker.pk))
+        self.assertTrue(Hacker.objects.get(pk=complete.pk).setupCompleted)
+
+        output = io.StringIO()
+        call_command('setupprogress', stdout=output)
+        self.assertIn('Setup progress of 2 hacker(s) is correct', output.getvalue())
+
+    def test_filter(self):
+        complete = make_hacker('complete')
+        # the last step of the setup, but without the others
+        Organizational.objects.create(hacker=self.hacker, shirtSize='M')
+
+        def filtered(value):
+            params = {'completed': value} if value is not None else {}
+            spec = SetupCompleted(None, params, Hacker, HackerAdmin)
+            return set(spec.queryset(None, Hacker.objects.all()))
+
+        self.assertEqual(filtered('1'), {complete})
+        self.assertEqual(filtered('0'), {self.hacker})
+        self.assertEqual(filtered(None), {complete, self.hacker})
+
+    def test_migration(self):
+        complete = make_hacker('complete')
+        Organizational.objects.create(hacker=self.hacker, shirtSize='M')
+        Hacker.objects.update(setupProgress=0)
+
+        migration = importlib.import_module('hacker.migrations.0026_hacker_setupprogress')
+        migration.backfill_setup_progress(apps, None)
+        self.assertProgress(Hacker.objects.get(pk=complete.pk))
+        self.assertProgress(Hacker.objects.get(pk=self.hacker.pk))
+
+
+class AutocompleteTest(TestCase):
+    def setUp(self):
+        self.index = PrefixIndex([
+            'Jacobs University', 'Universität Zürich', 'University of Bremen', 'Univ',
+            'Technische Universität München', 'Constructor University', 'Hochschule Bremen',
+        ])
+
+    def test_case_and_accents(self):
+        self.assertEqual(self.index.search('UNIVERSITAT'), ['Universität Zürich', 'Technische Universität München'])
+        self.assertEqual(self.index.search('universität'), self.index.search('Universitat'))
+        self.assertEqual(self.index.search('zur univ'), ['Universität Zürich'])
+        self.assertEqual(self.index.search('  '), [])
+
+    def test_ranking(self):
+        # the exact match, the entries starting with the query (shortest
+        # first), then those with a word starting with it
+        self.assertEqual(self.index.search('univ'), [
+            'Univ', 'Universität Zürich', 'University of Bremen',
+            'Jacobs University', 'Constructor University', 'Technische Universität München',
+        ])
+        self.assertEqual(self.index.search('bremen'), ['Hochschule Bremen', 'University of Bremen'])
+
+    def test_limit(self):
+        self.assertEqual(self.index.search('univ', limit=2), ['Univ', 'Universität Zürich'])
+        self.assertEqual(len(self.index.search('u', limit=3)), 3)
+
+    def test_widget(self):
+        short = ListTextWidget(['Jacobs University', 'Univ'], 'test_short')
+        html = short.render('school', 'Univ')
+        self.assertIn('<option value="Jacobs University">', html)
+        self.assertNotIn('data-autocomplete-url', html)
+
+        entries = ['School {}'.format(i) for i in range(ListTextWidget.inline_limit + 1)]
+        long = ListTextWidget(entries, 'test_long')
+        html = long.render('school', 'School 1')
+        self.assertIn('<datalist id="list__test_long"></datalist>', html)
+        self.assertNotIn('<option', html)
+        self.assertIn('data-autocomplete-url="/autocomplete/test_long/"', html)
+        self.assertIn('value="School 1"', html)
+
+
+class CachedOptionsTest(TestCase):
+    def options(self, html):
+        """ Returns the (value, label, selected) of the options of a select """
+
+        return re.findall(r'<option value="([^"]*)"( selected)?>([^<]*)</option>', html)
+
+    def render(self, name, value):
+        """ Renders a country widget of HackerForm with and without the
+        cached options, returning the options of both """
+
+        widget = HackerForm().fields[name].widget
+        cached = widget.render(name, value)
+        uncached = super(CachedOptionsMixin, widget).render(name, value)
+        return (self.options(cached), self.options(uncached))
+
+    def selected(self, options):
+        return [value for (value, selected, _) in options if selected]
+
+    def test_single(self):
+        # the empty choice is selected without a value
+        for (value, selected) in [('DE', ['DE']), ('FR', ['FR']), ('', ['']), (None, ['']), ('XX', [])]:
+            (cached, uncached) = self.render('countryOfResidence', value)
+            self.assertEqual(cached, uncached)
+            self.assertEqual(self.selected(cached), selected)
+
+    def test_multiple(self):
+        for value in [['DE', 'FR'], ['FR'], [], ['DE', 'XX'], None]:
+            (cached, uncached) = self.render('nationality', value)
+            self.assertEqual(cached, uncached)
+            self.assertEqual(set(self.selected(cached)), set(value or []) - {'XX'})
+
+        # the cached options are not changed by a render
+        (cached, _) = self.render('nationality', [])
+        self.assertEqual(self.selected(cached), [])
+
+    def test_languages(self):
+        with translation.override('de'):
+            (cached, uncached) = self.render('countryOfResidence', 'DE')
+            self.assertEqual(cached, uncached)
+            self.assertIn(('DE', ' selected', 'Deutschland'), cached)
+
+        with translation.override('en'):
+            (cached, uncached) = self.render('countryOfResidence', 'DE')
+            self.assertEqual(cached, uncached)
+            self.assertIn(('DE', ' selected', 'Germany'), cached)
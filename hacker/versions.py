@@ -0,0 +1,97 @@
+""" Version counters used to invalidate cached data.
+
+Each counter is identified by a name and stored in the default Django cache,
+so that it is shared by every process using the same cache backend. Cached
+data should be stored under a key that includes the counters it depends on;
+bumping a counter then implicitly invalidates every such entry.
+
+Counters are bumped using cache.incr(), which is only atomic with a backend
+like memcached. Otherwise concurrent bumps may be lost, leaving entries
+cached in between valid.
+"""
+
+import time
+
+from django.core.cache import cache
+
+
+def _version_key(name):
+    return 'version:{}'.format(name)
+
+
+def _initial_version():
+    # Start (and restart, if a counter was evicted) with a value that has not
+    # been handed out before, so that stale entries are never picked up again.
+    return int(time.time() * 1000)
+
+
+def get_versions(names):
+    """ Returns a dict mapping each of the given names to its current version """
+
+    keys = {_version_key(name): name for name in names}
+    found = cache.get_many(list(keys.keys()))
+
+    missing = {key: _initial_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+
+    return {keys[key]: version for (key, version) in found.items()}
+
+
+def bump_versions(names):
+    """ Increments the version of each of the given names """
+
+    for name in names:
+        try:
+            cache.incr(_version_key(name))
+        except ValueError:
+            cache.set(_version_key(name), _initial_version(), None)
+
+
+def hacker_version_name(hacker_id, component):
+    """ Returns the name of the version counter for a component of a
+    hacker. 'hacker' refers to the hacker object itself. """
+
+    return 'hacker:{}:{}'.format(hacker_id, component)
+
+
+def hackers_version_name(component):
+    """ Returns the name of the version counter for a component of all
+    hackers, which is bumped instead of the version of each hacker when the
+    component changes for many hackers at once. Data depending on the
+    component of a hacker has to depend on both versions. """
+
+    return 'hackers:{}'.format(component)
+
+
+class LocalCache(object):
+    """ A value cached in the memory of the current process.
+
+    The value is (re-)loaded whenever the version counter of the given name
+    has changed, so bumping the counter in any process invalidates the value
+    in all processes sharing the cache backend. """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+
+        self._version = None
+        self._value = None
+
+    def get(self):
+        """ Returns the cached value, reloading it if it is outdated """
+
+        # read the version before loading, so that a concurrent bump
+        # causes another reload on the next call
+        version = get_versions([self.name])[self.name]
+        if version != self._version:
+            self._value = self.loader()
+            self._version = version
+
+        return self._value
+
+    def invalidate(self):
+        """ Invalidates the value in all processes """
+
+        bump_versions([self.name])
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class RegistryConfig(AppConfig):
     name = 'registry'
+
+    def ready(self):
+        # Side-effect import: Initialize hooks
+        import registry.hooks
@@ -1,6 +1,35 @@
+import functools
+import hashlib
+
 from django.contrib.auth.decorators import login_required
+from django.contrib.messages import get_messages
 from django.core.exceptions import ObjectDoesNotExist
 from django.http import HttpResponseForbidden
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from hacker.models import Hacker
+
+
+def get_hacker(request):
+    """ Loads the hacker of the current user along with all of its
+    components and caches it on the request """
+
+    try:
+        return request._hacker_cache
+    except AttributeError:
+        pass
+
+    # raises Hacker.DoesNotExist if the user has no hacker
+    hacker = Hacker.objects.with_components().get(profile=request.user)
+
+    # store the hacker on the user, so that views and templates
+    # using 'user.hacker' all share the pre-fetched object
+    request.user.hacker = hacker
+    request._hacker_cache = hacker
+
+    return hacker
 
 
 def require_hacker(view):
@@ -11,7 +40,7 @@ def require_hacker(view):
 
         # Try to retrieve the hacker
         try:
-            _ = request.user.hacker
+            _ = get_hacker(request)
 
         # return to retrieve a forbidden response if it does not exist
         except ObjectDoesNotExist:
@@ -30,7 +59,7 @@ def require_unset_component(component, alternative):
         @require_hacker
         def wrapper(request, *args, **kwargs):
             # if the given component does not exist, go to the alternate view
-            if request.user.hacker.has_component(component):
+            if get_hacker(request).has_component(component):
                 return alternative(request, *args, **kwargs)
 
             # else use the normal one
@@ -50,7 +79,7 @@ def require_setup_completed(alternative):
         @require_hacker
         def wrapper(request, *args, **kwargs):
             # if we are missing a component, return to the main page
-            if request.user.hacker.get_first_unset_component() is not None:
+            if get_hacker(request).get_first_unset_component() is not None:
                 return alternative(request, *args, **kwargs)
 
             # else use the normal one
@@ -61,3 +90,71 @@ def require_setup_completed(alternative):
 
     # and return the decorator
     return decorator
+
+
+def _hacker_validators(request, extra):
+    """ Computes the ETag and Last-Modified validators of a page showing the
+    data of the current hacker, or (None, None) if it may not be cached """
+
+    try:
+        return request._hacker_validators
+    except AttributeError:
+        pass
+
+    request._hacker_validators = (None, None)
+
+    # there is nothing to validate for anonymous users, and pages with
+    # pending messages need to be rendered to show them
+    if not request.user.is_authenticated or len(get_messages(request)) > 0:
+        return request._hacker_validators
+
+    # a single indexed lookup, without any of the components
+    row = Hacker.objects.filter(profile=request.user).values_list('pk', 'updatedAt').first()
+    if row is None:
+        return request._hacker_validators
+
+    # make sure the csrf cookie is set, so that it is stable across requests
+    get_token(request)
+
+    (pk, updated) = row
+    parts = [
+        request.user.pk, pk, updated.isoformat(),
+
+        # the page may embed the csrf token and the cookie banner
+        request.META.get('CSRF_COOKIE'), request.COOKIES.get('cookielaw_accepted'),
+    ] + list(extra(request))
+
+    etag = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    request._hacker_validators = (etag, updated)
+    return request._hacker_validators
+
+
+def hacker_condition(extra=lambda request: []):
+    """ A decorator for views that only show the data of the current hacker,
+    adding ETag and Last-Modified validators and answering conditional GET
+    requests with '304 Not Modified' without calling the view.
+
+    extra can return further values the page depends on. """
+
+    def decorator(view):
+        conditional = condition(
+            etag_func=lambda request, *args, **kwargs: _hacker_validators(request, extra)[0],
+            last_modified_func=lambda request, *args, **kwargs: _hacker_validators(request, extra)[1],
+        )(view)
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            response = conditional(request, *args, **kwargs)
+
+            # make browsers re-validate the page on every visit
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+
+        # and return the wrapper
+        return wrapper
+
+    # and return the decorator
+    return decorator
@@ -0,0 +1,13 @@
+from django.db import models, transaction
+
+from registry.models import Announcement
+
+
+def bump_announcements_version(sender, instance, **kwargs):
+    """ Invalidates the active announcements after one is saved or deleted,
+    once committed (see hacker.hooks) """
+    transaction.on_commit(Announcement.invalidate_active)
+
+
+models.signals.post_save.connect(bump_announcements_version, sender=Announcement)
+models.signals.post_delete.connect(bump_announcements_version, sender=Announcement)
@@ -1,5 +1,7 @@
 from django.db import models
 
+from hacker.versions import LocalCache
+
 # Create your models here.
 
 class Announcement(models.Model):
@@ -8,4 +10,21 @@ class Announcement(models.Model):
     content = models.TextField(help_text="Content (HTML)")
 
     def __str__(self):
-        return "Announcement {}{}".format(repr(self.title), "" if self.active else " (Inactive)")
\ No newline at end of file
+        return "Announcement {}{}".format(repr(self.title), "" if self.active else " (Inactive)")
+
+    @classmethod
+    def get_active(cls):
+        """ Returns a list of all active announcements """
+
+        return _active_announcements.get()
+
+    @classmethod
+    def invalidate_active(cls):
+        """ Invalidates the active announcements in all processes """
+
+        _active_announcements.invalidate()
+
+
+# The active announcements, shared by all requests of this process. This is
+# invalidated by the hooks in registry.hooks.
+_active_announcements = LocalCache('announcements', lambda: list(Announcement.objects.filter(active=True)))
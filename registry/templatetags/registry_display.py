@@ -1,16 +1,13 @@
 from django import template
 
+from hacker.labels import get_label
+
 register = template.Library()
 
 
 @register.filter('get_choice_field')
 def get_choice_field(instance, name):
-    choices = dict(type(instance)._meta.get_field(name).choices)
-    value = getattr(instance, name)
-    if isinstance(value, list):
-        return [choices[v] for v in value]
-    else:
-        return choices[value]
+    return get_label(type(instance), name, getattr(instance, name))
 
 
 @register.filter('print_boolean')
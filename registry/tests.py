@@ -1,3 +1,434 @@
-from django.test import TestCase
+import base64
+import hashlib
+import os
+import re
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.test import Client, RequestFactory, TestCase, TransactionTestCase
+
+from django_forms_uikit import legacy, renderer
+from hacker.models import Approval, CV, RSVP
+from hacker.storage import cv_storage
+from hacker.tests import MediaTestMixin, make_hacker
+from hacker.versions import LocalCache, get_versions, hacker_version_name
+from registry.decorators import get_hacker
+from registry.forms import AcademicForm, HackerForm, RegistrationForm, RSVPForm
+from registry import models as registry_models
+from registry.models import Announcement
+from registry.views.cv import parse_range
+from registry.views.registry import render_portal_cards
+
+
+class PortalCardsTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.hacker = make_hacker()
+        self.client.login(username='hackerman', password='pw')
+
+    def test_cards_follow_changes(self):
+        self.assertContains(self.client.get('/portal/'), 'Jacobs University')
+        self.assertContains(self.client.get('/portal/'), 'Pending')
+
+        academic = self.hacker.academic
+        academic.school = 'Constructor University'
+        academic.save()
+        Approval.objects.create(hacker=self.hacker, approval=True)
+
+        response = self.client.get('/portal/')
+        self.assertContains(response, 'Constructor University')
+        self.assertContains(response, 'Accepted')
+
+    def test_versions_are_bumped_after_commit(self):
+        self.client.get('/portal/')
+        name = hacker_version_name(self.hacker.pk, 'academic')
+        before = get_versions([name])[name]
+
+        with transaction.atomic():
+            academic = self.hacker.academic
+            academic.school = 'Constructor University'
+            academic.save()
+
+            # a concurrent request must not see the new version yet
+            self.assertEqual(get_versions([name])[name], before)
+
+        self.assertNotEqual(get_versions([name])[name], before)
+        self.assertContains(self.client.get('/portal/'), 'Constructor University')
+
+    def test_cards_are_not_rendered_from_outdated_hacker(self):
+        self.client.get('/portal/')
+
+        # the hacker is loaded before a change is committed
+        request = RequestFactory().get('/portal/')
+        request.user = self.hacker.profile
+        get_hacker(request)
+
+        academic = self.hacker.academic
+        academic.school = 'Constructor University'
+        academic.save()
+
+        self.assertIn('Constructor University', render_portal_cards(request)['academic'])
+
+
+class ConditionalGetTest(TransactionTestCase):
+    def setUp(self):
+        self.hacker = make_hacker()
+        self.client.login(username='hackerman', password='pw')
+
+    def test_not_modified(self):
+        for url in ['/portal/', '/edit/', '/edit/academic/']:
+            response = self.client.get(url)
+            etag = response['ETag']
+            self.assertIn('no-cache', response['Cache-Control'])
+
+            # the session, the user and the modification time of the hacker
+            with self.assertNumQueries(3):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304, url)
+
+            academic = self.hacker.academic
+            academic.major = 'Math' if academic.major != 'Math' else 'CS'
+            academic.save()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200, url)
+
+    def test_approval_and_announcements_change_portal(self):
+        etag = self.client.get('/portal/')['ETag']
+        Approval.objects.create(hacker=self.hacker, approval=True)
+        self.assertEqual(self.client.get('/portal/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get('/portal/')['ETag']
+        Announcement.objects.create(active=True, title='Welcome', content='Hello')
+        response = self.client.get('/portal/', HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Welcome')
+
+    def test_pending_messages_are_shown(self):
+        data = {'school': 'Jacobs University', 'degree': 'bsc', 'major': 'CS', 'year': 2020}
+        etag = self.client.get('/edit/academic/')['ETag']
+
+        self.assertEqual(self.client.post('/edit/academic/', data).status_code, 302)
+        response = self.client.get('/edit/academic/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertContains(response, 'Changes saved')
+
+
+class QueryCountTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.hacker = make_hacker()
+        Approval.objects.create(hacker=self.hacker, approval=True)
+        RSVP.objects.create(hacker=self.hacker, going=True)
+        self.client.login(username='hackerman', password='pw')
+
+    def test_portal(self):
+        # the session, the user, the validators of the hacker, the hacker
+        # with all of its components, the announcements and the hacker again
+        # (as the cards are rendered, see render_portal_cards)
+        with self.assertNumQueries(6):
+            self.assertEqual(self.client.get('/portal/').status_code, 200)
+
+        # the cards and the announcements are cached
+        with self.assertNumQueries(4):
+            self.assertEqual(self.client.get('/portal/').status_code, 200)
+
+    def test_edit_views(self):
+        for url in ['/edit/', '/edit/academic/', '/edit/application/', '/edit/organizational/',
+                    '/edit/cv/', '/edit/rsvp/']:
+            # the session, the user, the validators of the hacker and the
+            # hacker with all of its components
+            with self.assertNumQueries(4):
+                self.assertEqual(self.client.get(url).status_code, 200, url)
+
+class AnnouncementsCacheTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.announcement = Announcement.objects.create(active=True, title='Welcome', content='Hello')
+
+        # another process, with its own copy of the announcements
+        self.other = LocalCache('announcements', lambda: list(Announcement.objects.filter(active=True)))
+
+    def titles(self, local):
+        return [announcement.title for announcement in local.get()]
+
+    def test_warm(self):
+        self.assertEqual(Announcement.get_active(), [self.announcement])
+        with self.assertNumQueries(0):
+            self.assertEqual(Announcement.get_active(), [self.announcement])
+
+    def test_changes_invalidate_other_processes(self):
+        self.assertEqual(self.titles(self.other), ['Welcome'])
+        self.assertEqual(Announcement.get_active(), [self.announcement])
+
+        self.announcement.title = 'Goodbye'
+        self.announcement.save()
+        self.assertEqual(self.titles(self.other), ['Goodbye'])
+
+        Announcement.objects.create(active=True, title='Hello', content='Hello')
+        self.assertEqual(self.titles(self.other), ['Goodbye', 'Hello'])
+
+        self.announcement.delete()
+        self.assertEqual(self.titles(self.other), ['Hello'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.titles(self.other), ['Hello'])
+
+        self.assertEqual([a.title for a in Announcement.get_active()], ['Hello'])
+
+    def test_local_copy_is_reloaded(self):
+        self.assertEqual(Announcement.get_active(), [self.announcement])
+
+        # a restarted process, while the shared version is still cached
+        local = registry_models._active_announcements
+        (local._version, local._value) = (None, None)
+        with self.assertNumQueries(1):
+            self.assertEqual(Announcement.get_active(), [self.announcement])
+
+    def test_not_invalidated_before_commit(self):
+        self.assertEqual(self.titles(self.other), ['Welcome'])
+
+        with transaction.atomic():
+            self.announcement.title = 'Goodbye'
+            self.announcement.save()
+
+            # a concurrent request must not load the uncommitted change under the new version
+            with self.assertNumQueries(0):
+                self.assertEqual(self.titles(self.other), ['Welcome'])
+
+        self.assertEqual(self.titles(self.other), ['Goodbye'])
+
+class AutocompleteViewTest(TestCase):
+    def test_results(self):
+        response = self.client.get('/autocomplete/school/', {'q': 'jacobs univ'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'results': ['Jacobs University Bremen']})
+        self.assertIn('public', response['Cache-Control'])
+
+        results = self.client.get('/autocomplete/school/', {'q': 'univ'}).json()['results']
+        self.assertEqual(len(results), 10)
+        self.assertEqual(self.client.get('/autocomplete/school/').json(), {'results': []})
+
+    def test_unknown_field(self):
+        self.assertEqual(self.client.get('/autocomplete/major/', {'q': 'cs'}).status_code, 404)
+        self.assertEqual(self.client.get('/autocomplete/nonexistent/', {'q': 'cs'}).status_code, 404)
+        self.assertEqual(self.client.post('/autocomplete/school/', {'q': 'cs'}).status_code, 405)
+
+class UikitMarkupTest(TestCase):
+    hacker = {
+        'firstName': 'Huber', 'lastName': 'Ackerman', 'email': 'not an email', 'dob': '2020-01-01',
+        'nationality': ['DE', 'XX'], 'countryOfResidence': 'DE', 'gender': 'Male', 'jacobsHackTerms': 'on',
+    }
+
+    def normalize(self, html):
+        """ Removes the whitespace between tags and collapses the rest """
+
+        return re.sub(r'\s+', ' ', re.sub(r'\s*(<|>)\s*', r'\1', str(html))).strip()
+
+    def assertSameMarkup(self, form_class, data=None):
+        """ Renders two equal forms with the current and the legacy renderer
+        and compares their markup """
+
+        forms = [form_class(data=data) for _ in range(2)]
+        html = renderer.render_form(forms[0])
+        self.assertEqual(self.normalize(html), self.normalize(legacy.render_form(forms[1])))
+        return html
+
+    def test_hacker_form(self):
+        self.assertSameMarkup(HackerForm)
+        html = self.assertSameMarkup(HackerForm, self.hacker)
+        self.assertIn('uk-form-danger', html)
+        self.assertIn('Please correct the error below.', html)
+
+    def test_registration_form(self):
+        self.assertSameMarkup(RegistrationForm)
+        data = dict(self.hacker, email='huber@example.com', username='hackerman', password1='secret', password2='other')
+        html = self.assertSameMarkup(RegistrationForm, data)
+        self.assertIn('id="error_id_password2_1"', html)
+
+    def test_academic_form(self):
+        self.assertSameMarkup(AcademicForm)
+        self.assertSameMarkup(AcademicForm, {'degree': 'bsc', 'year': 'next year'})
+        self.assertSameMarkup(AcademicForm, {})
+
+    def test_radio_buttons(self):
+        self.assertSameMarkup(RSVPForm)
+        self.assertIn('uk-alert-danger', self.assertSameMarkup(RSVPForm, {'going': 'maybe'}))
+        self.assertIn('value="False" checked="checked"', self.assertSameMarkup(RSVPForm, {'going': 'False'}))
+
+    def test_rendered_twice(self):
+        # the classes of the widgets are not added again
+        form = AcademicForm(data={})
+        self.assertEqual(renderer.render_form(form), renderer.render_form(form))
+
+class FormMediaTest(TransactionTestCase):
+    def test_autocomplete_script_is_included_once(self):
+        make_hacker()
+        self.client.login(username='hackerman', password='pw')
+
+        response = self.client.get('/edit/academic/')
+        self.assertContains(response, 'autocomplete/autocomplete.js', count=1)
+        self.assertNotContains(self.client.get('/portal/'), 'autocomplete/autocomplete.js')
+
+
+class CVDownloadTest(MediaTestMixin, TestCase):
+    content = b'%PDF-1.4 ' + bytes(range(256)) * 4
+
+    def setUp(self):
+        super().setUp()
+        self.hacker = make_hacker()
+        self.hacker.cv.cv.save('cv.pdf', ContentFile(self.content))
+        self.client.login(username='hackerman', password='pw')
+
+    def get(self, url='/media/cvs/hackerman.pdf', **headers):
+        """ Requests a CV, reading the body of the response into body """
+
+        response = self.client.get(url, **headers)
+        response.body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-3', 10), (0, 3))
+        self.assertEqual(parse_range('bytes=5-', 10), (5, 9))
+        self.assertEqual(parse_range('bytes=5-100', 10), (5, 9))
+        self.assertEqual(parse_range('bytes=-3', 10), (7, 9))
+        self.assertEqual(parse_range('bytes=-30', 10), (0, 9))
+        self.assertIsNone(parse_range(None, 10))
+        self.assertIsNone(parse_range('bytes=0-1,4-5', 10))
+        self.assertIsNone(parse_range('bytes=5-3', 10))
+        self.assertIs(parse_range('bytes=10-', 10), False)
+        self.assertIs(parse_range('bytes=-0', 10), False)
+
+    def test_stream(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.body, self.content)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('filename=hackerman.pdf', response['Content-Disposition'])
+        self.assertIn('private', response['Cache-Control'])
+
+        # the same file by the name it is stored under
+        self.assertEqual(self.get(self.hacker.cv.cv.url).body, self.content)
+
+        etag = response['ETag']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+    def test_ranges(self):
+        etag = self.get()['ETag']
+
+        response = self.get(HTTP_RANGE='bytes=0-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.body, b'%PDF')
+        self.assertEqual(response['Content-Range'], 'bytes 0-3/{}'.format(len(self.content)))
+        self.assertEqual(response['Content-Length'], '4')
+
+        response = self.get(HTTP_RANGE='bytes=-100', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.body, self.content[-100:])
+
+        response = self.get(HTTP_RANGE='bytes={}-'.format(len(self.content)))
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */{}'.format(len(self.content)))
+
+        # the client has a part of another version of the file
+        response = self.get(HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.body, self.content)
+
+    def test_access(self):
+        url = self.hacker.cv.cv.url
+        make_hacker('other')
+        self.client.login(username='other', password='pw')
+
+        self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(self.get(url).status_code, 403)
+
+    def test_accel(self):
+        with self.settings(CV_SERVE_MODE='accel'):
+            response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], self.hacker.cv.internal_url)
+        self.assertEqual(response.body, b'')
+
+    @mock.patch('time.time', return_value=10000)
+    def test_signed_url(self, time):
+        with self.settings(CV_SIGNING_SECRET='s3cret', CV_SIGNED_URL_TTL=3600):
+            url = self.hacker.cv.download_url
+
+        # what nginx checks, see docker/django.conf
+        uri = '/signed' + self.hacker.cv.cv.url
+        digest = hashlib.md5('{}{}{} s3cret'.format(14400, uri, 'hackerman.pdf').encode()).digest()
+        signature = base64.urlsafe_b64encode(digest).decode().rstrip('=')
+        self.assertEqual(url, '{}?md5={}&expires=14400&filename=hackerman.pdf'.format(uri, signature))
+
+        self.assertEqual(self.hacker.cv.download_url, self.hacker.cv.cv.url)
+
+    def test_signed_url_on_portal(self):
+        cache.clear()
+
+        with self.settings(CV_SIGNING_SECRET='s3cret', CV_SIGNED_URL_TTL=3600):
+            with mock.patch('time.time', return_value=10000):
+                response = self.client.get('/portal/')
+                self.assertContains(response, 'expires=14400')
+                etag = response['ETag']
+
+                self.assertEqual(self.client.get('/portal/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+            # the link of the cached card and the page in the browser expire
+            with mock.patch('time.time', return_value=10000 + 3600):
+                response = self.client.get('/portal/', HTTP_IF_NONE_MATCH=etag)
+                self.assertContains(response, 'expires=18000')
+
+
+class UploadTest(MediaTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.hacker = make_hacker()
+
+        # uploads are checked before the csrf token, which has to be checked anyway
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.login(username='hackerman', password='pw')
+        self.client.get('/edit/cv/')
+        self.token = self.client.cookies['csrftoken'].value
+
+    def upload(self, content, token=True):
+        """ Uploads a CV, with the csrf token sent before it like by a browser """
+
+        data = {'csrfmiddlewaretoken': self.token} if token else {}
+        data['cv'] = SimpleUploadedFile('cv.pdf', content, 'application/pdf')
+        return self.client.post('/edit/cv/', data)
+
+    def assertRejected(self, response, message):
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response, 'form', 'cv', message)
+        self.assertFalse(CV.objects.get(pk=self.hacker.cv.pk).cv)
+
+        # nothing has been stored
+        self.assertFalse(os.path.exists(cv_storage.path(cv_storage.prefix)))
+
+    def test_pdf(self):
+        response = self.upload(b'%PDF-1.4 ' + b'x' * 1000)
+        self.assertRedirects(response, '/edit/cv/', fetch_redirect_response=False)
+
+        cv = CV.objects.get(pk=self.hacker.cv.pk)
+        with cv.cv.open() as file:
+            self.assertEqual(file.read(), b'%PDF-1.4 ' + b'x' * 1000)
+
+    def test_not_pdf(self):
+        self.assertRejected(self.upload(b'<html></html>'), 'The file is not a PDF file. ')
+        self.assertRejected(self.upload(b'%P'), 'The file is not a PDF file. ')
+
+    def test_too_large(self):
+        with self.settings(CV_MAX_UPLOAD_SIZE=1000):
+            self.assertRejected(self.upload(b'%PDF-1.4 ' + b'x' * 1000), 'The file is too large, it may be at most 1000\xa0bytes. ')
+
+            # the limit itself is fine
+            response = self.upload(b'%PDF-1.4 ' + b'x' * 991)
+            self.assertEqual(response.status_code, 302)
+
+    def test_csrf(self):
+        self.assertEqual(self.upload(b'%PDF-1.4', token=False).status_code, 403)
+        self.assertFalse(CV.objects.get(pk=self.hacker.cv.pk).cv)
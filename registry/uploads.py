@@ -0,0 +1,80 @@
+import functools
+
+from django.conf import settings
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+
+# The first bytes of every PDF file
+PDF_MAGIC = b'%PDF'
+
+
+class PDFUploadHandler(FileUploadHandler):
+    """ An upload handler checking that the files uploaded as one of the
+    given fields are PDF files of at most max_size bytes while they are
+    received. Otherwise the upload is aborted without reading the rest of
+    the request, and the error is recorded in request.upload_errors. """
+
+    def __init__(self, request, field_names, max_size):
+        super().__init__(request)
+        self.field_names = field_names
+        self.max_size = max_size
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b''
+
+    def abort(self, message):
+        self.request.upload_errors[self.field_name] = message
+        raise StopUpload(connection_reset=True)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.field_name not in self.field_names:
+            return raw_data
+
+        if start + len(raw_data) > self.max_size:
+            self.abort('The file is too large, it may be at most {}. '.format(filesizeformat(self.max_size)))
+
+        # the magic bytes might be split across chunks
+        if len(self.header) < len(PDF_MAGIC):
+            self.header += raw_data[:len(PDF_MAGIC) - len(self.header)]
+            if not PDF_MAGIC.startswith(self.header):
+                self.abort('The file is not a PDF file. ')
+
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.field_name in self.field_names and file_size and len(self.header) < len(PDF_MAGIC):
+            # too short to be checked above
+            self.request.upload_errors[self.field_name] = 'The file is not a PDF file. '
+        return None
+
+
+def pdf_upload(*field_names):
+    """ A decorator for views receiving PDF files as the given form fields,
+    which are checked by PDFUploadHandler while they are uploaded, with a
+    limit of settings.CV_MAX_UPLOAD_SIZE bytes. The view must add the errors
+    in request.upload_errors to its form, see add_upload_errors. """
+
+    def decorator(view):
+        # the csrf check reads the request, so it has to happen after the
+        # upload handler is in place
+        protected = csrf_protect(view)
+
+        @csrf_exempt
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            request.upload_errors = {}
+            request.upload_handlers.insert(0, PDFUploadHandler(request, field_names, settings.CV_MAX_UPLOAD_SIZE))
+            return protected(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def add_upload_errors(request, form):
+    """ Adds the errors of an aborted upload (see PDFUploadHandler) to a form """
+
+    for (field, message) in getattr(request, 'upload_errors', {}).items():
+        form.add_error(field, message)
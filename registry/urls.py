@@ -24,9 +24,7 @@ from .views import setup as setup_views
 from .views import edit as edit_views
 from .views import cv as cv_views
 from .views import auth as auth_views
-
-# Side-effect import: Initialize hooks
-import hacker.hooks
+from .views import autocomplete as autocomplete_views
 
 
 urlpatterns = [
@@ -65,6 +63,10 @@ urlpatterns = [
     path('edit/cv/', edit_views.cv, name='edit_cv'),
     path('edit/rsvp/', edit_views.rsvp, name='edit_rsvp'),
 
+    # Suggestions for text fields
+    path('autocomplete/<slug:field>/', autocomplete_views.autocomplete, name='autocomplete'),
+
     # CV Media URL
-    re_path('^{}cvs/(?P<username>[\w.@+-]+)\.pdf$'.format(settings.MEDIA_URL[1:]), cv_views.cv, name='view_cv')
+    re_path('^{}cvs/(?P<username>[\w.@+-]+)\.pdf$'.format(settings.MEDIA_URL[1:]), cv_views.cv, name='view_cv'),
+    re_path('^{}cvs/(?P<name>[0-9a-f]{{2}}/[0-9a-f]{{2}}/[0-9a-f]{{64}}\.pdf)$'.format(settings.MEDIA_URL[1:]), cv_views.cv_file, name='view_cv_file'),
 ]
\ No newline at end of file
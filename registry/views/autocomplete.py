@@ -0,0 +1,20 @@
+from django.http import Http404, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+
+from hacker.autocomplete import get_index
+
+
+@require_GET
+def autocomplete(request, field):
+    """ Returns the best suggestions for the value of a FuzzyChoiceField """
+
+    index = get_index(field)
+    if index is None:
+        raise Http404
+
+    response = JsonResponse({'results': index.search(request.GET.get('q', ''))})
+
+    # the suggestions only change with a new release
+    patch_cache_control(response, public=True, max_age=24 * 60 * 60)
+    return response
@@ -1,7 +1,13 @@
+import os
+import re
+
 from django.conf import settings
-from django.http import HttpResponse, HttpResponseForbidden, Http404
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
 
 from hacker.models import CV
 
@@ -20,24 +26,144 @@ def cv(request, username):
         cv = get_object_or_404(CV, hacker__profile__username=username)
         if not cv.has_cv:
             raise Http404
-        return cv_actual(cv)
+        return cv_actual(request, cv)
     
     return HttpResponseForbidden()
 
-def cv_prod(cv):
-    """ Serves a CV URL for production """
+
+@login_required
+def cv_file(request, name):
+    """ Serves a CV by the name of its file, i.e. its url. The file may be
+    shared by the CVs of several hackers. """
+
+    cvs = CV.objects.filter(cv='cvs/' + name).select_related('hacker__profile')
+    if not (request.user and request.user.is_superuser):
+        cvs = cvs.filter(hacker__profile=request.user)
+
+    cv = cvs.first()
+    if cv is None:
+        # do not reveal which files exist
+        return HttpResponseForbidden()
+    return cv_actual(request, cv)
+
+def serve_accel(request, file, filename, internal_url, content_type):
+    """ Serves a file for production, by letting nginx send it from its
+    internal url """
     response = HttpResponse()
-    response["Content-Disposition"] = "attachment; filename={0}".format(cv.filename)
-    response["Content-Type"] = "application/pdf"
-    response['X-Accel-Redirect'] = cv.internal_url
+    response["Content-Disposition"] = "attachment; filename={0}".format(filename)
+    response["Content-Type"] = content_type
+    response['X-Accel-Redirect'] = internal_url
     return response
 
-def cv_debug(cv):
-    """ Serves a CV URL for development """
-    response = HttpResponse(cv.cv.read(), "application/pdf")
-    response["Content-Disposition"] = "attachment; filename={0}".format(cv.filename)
+
+# The size of the chunks a CV is streamed in
+CHUNK_SIZE = 64 * 1024
+
+_range_re = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """ Parses a 'Range' header of a file of the given size. Returns a
+    (start, end) tuple of the inclusive byte range requested, None if the
+    whole file should be sent (no, multiple or malformed ranges), or False
+    if the range cannot be satisfied. """
+
+    match = _range_re.match(header.strip()) if header else None
+    if match is None:
+        return None
+
+    (start, end) = match.groups()
+    if not start:
+        # the last bytes of the file
+        if not end or not int(end):
+            return False
+        return (max(size - int(end), 0), size - 1)
+
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start > end:
+        return False if start >= size else None
+    return (start, end)
+
+
+def _read_range(file, start, length):
+    """ Generates the given range of a file in chunks, then closes it """
+
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def serve_stream(request, file, filename, internal_url, content_type):
+    """ Serves a file by streaming it from MEDIA_ROOT, supporting conditional
+    and range requests """
+
+    stat = os.stat(file.path)
+    etag = quote_etag('{:x}-{:x}'.format(stat.st_mtime_ns, stat.st_size))
+    last_modified = int(stat.st_mtime)
+
+    # 304 Not Modified (or 412 Precondition Failed)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        size = stat.st_size
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+        # only send a part if the file is still the one the client has a part of
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if byte_range and if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+            byte_range = None
+
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */{}'.format(size)
+        elif byte_range is None:
+            response = FileResponse(file.open('rb'), content_type=content_type)
+            response.block_size = CHUNK_SIZE
+            response['Content-Length'] = size
+        else:
+            (start, end) = byte_range
+            response = StreamingHttpResponse(_read_range(file.open('rb'), start, end - start + 1),
+                                             content_type=content_type, status=206)
+            response['Content-Range'] = 'bytes {}-{}/{}'.format(start, end, size)
+            response['Content-Length'] = end - start + 1
+
+        response["Content-Disposition"] = "attachment; filename={0}".format(filename)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+
+    # the files may only be cached by the browser, which has to re-validate them
+    patch_cache_control(response, private=True, no_cache=True)
     return response
 
 
+CV_SERVE_MODES = {
+    'stream': serve_stream,
+    'accel': serve_accel,
+}
+
+
+def serve_file(request, file, filename, internal_url, content_type):
+    """ Serves a file stored in MEDIA_ROOT (under internal_url for nginx) in
+    the way picked by settings.CV_SERVE_MODE, after access to it has been
+    checked """
+
+    try:
+        serve = CV_SERVE_MODES[settings.CV_SERVE_MODE]
+    except KeyError:
+        raise ImproperlyConfigured('CV_SERVE_MODE must be one of {}'.format(', '.join(sorted(CV_SERVE_MODES))))
+    return serve(request, file, filename, internal_url, content_type)
+
+
+def cv_actual(request, cv):
+    """ Serves a CV URL """
 
-cv_actual = cv_debug if settings.DEBUG else cv_prod
\ No newline at end of file
+    return serve_file(request, cv.cv, cv.filename, cv.internal_url, 'application/pdf')
@@ -5,8 +5,9 @@ from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
 from django.shortcuts import render, redirect
 
+from registry.uploads import add_upload_errors, pdf_upload
 from registry.views.registry import default_alternative
-from ..decorators import require_setup_completed
+from ..decorators import require_setup_completed, get_hacker, hacker_condition
 
 from ..forms import HackerForm, AcademicForm, ApplicationForm, OrganizationalForm, CVForm, RSVPForm
 
@@ -16,6 +17,7 @@ from hacker.models import RSVP, Approval
 def editViewFactory(prop, FormClass, name, with_files=False):
     """ Generates an edit view for a given section of the profile """
 
+    @hacker_condition()
     @require_setup_completed(default_alternative)
     def edit(request):
 
@@ -27,9 +29,9 @@ def editViewFactory(prop, FormClass, name, with_files=False):
 
         # load the instance
         if prop is None:
-            instance = request.user.hacker
+            instance = get_hacker(request)
         else:
-            instance = getattr(request.user.hacker, prop)
+            instance = getattr(get_hacker(request), prop)
 
         if request.method == 'POST':
             # load files from request (if set)
@@ -38,8 +40,9 @@ def editViewFactory(prop, FormClass, name, with_files=False):
             else:
                 files = None
 
-            # load the form
+            # load the form (along with the errors of an aborted upload)
             form = FormClass(data=request.POST, files=files, instance=instance)
+            add_upload_errors(request, form)
 
             # check that the form is valid
             if form.is_valid():
@@ -85,16 +88,17 @@ organizational = editViewFactory('organizational',
                                  OrganizationalForm,
                                  'Organizational Details')
 
-cv = editViewFactory('cv', 
-                     CVForm,
-                     'CV', 
-                     with_files=True)
+cv = pdf_upload('cv')(editViewFactory('cv',
+                                     CVForm,
+                                     'CV',
+                                     with_files=True))
 
 
+@hacker_condition()
 @require_setup_completed(default_alternative)
 def rsvp(request):
     
-    hacker = request.user.hacker
+    hacker = get_hacker(request)
 
     # if we have something that needs to be setup return to the main page
     if hacker.get_first_unset_component() is not None:
@@ -144,7 +148,7 @@ def rsvp(request):
 @require_setup_completed(default_alternative)
 def password(request):
     # if we have something that needs to be setup return to the main page
-    if request.user.hacker.get_first_unset_component() is not None:
+    if get_hacker(request).get_first_unset_component() is not None:
         return redirect(reverse('portal'))
 
     if request.method == 'POST':
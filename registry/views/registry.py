@@ -1,9 +1,15 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.http import Http404
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.safestring import mark_safe
 
-from registry.decorators import require_setup_completed
+from hacker.models import CV
+from hacker.versions import get_versions, hacker_version_name, hackers_version_name
+from registry.decorators import require_setup_completed, get_hacker, hacker_condition
 from registry.models import Announcement
 
 
@@ -23,12 +29,73 @@ def register(request):
     raise Http404
      
 
+# The cards shown on the portal page, along with the data they depend on
+PORTAL_CARDS = [
+    ('general', 'portal/parts/general.html', ['hacker']),
+    ('application', 'portal/parts/application.html', ['application', 'approval', 'rsvp']),
+    ('organizational', 'portal/parts/organizational.html', ['organizational']),
+    ('academic', 'portal/parts/academic.html', ['academic']),
+    ('cv', 'portal/parts/cv.html', ['cv']),
+    ('account', 'portal/parts/account.html', ['hacker']),
+]
 
+# Further values the cards depend on, which are not versioned
+PORTAL_CARD_EXTRA = {
+    # the signed link to download the cv expires
+    'cv': lambda: [CV.signed_url_expires()],
+}
+
+PORTAL_CACHE_TIMEOUT = getattr(settings, 'PORTAL_CACHE_TIMEOUT', 24 * 60 * 60)
+
+
+def render_portal_cards(request):
+    """ Renders the cards of the portal page, re-using cached fragments
+    where the data they depend on has not changed """
+
+    hacker = get_hacker(request)
+
+    # find the versions of all the data, of this hacker and of all hackers
+    names = {c: [hacker_version_name(hacker.pk, c), hackers_version_name(c)] for (_, _, deps) in PORTAL_CARDS for c in deps}
+    versions = get_versions(set(name for pair in names.values() for name in pair))
+
+    # and build a key for each card from the versions of its dependencies
+    # and the other values it depends on
+    keys = {}
+    for (name, template, deps) in PORTAL_CARDS:
+        parts = [versions[n] for c in deps for n in names[c]] + PORTAL_CARD_EXTRA.get(name, lambda: [])()
+        key = 'portal:{}:{}:{}'.format(hacker.pk, name, '-'.join(str(part) for part in parts))
+        keys[key] = (name, template)
+
+    cards = {keys[key][0]: html for (key, html) in cache.get_many(list(keys.keys())).items()}
+
+    # the hacker may have been loaded before a change was committed and its
+    # versions bumped, so it has to be re-loaded for the cards to match them
+    if len(cards) < len(keys):
+        del request._hacker_cache
+        get_hacker(request)
+
+    # render all the cards that are not in the cache
+    rendered = {}
+    for (key, (name, template)) in keys.items():
+        if name not in cards:
+            cards[name] = rendered[key] = render_to_string(template, {'user': request.user}, request=request)
+
+    if rendered:
+        cache.set_many(rendered, PORTAL_CACHE_TIMEOUT)
+
+    return {name: mark_safe(html) for (name, html) in cards.items()}
+
+
+@hacker_condition(lambda request: list(get_versions(['announcements']).values()) + [CV.signed_url_expires()])
 @require_setup_completed(lambda request: redirect(reverse('setup')))
 def portal(request):
 
     # and render the portal
-    return render(request, 'portal/index.html', {'user': request.user, 'announcements': Announcement.objects.filter(active=True)})
+    return render(request, 'portal/index.html', {
+        'user': request.user,
+        'announcements': Announcement.get_active(),
+        'cards': render_portal_cards(request),
+    })
 
 
 def default_alternative(request):
@@ -5,7 +5,8 @@ from django.shortcuts import render, redirect
 from django.urls import reverse
 
 from hacker.models import Approval
-from registry.decorators import require_unset_component
+from registry.decorators import require_unset_component, get_hacker
+from registry.uploads import add_upload_errors, pdf_upload
 from registry.views.registry import default_alternative
 from ..forms import RegistrationForm, ApplicationForm, AcademicForm, OrganizationalForm, CVForm
 
@@ -59,7 +60,7 @@ def register(request):
 def setup(request):
     """ Generates a setup page according to the given component. """
 
-    component = request.user.hacker.get_first_unset_component()
+    component = get_hacker(request).get_first_unset_component()
 
     # if we have finished everything, return the all done page
     if component is None:
@@ -87,8 +88,9 @@ def setupViewFactory(prop, FormClass, name, subtitle, with_files=False):
             else:
                 files = None
 
-            # load the form
+            # load the form (along with the errors of an aborted upload)
             form = FormClass(data=request.POST, files=files)
+            add_upload_errors(request, form)
 
             # check that the form is valid
             if form.is_valid():
@@ -96,7 +98,7 @@ def setupViewFactory(prop, FormClass, name, subtitle, with_files=False):
 
                 # Create the data instance
                 instance = form.save(commit=False)
-                instance.hacker = request.user.hacker
+                instance.hacker = get_hacker(request)
                 instance.save()
 
                 # and then continue to the main setup page
@@ -129,8 +131,8 @@ organizational = setupViewFactory('organizational', OrganizationalForm,
                                   'Organizational Details',
                                   'some more organizational details we need to work out')
 
-cv = setupViewFactory('cv', CVForm,
-                      'CV',
-                      'upload your CV',
-                      with_files=True)
+cv = pdf_upload('cv')(setupViewFactory('cv', CVForm,
+                                      'CV',
+                                      'upload your CV',
+                                      with_files=True))
 
@@ -0,0 +1,57 @@
+/* Fills the datalist of inputs with a data-autocomplete-url with suggestions
+ * from the server while typing. */
+(function () {
+    function attach(input) {
+        if (input.getAttribute('data-autocomplete-attached')) {
+            return;
+        }
+        input.setAttribute('data-autocomplete-attached', '1');
+
+        var url = input.getAttribute('data-autocomplete-url');
+        var list = document.getElementById(input.getAttribute('list'));
+        var timer = null;
+        var last = null;
+
+        function update() {
+            var query = input.value;
+            if (query === last) {
+                return;
+            }
+            last = query;
+
+            var xhr = new XMLHttpRequest();
+            xhr.open('GET', url + '?q=' + encodeURIComponent(query));
+            xhr.onload = function () {
+                // ignore failed requests and outdated answers
+                if (xhr.status !== 200 || input.value !== query) {
+                    return;
+                }
+
+                while (list.firstChild) {
+                    list.removeChild(list.firstChild);
+                }
+                JSON.parse(xhr.responseText).results.forEach(function (result) {
+                    var option = document.createElement('option');
+                    option.value = result;
+                    list.appendChild(option);
+                });
+            };
+            xhr.send();
+        }
+
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(update, 150);
+        });
+    }
+
+    function init() {
+        Array.prototype.forEach.call(document.querySelectorAll('input[data-autocomplete-url]'), attach);
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', init);
+    } else {
+        init();
+    }
+})();